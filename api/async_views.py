@@ -0,0 +1,242 @@
+"""
+Versiones asíncronas (ASGI) de los endpoints públicos de lectura del catálogo.
+
+Son vistas async de Django (DRF no soporta vistas async). Cada vista carga
+de una vez todo lo que el serializador necesita y serializa sin tocar la base
+de datos. Mientras una petición espera a la base de datos o a un cliente lento,
+el event loop atiende otras, así que bajo ASGI (restaurantes/asgi.py) un solo
+proceso sirve muchos más lectores concurrentes que un worker WSGI.
+
+Las consultas NO usan los métodos a*() del ORM: internamente son
+sync_to_async(thread_sensitive=True), que ejecuta todas las consultas del
+proceso en un único hilo y las serializa (con bench_async eran más lentas que
+WSGI). Como estas cargas no dependen de ninguna transacción, en_hilo() las
+ejecuta en el pool de hilos del event loop, en paralelo, cerrando la conexión
+al terminar igual que al final de una petición síncrona. No todas son de solo
+lectura: los menús crean o reconstruyen su MenuSnapshot (ver en_hilo()).
+
+Devuelven el mismo JSON que las vistas síncronas equivalentes y se montan
+bajo el prefijo async/ (ver urls.py).
+"""
+import asyncio
+import json
+from calendar import timegm
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+
+from .autenticacion import JWTAutenticacionCacheada
+from .conditional import etag_restaurante, last_modified_restaurante, etag_menu, last_modified_menu
+from .eventos import canal_restaurante, obtener_broker
+from .menu_snapshot import obtener_menu
+from .models import Restaurante, Orden
+from .cargas import optimizar
+from .representacion import Representacion
+from .serializers import RestauranteSerializer, OrdenSerializer
+from .views import respuesta_menu
+
+PREFETCH_RESTAURANTE = ('tipos_cocina', 'redes_sociales', 'metodos_pago', 'envios')
+
+
+def en_hilo(funcion):
+    """
+    Versión awaitable de una función síncrona, ejecutada en el pool de hilos.
+
+    Cada hilo usa su propia conexión en autocommit, sin la transacción de la
+    petición (las vistas async no tienen ATOMIC_REQUESTS). Una función que
+    escriba debe hacerlo con sentencias que se confirmen por sí solas o con
+    su propio transaction.atomic(), como obtener_menu(): el INSERT del
+    snapshot va en un atomic() que tolera la carrera con otro hilo y el
+    contenido se guarda con un UPDATE condicionado a la versión.
+    """
+    def ejecutar(*args, **kwargs):
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(ejecutar, thread_sensitive=False)
+
+
+def respuesta_json(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def no_encontrado():
+    return respuesta_json({"detail": "No encontrado."}, status=404)
+
+
+async def respuesta_condicional(request, etag_func, last_modified_func, construir, **kwargs):
+    """
+    Equivalente async del decorador condition(): calcula ETag/Last-Modified
+    (funciones síncronas de conditional.py) y responde 304 si el cliente ya
+    tiene la versión actual; si no, espera a construir() y añade las cabeceras.
+    """
+    def validadores():
+        return etag_func(request, **kwargs), last_modified_func(request, **kwargs)
+
+    etag, fecha = await en_hilo(validadores)()
+    etag = quote_etag(etag) if etag else None
+    last_modified = timegm(fecha.utctimetuple()) if fecha else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = await construir()
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        if etag and not response.has_header('ETag'):
+            response.headers['ETag'] = etag
+    return response
+
+
+def _autenticar(request, token=None):
+    autenticacion = JWTAutenticacionCacheada()
+    if token is None:
+        resultado = autenticacion.authenticate(request)
+        return resultado[0] if resultado else None
+    return autenticacion.get_user(autenticacion.get_validated_token(token))
+
+
+async def autenticar_jwt(request, token=None):
+    """
+    Autentica con el mismo JWT que las vistas DRF (cabecera Authorization, o
+    'token' si se indica). Devuelve (usuario, None) o (None, respuesta 401).
+    """
+    try:
+        usuario = await en_hilo(_autenticar)(request, token)
+    except exceptions.AuthenticationFailed as e:
+        return None, respuesta_json({"detail": e.detail}, status=401)
+    if usuario is None:
+        return None, respuesta_json({"detail": exceptions.NotAuthenticated.default_detail}, status=401)
+    return usuario, None
+
+
+def _cargar_restaurante(slug):
+    return Restaurante.objects.prefetch_related(*PREFETCH_RESTAURANTE).filter(slug=slug).first()
+
+
+def _cargar_menu(restaurante_slug, tipo):
+    # Escribe: crea el MenuSnapshot o guarda el menú reconstruido (ver en_hilo())
+    restaurante = Restaurante.objects.filter(slug=restaurante_slug).first()
+    if restaurante is None:
+        return None
+    return obtener_menu(restaurante, tipo)
+
+
+def _cargar_orden(pk, contexto):
+    return optimizar(Orden.objects.filter(pk=pk), OrdenSerializer, contexto).first()
+
+
+@require_safe
+async def restaurante_detail(request, slug):
+    """GET async de restaurantes/<slug>/ (mismo JSON que views.restaurante_detail)."""
+    async def construir():
+        restaurante = await en_hilo(_cargar_restaurante)(slug)
+        if restaurante is None:
+            return no_encontrado()
+        return respuesta_json(RestauranteSerializer(restaurante).data)
+
+    return await respuesta_condicional(
+        request, etag_restaurante, last_modified_restaurante, construir, slug=slug
+    )
+
+
+async def _respuesta_menu(restaurante_slug, tipo):
+    """Menú pre-serializado del restaurante, o None si el slug no existe."""
+    menu = await en_hilo(_cargar_menu)(restaurante_slug, tipo)
+    if menu is None:
+        return None
+    return respuesta_menu(*menu)
+
+
+@require_safe
+async def producto_list_by_restaurante_slug(request, restaurante_slug):
+    """GET async del menú público (mismo JSON que views.producto_list_by_restaurante_slug)."""
+    async def construir():
+        return await _respuesta_menu(restaurante_slug, 'cliente') or no_encontrado()
+
+    return await respuesta_condicional(
+        request, etag_menu, last_modified_menu, construir, restaurante_slug=restaurante_slug
+    )
+
+
+@require_safe
+async def restaurant_menu_list_view(request, restaurante_slug):
+    """GET async del menú del panel (requiere JWT, igual que views.restaurant_menu_list_view)."""
+    usuario, error = await autenticar_jwt(request)
+    if error is not None:
+        return error
+
+    async def construir():
+        # Sin restaurante no hay productos: lista vacía, como la vista síncrona
+        return await _respuesta_menu(restaurante_slug, 'menu') or respuesta_json([])
+
+    return await respuesta_condicional(
+        request, etag_menu, last_modified_menu, construir, restaurante_slug=restaurante_slug
+    )
+
+
+@require_safe
+async def orden_detail(request, pk):
+    """GET async de ordenes/<pk>/ (mismo JSON que views.orden_detail)."""
+    try:
+        # Con 'request', las URLs de imágenes son absolutas como en la vista síncrona
+        contexto = {'request': request, 'representacion': Representacion.desde_parametros(request.GET, OrdenSerializer)}
+    except exceptions.ValidationError as e:
+        return respuesta_json(e.detail, status=400)
+    orden = await en_hilo(_cargar_orden)(pk, contexto)
+    if orden is None:
+        return HttpResponse(status=404)
+    return respuesta_json(OrdenSerializer(orden, context=contexto).data)
+
+
+# --- Eventos de órdenes (Server-Sent Events) ---
+
+INTERVALO_PING = 15  # segundos; mantiene viva la conexión a través de proxies
+
+
+def _propietario_id(restaurante_slug):
+    return Restaurante.objects.filter(slug=restaurante_slug).values_list('id', 'propietario_id').first()
+
+
+async def _stream_eventos(canal):
+    yield 'retry: 5000\n\n'
+    async with obtener_broker().suscribir(canal) as cola:
+        while True:
+            try:
+                evento = await asyncio.wait_for(cola.get(), timeout=INTERVALO_PING)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            datos = json.dumps(evento['datos'], ensure_ascii=False)
+            yield f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+@require_safe
+async def eventos_ordenes(request, restaurante_slug):
+    """
+    Stream SSE con las órdenes nuevas ('orden_creada') y los cambios de estado
+    ('orden_estado') de un restaurante, solo para su propietario. Como
+    EventSource no permite cabeceras, el JWT también se acepta en ?token=.
+    Requiere servir el proyecto con ASGI.
+    """
+    usuario, error = await autenticar_jwt(request, token=request.GET.get('token'))
+    if error is not None:
+        return error
+    restaurante = await en_hilo(_propietario_id)(restaurante_slug)
+    if restaurante is None:
+        return no_encontrado()
+    restaurante_id, propietario_id = restaurante
+    if propietario_id != usuario.id:
+        return respuesta_json({"detail": "No tienes permiso para ver las órdenes de este restaurante."}, status=403)
+
+    response = StreamingHttpResponse(_stream_eventos(canal_restaurante(restaurante_id)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Sin buffer en nginx
+    return response
@@ -0,0 +1,115 @@
+"""
+Autenticación JWT sin consultar auth_user en cada petición.
+
+JWTAuthentication de simplejwt carga la fila del usuario en cada petición
+autenticada (también en los sondeos frecuentes del dashboard).
+JWTAutenticacionCacheada resuelve el claim user_id contra una caché LRU en
+memoria del proceso con instantáneas de los usuarios (los campos de
+CAMPOS_USUARIO) y construye con ellas un User sin consultar la base de datos.
+El resto de campos quedan diferidos: si una vista los lee, Django los carga
+en ese momento.
+
+Las instantáneas caducan a los AUTENTICACION_CACHE_TTL segundos y las señales
+de User las borran al guardar (p. ej. al desactivar) o eliminar un usuario,
+así que un is_active=False se respeta de inmediato en el proceso que lo
+guardó y, como mucho, tras el TTL en los demás procesos (o si se cambió con
+queryset.update(), que no dispara señales).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+CAMPOS_USUARIO = ('id', 'username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+class CacheUsuarios:
+    """LRU con caducidad: user_id -> tupla de valores de CAMPOS_USUARIO. Segura entre hilos."""
+
+    def __init__(self, tamano, ttl):
+        self.tamano = tamano
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (caduca, valores)
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.monotonic():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave, valores):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl, valores)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.tamano:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self._lock:
+            self._entradas.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+_cache = None
+
+
+def cache_usuarios():
+    global _cache
+    if _cache is None:
+        _cache = CacheUsuarios(
+            getattr(settings, 'AUTENTICACION_CACHE_TAMANO', 10000),
+            getattr(settings, 'AUTENTICACION_CACHE_TTL', 30),
+        )
+    return _cache
+
+
+def invalidar_usuario(usuario):
+    cache_usuarios().invalidar(str(getattr(usuario, api_settings.USER_ID_FIELD)))
+
+
+class JWTAutenticacionCacheada(JWTAuthentication):
+    """JWTAuthentication que construye el usuario desde la caché de instantáneas (ver arriba)."""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Comparar el hash de la contraseña requiere la fila completa
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        # from_db() espera los valores en el orden de los campos del modelo
+        campos = [f.attname for f in self.user_model._meta.concrete_fields if f.attname in CAMPOS_USUARIO]
+        cache = cache_usuarios()
+        valores = cache.obtener(str(user_id))
+        if valores is None:
+            valores = (
+                self.user_model._default_manager
+                .filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values_list(*campos)
+                .first()
+            )
+            if valores is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.guardar(str(user_id), valores)
+
+        user = self.user_model.from_db(router.db_for_read(self.user_model), campos, valores)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,208 @@
+"""
+Búsqueda de productos por texto (nombre, descripción y nombre de la categoría).
+
+El backend se elige según la base de datos (o con el setting
+BUSQUEDA_PRODUCTOS_BACKEND, ruta a una clase):
+
+- SQLite: tabla virtual FTS5 'api_producto_fts' (creada en la migración
+  0017), con ranking bm25 y búsqueda por prefijo. Se mantiene sincronizada
+  desde las señales de Producto y Categoria (ver signals.py).
+- PostgreSQL: tabla 'api_producto_tsv' con el tsvector ponderado de cada
+  producto e índice GIN (creada en la migración 0020), sincronizada desde las
+  mismas señales. Ranking con ts_rank y búsqueda por prefijo.
+- Otros motores: búsqueda básica con icontains.
+
+Solo se indexan productos activos.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Producto, Categoria
+
+TABLA_FTS = 'api_producto_fts'
+TABLA_TSV = 'api_producto_tsv'
+LIMITE_POR_DEFECTO = 50
+
+
+def terminos(texto):
+    """Palabras de la consulta, sin signos ni operadores."""
+    return re.findall(r'\w+', texto or '', flags=re.UNICODE)
+
+
+class BackendBusqueda:
+    """Interfaz de los backends de búsqueda de productos."""
+
+    def indexar(self, producto_ids):
+        """(Re)indexa los productos indicados."""
+
+    def eliminar(self, producto_ids):
+        """Quita los productos indicados del índice."""
+
+    def reconstruir(self):
+        """Regenera el índice completo."""
+
+    def buscar(self, texto, restaurante_id=None, limite=LIMITE_POR_DEFECTO):
+        """Devuelve los IDs de los productos que coinciden, ordenados por relevancia."""
+        raise NotImplementedError
+
+
+class BusquedaBasica(BackendBusqueda):
+    """Búsqueda sin índice (icontains); solo para motores sin soporte de texto completo."""
+
+    def buscar(self, texto, restaurante_id=None, limite=LIMITE_POR_DEFECTO):
+        productos = Producto.objects.filter(activo=True)
+        if restaurante_id is not None:
+            productos = productos.filter(restaurante_id=restaurante_id)
+        for termino in terminos(texto):
+            productos = productos.filter(
+                Q(nombre__icontains=termino)
+                | Q(descripcion__icontains=termino)
+                | Q(categoria__nombre__icontains=termino)
+            )
+        return list(productos.values_list('id', flat=True)[:limite])
+
+
+class SQLiteFTS5(BackendBusqueda):
+    # Pesos de bm25 por columna: nombre, descripcion, categoria
+    PESOS = (10.0, 1.0, 4.0)
+
+    def _insertar(self, cursor, where='', params=()):
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS} (rowid, nombre, descripcion, categoria, restaurante_id) "
+            f"SELECT p.id, p.nombre, COALESCE(p.descripcion, ''), c.nombre, p.restaurante_id "
+            f"FROM {Producto._meta.db_table} p "
+            f"JOIN {Categoria._meta.db_table} c ON c.id = p.categoria_id "
+            f"WHERE p.activo {where}",
+            params,
+        )
+
+    def indexar(self, producto_ids):
+        producto_ids = list(producto_ids)
+        if not producto_ids:
+            return
+        marcadores = ', '.join(['%s'] * len(producto_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid IN ({marcadores})", producto_ids)
+            self._insertar(cursor, f"AND p.id IN ({marcadores})", producto_ids)
+
+    def eliminar(self, producto_ids):
+        producto_ids = list(producto_ids)
+        if not producto_ids:
+            return
+        marcadores = ', '.join(['%s'] * len(producto_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid IN ({marcadores})", producto_ids)
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_FTS}")
+            self._insertar(cursor)
+
+    def buscar(self, texto, restaurante_id=None, limite=LIMITE_POR_DEFECTO):
+        palabras = terminos(texto)
+        if not palabras:
+            return []
+        # Cada palabra entre comillas (sin operadores FTS) y con '*' para buscar por prefijo
+        consulta = ' '.join(f'"{palabra}"*' for palabra in palabras)
+        sql = f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s"
+        params = [consulta]
+        if restaurante_id is not None:
+            sql += " AND restaurante_id = %s"
+            params.append(restaurante_id)
+        pesos = ', '.join(str(peso) for peso in self.PESOS)
+        sql += f" ORDER BY bm25({TABLA_FTS}, {pesos}) LIMIT %s"
+        params.append(limite)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [fila[0] for fila in cursor.fetchall()]
+
+
+class PostgresTsvector(BackendBusqueda):
+    """
+    tsvector guardado por producto: calcularlo al vuelo en cada consulta
+    obligaba a recorrer toda la tabla de productos. El índice GIN sobre
+    'documento' resuelve el @@ sin leer los productos que no coinciden.
+    """
+    CONFIG = 'spanish'
+    # Pesos de ts_rank: nombre 'A', categoria 'B', descripcion 'C'
+    DOCUMENTO = (
+        "setweight(to_tsvector(%(config)s, p.nombre), 'A') "
+        "|| setweight(to_tsvector(%(config)s, c.nombre), 'B') "
+        "|| setweight(to_tsvector(%(config)s, COALESCE(p.descripcion, '')), 'C')"
+    )
+
+    def _insertar(self, cursor, where='', params=()):
+        cursor.execute(
+            f"INSERT INTO {TABLA_TSV} (producto_id, restaurante_id, documento) "
+            f"SELECT p.id, p.restaurante_id, {self.DOCUMENTO} "
+            f"FROM {Producto._meta.db_table} p "
+            f"JOIN {Categoria._meta.db_table} c ON c.id = p.categoria_id "
+            f"WHERE p.activo {where}",
+            {'config': self.CONFIG, **params},
+        )
+
+    def indexar(self, producto_ids):
+        producto_ids = list(producto_ids)
+        if not producto_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_TSV} WHERE producto_id = ANY(%s)", [producto_ids])
+            self._insertar(cursor, "AND p.id = ANY(%(ids)s)", {'ids': producto_ids})
+
+    def eliminar(self, producto_ids):
+        producto_ids = list(producto_ids)
+        if not producto_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_TSV} WHERE producto_id = ANY(%s)", [producto_ids])
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_TSV}")
+            self._insertar(cursor, params={})
+
+    def buscar(self, texto, restaurante_id=None, limite=LIMITE_POR_DEFECTO):
+        palabras = terminos(texto)
+        if not palabras:
+            return []
+        # terminos() solo deja caracteres de palabra: no hay operadores de tsquery que escapar
+        params = {
+            'config': self.CONFIG,
+            'consulta': ' & '.join(f'{palabra}:*' for palabra in palabras),
+            'limite': limite,
+        }
+        sql = (
+            f"SELECT producto_id FROM {TABLA_TSV}, to_tsquery(%(config)s, %(consulta)s) consulta "
+            f"WHERE documento @@ consulta"
+        )
+        if restaurante_id is not None:
+            sql += " AND restaurante_id = %(restaurante_id)s"
+            params['restaurante_id'] = restaurante_id
+        sql += " ORDER BY ts_rank(documento, consulta) DESC LIMIT %(limite)s"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [fila[0] for fila in cursor.fetchall()]
+
+
+BACKENDS_POR_MOTOR = {
+    'sqlite': SQLiteFTS5,
+    'postgresql': PostgresTsvector,
+}
+
+
+def obtener_backend():
+    ruta = getattr(settings, 'BUSQUEDA_PRODUCTOS_BACKEND', None)
+    if ruta:
+        return import_string(ruta)()
+    return BACKENDS_POR_MOTOR.get(connection.vendor, BusquedaBasica)()
+
+
+def buscar_productos(texto, restaurante_id=None, limite=LIMITE_POR_DEFECTO):
+    """Productos activos que coinciden con el texto, en orden de relevancia."""
+    ids = obtener_backend().buscar(texto, restaurante_id=restaurante_id, limite=limite)
+    productos = Producto.objects.filter(id__in=ids, activo=True).select_related('categoria').in_bulk()
+    return [productos[pk] for pk in ids if pk in productos]
@@ -0,0 +1,90 @@
+"""
+Plan de carga (select_related / prefetch_related) declarado por cada serializador.
+
+Cada ModelSerializer declara en su Meta las relaciones que recorren sus
+serializadores anidados:
+
+    class Meta:
+        select_related = ('restaurante', 'envio')      # FK anidadas (restaurante_details...)
+        prefetch_related = ('items',)                  # listas anidadas many=True
+
+plan_consultas() compone esas declaraciones recorriendo los campos que el
+serializador va a serializar de verdad (respetando ?fields= / ?expand=, ver
+representacion.py): una relación solo se carga si su serializador anidado
+está en la salida, y el plan de cada anidado se añade con su prefijo
+(restaurante__tipos_cocina...). Las listas anidadas se cargan con un Prefetch
+cuyo queryset lleva a su vez el plan del serializador hijo.
+
+optimizar() aplica el plan a un queryset (las vistas lo usan antes de paginar
+o de cargar un solo objeto); ListaOptimizada lo aplica sola cuando una vista
+pasa un queryset sin evaluar a un serializador many=True, y las respuestas en
+streaming también (ver streaming.py).
+"""
+from django.db.models import Prefetch, QuerySet
+from rest_framework import serializers
+
+
+def plan_consultas(serializer):
+    """(select_related, [(lookup, queryset o None)]) para los campos que 'serializer' va a serializar."""
+    meta = serializer.Meta
+    select_declarado = set(getattr(meta, 'select_related', ()))
+    prefetch_declarado = set(getattr(meta, 'prefetch_related', ()))
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+            if field.source in prefetch_declarado:
+                prefetch.append((field.source, _queryset_anidado(field.child)))
+        elif isinstance(field, serializers.ModelSerializer):
+            if field.source in select_declarado:
+                sub_select, sub_prefetch = plan_consultas(field)
+                select.append(field.source)
+                select.extend(f'{field.source}__{lookup}' for lookup in sub_select)
+                prefetch.extend((f'{field.source}__{lookup}', queryset) for lookup, queryset in sub_prefetch)
+            elif field.source in prefetch_declarado:
+                prefetch.append((field.source, _queryset_anidado(field)))
+    return list(dict.fromkeys(select)), prefetch
+
+
+def aplicar_plan(queryset, select, prefetch):
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*(
+            lookup if qs is None else Prefetch(lookup, queryset=qs) for lookup, qs in prefetch
+        ))
+    return queryset
+
+
+def optimizar(queryset, serializer_class, context=None):
+    """
+    Aplica al queryset el plan de carga de serializer_class. Pasar el mismo
+    context que recibirá el serializador (con su 'representacion', si la hay).
+    Un queryset que ya indica sus propias cargas se devuelve tal cual.
+    """
+    if _con_cargas(queryset):
+        return queryset
+    return aplicar_plan(queryset, *plan_consultas(serializer_class(context=context or {})))
+
+
+def _con_cargas(queryset):
+    return bool(queryset.query.select_related or queryset._prefetch_related_lookups)
+
+
+def _queryset_anidado(serializer):
+    """Queryset del modelo del anidado con su propio plan, o None si no necesita nada."""
+    select, prefetch = plan_consultas(serializer)
+    if not (select or prefetch):
+        return None
+    return aplicar_plan(serializer.Meta.model._default_manager.all(), select, prefetch)
+
+
+class ListaOptimizada(serializers.ListSerializer):
+    """
+    ListSerializer que aplica el plan de carga del hijo cuando recibe, como
+    raíz, un queryset sin evaluar al que la vista no le ha indicado cargas.
+    """
+
+    def to_representation(self, data):
+        if self.parent is None and isinstance(data, QuerySet) and data._result_cache is None and not _con_cargas(data):
+            data = aplicar_plan(data, *plan_consultas(self.child))
+        return super().to_representation(data)
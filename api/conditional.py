@@ -0,0 +1,144 @@
+"""
+GET condicional (ETag / Last-Modified) para los endpoints de lectura.
+
+Las funciones de este módulo se usan con el decorador condition() de Django y
+calculan el ETag a partir de agregados baratos (máximo de updated_at + número de
+filas, o la versión del snapshot del menú) sin serializar nada. Si el cliente
+envía un If-None-Match que coincide, la vista responde 304 Not Modified sin
+ejecutarse.
+
+El decorador se coloca DEBAJO de @api_view/@permission_classes para que la
+autenticación y los permisos de DRF se apliquen antes de responder un 304.
+"""
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+from .models import Restaurante, RedSocial, MetodoPago, Envio, MenuSnapshot
+from .streaming import formato_streaming
+
+# Tablas anidadas en RestauranteSerializer que también cambian su representación
+RELACIONES_RESTAURANTE = (
+    ('redes', RedSocial),
+    ('metodos', MetodoPago),
+    ('envios', Envio),
+)
+
+
+def _es_lectura(request):
+    return request.method in ('GET', 'HEAD')
+
+
+def _etag(*partes):
+    """Genera un ETag opaco a partir de los valores del agregado."""
+    return hashlib.md5(repr(partes).encode('utf-8')).hexdigest()
+
+
+def _subconsulta(model, agregado):
+    """Agregado (Max/Count) de una tabla hija por restaurante, como subconsulta correlacionada."""
+    return Subquery(
+        model.objects.filter(restaurante=OuterRef('pk'))
+        .order_by()
+        .values('restaurante')
+        .annotate(valor=agregado)
+        .values('valor')
+    )
+
+
+def _estado_restaurante(request, **filtro):
+    """
+    Obtiene en UNA consulta los datos que determinan la representación de un
+    restaurante (sus updated_at y los de sus tablas anidadas, más los conteos
+    para detectar borrados). Se cachea en el request para que etag y
+    last_modified no consulten dos veces.
+    """
+    # Se cachea también None (restaurante inexistente) para no repetir la consulta
+    if hasattr(request, '_estado_condicional'):
+        return request._estado_condicional
+
+    anotaciones = {'n_tipos': Count('tipos_cocina')}
+    for nombre, model in RELACIONES_RESTAURANTE:
+        anotaciones[f'{nombre}_max'] = _subconsulta(model, Max('updated_at'))
+        anotaciones[f'{nombre}_n'] = Coalesce(
+            _subconsulta(model, Count('id')), 0, output_field=IntegerField()
+        )
+    estado = (
+        Restaurante.objects.filter(**filtro)
+        .annotate(**anotaciones)
+        .values('id', 'updated_at', *anotaciones)
+        .first()
+    )
+    request._estado_condicional = estado
+    return estado
+
+
+def etag_restaurante(request, slug=None, pk=None, **kwargs):
+    if not _es_lectura(request):
+        return None
+    estado = _estado_restaurante(request, **({'slug': slug} if slug is not None else {'pk': pk}))
+    if estado is None:
+        return None
+    return _etag('restaurante', *sorted(estado.items()))
+
+
+def last_modified_restaurante(request, slug=None, pk=None, **kwargs):
+    if not _es_lectura(request):
+        return None
+    estado = _estado_restaurante(request, **({'slug': slug} if slug is not None else {'pk': pk}))
+    if estado is None:
+        return None
+    fechas = [estado['updated_at']] + [estado[f'{nombre}_max'] for nombre, _ in RELACIONES_RESTAURANTE]
+    return max(f for f in fechas if f is not None)
+
+
+def _snapshot_menu(request, restaurante_slug):
+    if not hasattr(request, '_estado_condicional'):
+        # None (aún sin snapshot) también se cachea: etag y last_modified consultan una sola vez
+        request._estado_condicional = (
+            MenuSnapshot.objects.filter(restaurante__slug=restaurante_slug)
+            .values('restaurante_id', 'version', 'updated_at')
+            .first()
+        )
+    return request._estado_condicional
+
+
+def etag_menu(request, restaurante_slug, **kwargs):
+    """ETag de los menús servidos desde MenuSnapshot: basta con su versión."""
+    if not _es_lectura(request) or formato_streaming(request):
+        # Las respuestas en streaming no salen del snapshot: sin ETag
+        return None
+    snapshot = _snapshot_menu(request, restaurante_slug)
+    if snapshot is None:
+        # Aún no hay snapshot: la vista lo construye y la próxima petición ya tendrá ETag
+        return None
+    return _etag('menu', request.path, snapshot['restaurante_id'], snapshot['version'])
+
+
+def last_modified_menu(request, restaurante_slug, **kwargs):
+    if not _es_lectura(request) or formato_streaming(request):
+        return None
+    snapshot = _snapshot_menu(request, restaurante_slug)
+    return snapshot['updated_at'] if snapshot else None
+
+
+def etag_lista_restaurante(model):
+    """
+    Crea la función de ETag para los listados de un modelo hijo de Restaurante
+    (categorías, redes sociales, etc.). Solo cuenta filas de restaurantes del
+    usuario autenticado, así que a otros usuarios nunca se les responde 304.
+    """
+    def etag_func(request, restaurante_slug, **kwargs):
+        if not _es_lectura(request):
+            return None
+        restaurante_id = getattr(request, 'restaurante_id', None)
+        if restaurante_id is not None:
+            # Ya verificado por EsPropietarioRestaurante (ver propiedad.py): sin join con restaurante
+            filas = model.objects.filter(restaurante_id=restaurante_id)
+        else:
+            filas = model.objects.filter(restaurante__slug=restaurante_slug, restaurante__propietario_id=request.user.pk)
+        agregado = filas.aggregate(n=Count('id'), ultimo=Max('updated_at'))
+        if not agregado['n']:
+            return None
+        return _etag(model._meta.label, restaurante_slug, agregado['n'], agregado['ultimo'])
+    return etag_func
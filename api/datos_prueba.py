@@ -0,0 +1,412 @@
+"""
+Generación de datos de prueba en volumen para benchmarks y pruebas de carga.
+
+Inserta con bulk_create por lotes y asigna los slugs directamente, sin pasar
+por los save() de los modelos (y por lo tanto sin señales ni bucles de slugs).
+Las ventanas de apertura se crean junto con los restaurantes y
+GeneradorDatos.finalizar() reconstruye el resto de lo que mantienen las señales
+(índice de búsqueda, resumen de ventas, menús pre-serializados).
+
+Es determinista: cada restaurante, y cada bloque de BLOQUE productos u
+órdenes de un restaurante, usa su propio Random derivado de la semilla. Así, con
+la misma semilla y la misma fecha de referencia, generar 1000 órdenes de una vez
+o en dos pasadas de 500 produce exactamente los mismos datos, y una nueva
+ejecución con cantidades mayores solo añade lo que falta. Las líneas de las
+órdenes se eligen del catálogo existente, así que para reproducirlas hay que
+completar los productos antes que las órdenes (como hace sembrar()).
+"""
+import random
+from contextlib import contextmanager
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .busqueda import obtener_backend
+from .horarios import ventanas_semana
+from .menu_snapshot import invalidar_menu
+from .models import (
+    Restaurante, TipoCocina, Categoria, Producto, Orden, DetalleOrden, Envio, MetodoPago, RedSocial,
+    VentanaApertura,
+)
+from .ventas import reconstruir_ventas_diarias
+
+BLOQUE = 1000
+RESTAURANTES_POR_PROPIETARIO = 5
+
+NOMBRES_CATEGORIA = ['Entradas', 'Pizzas', 'Hamburguesas', 'Pastas', 'Ensaladas', 'Postres', 'Bebidas', 'Combos']
+NOMBRES_PRODUCTO = ['Clásica', 'Especial', 'de la Casa', 'Vegana', 'Doble', 'Picante', 'Familiar', 'Mini']
+TIPOS_COCINA = ['Italiana', 'Mexicana', 'Japonesa', 'China', 'Peruana', 'Vegetariana', 'Parrilla', 'Comida rápida']
+
+# (apertura, cierre) -> peso; incluye horarios nocturnos que cruzan la medianoche
+HORARIOS = {
+    ('09:00', '21:00'): 40,
+    ('12:00', '23:00'): 30,
+    ('08:00', '16:00'): 15,
+    ('19:00', '02:00'): 10,
+    ('00:00', '00:00'): 5,
+}
+# Órdenes por hora del día: picos de almuerzo y cena
+PESOS_HORA = [1, 1, 1, 0, 0, 0, 1, 2, 3, 3, 4, 8, 14, 13, 7, 4, 3, 4, 7, 12, 14, 10, 5, 2]
+# Estado de las órdenes ya cerradas y de las de las últimas horas
+PESOS_ESTADO = {
+    'entregada': 90,
+    'cancelada': 10,
+}
+PESOS_ESTADO_RECIENTE = {
+    'pendiente': 25,
+    'en_proceso': 25,
+    'en_camino': 15,
+    'lista_retiro': 10,
+    'entregada': 20,
+    'cancelada': 5,
+}
+HORAS_RECIENTE = 3
+PROPORCION_ENVIO = 0.6
+
+
+@contextmanager
+def sin_auto_now(model, *campos):
+    """
+    Desactiva temporalmente auto_now/auto_now_add en los campos indicados para
+    poder insertar fechas históricas con bulk_create.
+    """
+    originales = []
+    for nombre in campos:
+        field = model._meta.get_field(nombre)
+        originales.append((field, field.auto_now, field.auto_now_add))
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in originales:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _trozos(elementos, tamano):
+    for inicio in range(0, len(elementos), tamano):
+        yield elementos[inicio:inicio + tamano]
+
+
+class GeneradorDatos:
+    """
+    Crea (o completa) restaurantes con su catálogo y su historial de órdenes.
+    Los restaurantes se identifican por su slug '<prefijo>-<semilla>-<n>'.
+    """
+
+    def __init__(self, semilla=42, prefijo='bench', dias=365, lote=1000, referencia=None, salida=None):
+        self.semilla = semilla
+        self.prefijo = prefijo
+        self.dias = dias
+        self.lote = lote
+        # Las fechas se generan hacia atrás desde aquí; fijarla hace los datos reproducibles
+        self.referencia = referencia or timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.salida = salida or (lambda mensaje: None)
+        self.restaurantes_nuevos = []
+        self.restaurantes_modificados = set()
+
+    def _rnd(self, *partes):
+        return random.Random(':'.join(map(str, (self.semilla, *partes))))
+
+    def _generar(self, partes, desde, hasta, crear):
+        """
+        Llama a crear(rnd, k) para k en [0, hasta) por bloques de BLOQUE con un
+        Random por bloque, y devuelve solo los resultados con k >= desde. Los
+        elementos ya existentes se recalculan (sin insertarlos) para que el
+        Random quede en el mismo punto que en una generación de una sola vez.
+        """
+        for bloque in range(desde // BLOQUE, -(-hasta // BLOQUE)):
+            rnd = self._rnd(*partes, bloque)
+            for k in range(bloque * BLOQUE, min(hasta, (bloque + 1) * BLOQUE)):
+                valor = crear(rnd, k)
+                if k >= desde:
+                    yield valor
+
+    def _slug(self, indice):
+        return f'{self.prefijo}-{self.semilla}-{indice}'
+
+    # --- Restaurantes ---
+
+    def restaurantes(self, cantidad, categorias=6):
+        """Devuelve los restaurantes 0..cantidad-1, creando los que falten con sus categorías."""
+        existentes = {
+            restaurante.slug: restaurante
+            for restaurante in Restaurante.objects.filter(slug__startswith=f'{self.prefijo}-{self.semilla}-')
+        }
+        faltantes = [i for i in range(cantidad) if self._slug(i) not in existentes]
+        for trozo in _trozos(faltantes, self.lote):
+            with transaction.atomic():
+                nuevos = self._crear_restaurantes(trozo, categorias)
+            existentes.update((restaurante.slug, restaurante) for restaurante in nuevos)
+            self.restaurantes_nuevos.extend(nuevos)
+            self.salida(f"  restaurantes: {len(self.restaurantes_nuevos)}/{len(faltantes)}")
+        return [existentes[self._slug(i)] for i in range(cantidad)]
+
+    def _propietarios(self, indices):
+        User = get_user_model()
+        nombres = {self._slug(i // RESTAURANTES_POR_PROPIETARIO) for i in indices}
+        existentes = set(User.objects.filter(username__in=nombres).values_list('username', flat=True))
+        # '!' es una contraseña no utilizable: sin hashear miles de contraseñas
+        User.objects.bulk_create([User(username=nombre, password='!') for nombre in sorted(nombres - existentes)])
+        return dict(User.objects.filter(username__in=nombres).values_list('username', 'id'))
+
+    def _crear_restaurantes(self, indices, categorias):
+        propietarios = self._propietarios(indices)
+        tipos = [
+            TipoCocina.objects.get_or_create(nombre=nombre)[0] for nombre in TIPOS_COCINA
+        ]
+        horarios, pesos_horario = list(HORARIOS), list(HORARIOS.values())
+
+        restaurantes, cocinas = [], []
+        for i in indices:
+            rnd = self._rnd('restaurante', i)
+            apertura, cierre = rnd.choices(horarios, pesos_horario)[0]
+            restaurantes.append(Restaurante(
+                propietario_id=propietarios[self._slug(i // RESTAURANTES_POR_PROPIETARIO)],
+                nombre=f'Restaurante {self.semilla}-{i}',
+                slug=self._slug(i),
+                direccion=f'Calle {rnd.randint(1, 999)} #{i}',
+                telefono=f'{rnd.randint(10 ** 7, 10 ** 8 - 1)}',
+                descripcion='Datos de prueba',
+                estado='abierto' if rnd.random() < 0.9 else 'cerrado',
+                hora_apertura=time.fromisoformat(apertura),
+                hora_cierre=time.fromisoformat(cierre),
+            ))
+            cocinas.append(rnd.sample(tipos, rnd.randint(1, 2)))
+        Restaurante.objects.bulk_create(restaurantes, batch_size=self.lote)
+        if restaurantes and restaurantes[0].pk is None:
+            por_slug = Restaurante.objects.in_bulk([r.slug for r in restaurantes], field_name='slug')
+            restaurantes = [por_slug[r.slug] for r in restaurantes]
+
+        Through = Restaurante.tipos_cocina.through
+        Through.objects.bulk_create([
+            Through(restaurante_id=restaurante.pk, tipococina_id=tipo.pk)
+            for restaurante, tipos_restaurante in zip(restaurantes, cocinas)
+            for tipo in tipos_restaurante
+        ], batch_size=self.lote)
+        Categoria.objects.bulk_create([
+            Categoria(
+                restaurante=restaurante,
+                nombre=f'{NOMBRES_CATEGORIA[j % len(NOMBRES_CATEGORIA)]} {j}',
+                slug=f'categoria-{j}',
+                orden=j,
+            )
+            for restaurante in restaurantes
+            for j in range(categorias)
+        ], batch_size=self.lote)
+        Envio.objects.bulk_create([
+            Envio(restaurante=restaurante, nombre=nombre, precio=precio)
+            for restaurante in restaurantes
+            for nombre, precio in (('Delivery', Decimal('2.50')), ('Delivery express', Decimal('4.00')))
+        ], batch_size=self.lote)
+        MetodoPago.objects.bulk_create([
+            MetodoPago(restaurante=restaurante, tipo=tipo, orden=n)
+            for restaurante in restaurantes
+            for n, tipo in enumerate(('efectivo', 'tarjeta'))
+        ], batch_size=self.lote)
+        RedSocial.objects.bulk_create([
+            RedSocial(restaurante=restaurante, tipo='instagram', url=f'https://instagram.com/{restaurante.slug}')
+            for restaurante in restaurantes
+        ], batch_size=self.lote)
+        VentanaApertura.objects.bulk_create([
+            VentanaApertura(restaurante=restaurante, inicio=inicio, fin=fin)
+            for restaurante in restaurantes
+            for inicio, fin in ventanas_semana(restaurante.hora_apertura, restaurante.hora_cierre)
+        ], batch_size=self.lote)
+        return restaurantes
+
+    @staticmethod
+    def _conteos(modelo, restaurantes):
+        conteos = {}
+        for trozo in _trozos([r.pk for r in restaurantes], 500):
+            conteos.update(
+                modelo.objects.filter(restaurante_id__in=trozo)
+                .values_list('restaurante_id').order_by().annotate(n=Count('id'))
+            )
+        return conteos
+
+    # --- Productos ---
+
+    def productos(self, restaurantes, por_restaurante):
+        """Completa hasta 'por_restaurante' productos en cada restaurante."""
+        existentes = self._conteos(Producto, restaurantes)
+        categorias = {}
+        for trozo in _trozos([r.pk for r in restaurantes if existentes.get(r.pk, 0) < por_restaurante], 500):
+            for categoria_id, restaurante_id in (
+                Categoria.objects.filter(restaurante_id__in=trozo).order_by('orden', 'id').values_list('id', 'restaurante_id')
+            ):
+                categorias.setdefault(restaurante_id, []).append(categoria_id)
+
+        pendientes, creados = [], 0
+        for restaurante in restaurantes:
+            desde = existentes.get(restaurante.pk, 0)
+            if desde >= por_restaurante:
+                continue
+            ids_categoria = categorias.get(restaurante.pk)
+            if not ids_categoria:
+                continue
+
+            def crear(rnd, k, restaurante=restaurante, ids_categoria=ids_categoria):
+                return Producto(
+                    restaurante_id=restaurante.pk,
+                    categoria_id=rnd.choice(ids_categoria),
+                    nombre=f'Producto {rnd.choice(NOMBRES_PRODUCTO)} {k}',
+                    slug=f'producto-{k}',
+                    descripcion=f'Descripción del producto {k}',
+                    precio=Decimal(rnd.randint(300, 4000)) / 100,
+                    orden=rnd.randint(0, 20),
+                    activo=rnd.random() < 0.95,
+                    disponibilidad='disponible' if rnd.random() < 0.97 else 'agotado',
+                    destacado=rnd.random() < 0.05,
+                )
+
+            for producto in self._generar(('producto', restaurante.slug), desde, por_restaurante, crear):
+                pendientes.append(producto)
+                if len(pendientes) >= self.lote:
+                    Producto.objects.bulk_create(pendientes)
+                    creados += len(pendientes)
+                    pendientes = []
+            self.restaurantes_modificados.add(restaurante.pk)
+        if pendientes:
+            Producto.objects.bulk_create(pendientes)
+            creados += len(pendientes)
+        self.salida(f"  productos creados: {creados}")
+        return creados
+
+    # --- Órdenes ---
+
+    def _fecha_orden(self, rnd):
+        dia = self.referencia - timedelta(days=rnd.randrange(self.dias))
+        fecha = dia.replace(hour=rnd.choices(range(24), PESOS_HORA)[0], minute=rnd.randrange(60), second=rnd.randrange(60))
+        return fecha if fecha <= self.referencia else fecha - timedelta(days=1)
+
+    def ordenes(self, restaurantes, por_restaurante, items=0):
+        """
+        Completa hasta 'por_restaurante' órdenes en cada restaurante, cada una con
+        entre 1 e 'items' líneas (el total es la suma de las líneas más el envío).
+        Con items=0 las órdenes no tienen líneas y el total es aleatorio.
+        """
+        if items and not connection.features.can_return_rows_from_bulk_insert:
+            raise NotImplementedError("Generar líneas de orden requiere una base de datos que devuelva los IDs en bulk_create.")
+        existentes = self._conteos(Orden, restaurantes)
+        estados, pesos = list(PESOS_ESTADO), list(PESOS_ESTADO.values())
+        estados_recientes, pesos_recientes = list(PESOS_ESTADO_RECIENTE), list(PESOS_ESTADO_RECIENTE.values())
+        reciente = self.referencia - timedelta(hours=HORAS_RECIENTE)
+
+        creadas = 0
+        for trozo in _trozos([r for r in restaurantes if existentes.get(r.pk, 0) < por_restaurante], 100):
+            ids = [r.pk for r in trozo]
+            productos, envios, metodos = {}, {}, {}
+            for producto_id, restaurante_id, precio in (
+                Producto.objects.filter(restaurante_id__in=ids, activo=True).order_by('id')
+                .values_list('id', 'restaurante_id', 'precio')
+            ):
+                productos.setdefault(restaurante_id, []).append((producto_id, precio))
+            for envio_id, restaurante_id, precio in (
+                Envio.objects.filter(restaurante_id__in=ids).order_by('id').values_list('id', 'restaurante_id', 'precio')
+            ):
+                envios.setdefault(restaurante_id, []).append((envio_id, precio))
+            for metodo_id, restaurante_id in (
+                MetodoPago.objects.filter(restaurante_id__in=ids).order_by('id').values_list('id', 'restaurante_id')
+            ):
+                metodos.setdefault(restaurante_id, []).append(metodo_id)
+
+            pendientes = []
+            for restaurante in trozo:
+                catalogo = productos.get(restaurante.pk, [])
+                if items and not catalogo:
+                    continue
+
+                def crear(rnd, k, restaurante=restaurante, catalogo=catalogo,
+                          envios=envios.get(restaurante.pk, []), metodos=metodos.get(restaurante.pk, [])):
+                    fecha = self._fecha_orden(rnd)
+                    if fecha >= reciente:
+                        estado = rnd.choices(estados_recientes, pesos_recientes)[0]
+                    else:
+                        estado = rnd.choices(estados, pesos)[0]
+                    envio = rnd.choice(envios) if envios and rnd.random() < PROPORCION_ENVIO else None
+                    lineas = []
+                    if items:
+                        # Pocas líneas son más frecuentes que muchas
+                        cantidad_lineas = min(len(catalogo), rnd.choices(range(1, items + 1), range(items, 0, -1))[0])
+                        for producto_id, precio in rnd.sample(catalogo, cantidad_lineas):
+                            cantidad = rnd.choices((1, 2, 3), (70, 22, 8))[0]
+                            lineas.append(DetalleOrden(
+                                producto_id=producto_id, cantidad=cantidad, precio_unitario=precio,
+                                subtotal=cantidad * precio, created_at=fecha, updated_at=fecha,
+                            ))
+                        total = sum(linea.subtotal for linea in lineas) + (envio[1] if envio else 0)
+                    else:
+                        total = Decimal(rnd.randint(500, 20000)) / 100
+                    orden = Orden(
+                        restaurante_id=restaurante.pk,
+                        estado=estado,
+                        total=total,
+                        metodo_pago_id=rnd.choice(metodos) if metodos else None,
+                        envio_id=envio[0] if envio else None,
+                        cliente_nombre=f'Cliente {k}',
+                        cliente_telefono=f'{rnd.randint(10 ** 7, 10 ** 8 - 1)}',
+                        direccion_envio=f'Calle {rnd.randint(1, 999)}' if envio else 'Retiro en local',
+                        created_at=fecha,
+                        updated_at=fecha,
+                    )
+                    return orden, lineas
+
+                desde = existentes.get(restaurante.pk, 0)
+                for orden in self._generar(('orden', restaurante.slug), desde, por_restaurante, crear):
+                    pendientes.append(orden)
+                    if len(pendientes) >= self.lote:
+                        creadas += self._insertar_ordenes(pendientes)
+                        pendientes = []
+                self.restaurantes_modificados.add(restaurante.pk)
+            if pendientes:
+                creadas += self._insertar_ordenes(pendientes)
+            self.salida(f"  órdenes creadas: {creadas}")
+        return creadas
+
+    def _insertar_ordenes(self, pendientes):
+        # Órdenes y líneas en la misma transacción: una ejecución interrumpida no deja órdenes a medias
+        with transaction.atomic(), sin_auto_now(Orden, 'created_at', 'updated_at'), \
+                sin_auto_now(DetalleOrden, 'created_at', 'updated_at'):
+            ordenes = Orden.objects.bulk_create([orden for orden, _ in pendientes])
+            lineas = []
+            for orden, lineas_orden in zip(ordenes, (lineas for _, lineas in pendientes)):
+                for linea in lineas_orden:
+                    linea.orden_id = orden.pk
+                lineas.extend(lineas_orden)
+            DetalleOrden.objects.bulk_create(lineas, batch_size=self.lote)
+        return len(ordenes)
+
+    # --- Datos derivados ---
+
+    def finalizar(self):
+        """Reconstruye lo que normalmente mantienen las señales, para los restaurantes modificados."""
+        modificados = sorted(self.restaurantes_modificados)
+        if not modificados:
+            return
+        self.salida("  reconstruyendo índice de búsqueda...")
+        obtener_backend().reconstruir()
+        self.salida("  reconstruyendo resumen de ventas...")
+        for trozo in _trozos(modificados, 500):
+            reconstruir_ventas_diarias(trozo)
+        for restaurante_id in modificados:
+            invalidar_menu(restaurante_id)
+
+
+def sembrar(restaurantes=10, categorias=6, productos=50, ordenes=2000, dias=365,
+            semilla=42, lote=1000, items=0):
+    """
+    Crea (o completa) 'restaurantes' restaurantes, cada uno con 'categorias'
+    categorías, 'productos' productos y 'ordenes' órdenes repartidas en los
+    últimos 'dias' días, con entre 1 e 'items' líneas por orden (ninguna si
+    items=0), y reconstruye los datos derivados. Devuelve la lista de restaurantes.
+    """
+    generador = GeneradorDatos(semilla=semilla, dias=dias, lote=lote)
+    lista = generador.restaurantes(restaurantes, categorias)
+    generador.productos(lista, productos)
+    generador.ordenes(lista, ordenes, items)
+    generador.finalizar()
+    return lista
@@ -0,0 +1,130 @@
+"""
+Eventos de órdenes en tiempo real para el dashboard (Server-Sent Events).
+
+Las vistas crear_orden y actualizar_estado_orden llaman a
+publicar_orden_creada() / publicar_cambio_estado(). El evento se entrega al
+broker después del commit, y la vista SSE (ver async_views.eventos_ordenes)
+se suscribe al canal del restaurante y reenvía cada evento al navegador.
+
+El broker por defecto vive en memoria del proceso: solo ve los eventos
+publicados en el mismo proceso que sirve el stream (p. ej. todo el proyecto
+bajo un único servidor ASGI). Con varios procesos o con WSGI + ASGI separados
+hay que usar un broker compartido (Redis pub/sub, PostgreSQL LISTEN/NOTIFY...)
+indicando su ruta en el setting EVENTOS_BROKER; solo tiene que implementar la
+interfaz de Broker.
+"""
+import asyncio
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+TAMANO_COLA = 100
+
+
+class Broker(ABC):
+    """
+    Interfaz de los brokers de eventos. Un broker configurado en EVENTOS_BROKER
+    al que le falte algún método falla al instanciarlo, no en la primera conexión SSE.
+    """
+
+    @abstractmethod
+    def publicar(self, canal, evento):
+        """Envía un evento (dict serializable a JSON) a los suscriptores del canal. Se llama desde código síncrono."""
+
+    @abstractmethod
+    def suscribir(self, canal):
+        """
+        Context manager async que entrega una asyncio.Queue con los eventos del
+        canal (normalmente un método async decorado con @asynccontextmanager).
+        """
+
+
+class BrokerEnMemoria(Broker):
+    """
+    Broker dentro del proceso. Cada suscriptor tiene su propia cola acotada;
+    si un cliente no consume y su cola se llena, se descartan sus eventos
+    nuevos (el dashboard puede resincronizarse con el listado de órdenes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscriptores = {}  # canal -> {(loop, cola)}
+
+    def publicar(self, canal, evento):
+        with self._lock:
+            suscriptores = list(self._suscriptores.get(canal, ()))
+        for loop, cola in suscriptores:
+            # publicar() se llama desde hilos síncronos: la cola pertenece al event loop
+            try:
+                loop.call_soon_threadsafe(self._encolar, cola, evento)
+            except RuntimeError:
+                pass  # El event loop del suscriptor ya se cerró
+
+    @staticmethod
+    def _encolar(cola, evento):
+        try:
+            cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            pass
+
+    @asynccontextmanager
+    async def suscribir(self, canal):
+        suscriptor = (asyncio.get_running_loop(), asyncio.Queue(maxsize=TAMANO_COLA))
+        with self._lock:
+            self._suscriptores.setdefault(canal, set()).add(suscriptor)
+        try:
+            yield suscriptor[1]
+        finally:
+            with self._lock:
+                suscriptores = self._suscriptores.get(canal, set())
+                suscriptores.discard(suscriptor)
+                if not suscriptores:
+                    self._suscriptores.pop(canal, None)
+
+
+_broker = None
+_secuencia = itertools.count(1)
+
+
+def obtener_broker():
+    global _broker
+    if _broker is None:
+        ruta = getattr(settings, 'EVENTOS_BROKER', None)
+        _broker = import_string(ruta)() if ruta else BrokerEnMemoria()
+    return _broker
+
+
+def canal_restaurante(restaurante_id):
+    return f'restaurante:{restaurante_id}:ordenes'
+
+
+def _publicar(restaurante_id, tipo, datos):
+    evento = {'id': next(_secuencia), 'tipo': tipo, 'datos': datos}
+    # Solo se publica si la transacción se confirma; fuera de una transacción, de inmediato
+    transaction.on_commit(lambda: obtener_broker().publicar(canal_restaurante(restaurante_id), evento))
+
+
+def publicar_orden_creada(orden):
+    _publicar(orden.restaurante_id, 'orden_creada', {
+        'id': orden.id,
+        'estado': orden.estado,
+        'total': str(orden.total) if orden.total is not None else None,
+        'cliente_nombre': orden.cliente_nombre,
+        'created_at': orden.created_at.isoformat(),
+    })
+
+
+def publicar_cambio_estado(orden, estado_anterior):
+    if orden.estado == estado_anterior:
+        return
+    _publicar(orden.restaurante_id, 'orden_estado', {
+        'id': orden.id,
+        'estado': orden.estado,
+        'estado_anterior': estado_anterior,
+        'updated_at': orden.updated_at.isoformat(),
+    })
@@ -0,0 +1,168 @@
+"""
+Exportación en streaming del menú y del historial de órdenes (CSV o NDJSON).
+
+Cada exportación es una proyección plana con values() recorrida con
+.iterator(): no se instancian modelos ni serializadores anidados, y el
+servidor va emitiendo filas a medida que las lee, así que la memoria se
+mantiene constante aunque se exporte un año de órdenes.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BaseRenderer
+
+from .models import Producto, Orden, DetalleOrden
+from .streaming import NDJSON_CONTENT_TYPE, RENDERERS_STREAMING
+
+CHUNK_SIZE = 2000
+FORMATOS_EXPORTACION = ('csv', 'ndjson')
+# Caracteres con los que Excel, LibreOffice o Google Sheets empiezan una fórmula
+INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+# recurso -> columnas (nombre en el archivo, lookup de values())
+COLUMNAS = {
+    'productos': [
+        ('id', 'id'),
+        ('slug', 'slug'),
+        ('nombre', 'nombre'),
+        ('categoria', 'categoria__nombre'),
+        ('descripcion', 'descripcion'),
+        ('precio', 'precio'),
+        ('activo', 'activo'),
+        ('disponibilidad', 'disponibilidad'),
+        ('orden', 'orden'),
+        ('destacado', 'destacado'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ],
+    'ordenes': [
+        ('id', 'id'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+        ('estado', 'estado'),
+        ('total', 'total'),
+        ('usuario', 'usuario_id'),
+        ('cliente_nombre', 'cliente_nombre'),
+        ('cliente_telefono', 'cliente_telefono'),
+        ('cliente_email', 'cliente_email'),
+        ('direccion_envio', 'direccion_envio'),
+        ('instrucciones_especiales', 'instrucciones_especiales'),
+        ('envio', 'envio__nombre'),
+        ('envio_precio', 'envio__precio'),
+        ('metodo_pago', 'metodo_pago__tipo'),
+    ],
+    'detalles': [
+        ('id', 'id'),
+        ('orden', 'orden_id'),
+        ('orden_created_at', 'orden__created_at'),
+        ('orden_estado', 'orden__estado'),
+        ('producto', 'producto_id'),
+        ('producto_slug', 'producto__slug'),
+        ('producto_nombre', 'producto__nombre'),
+        ('cantidad', 'cantidad'),
+        ('precio_unitario', 'precio_unitario'),
+        ('subtotal', 'subtotal'),
+    ],
+}
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Permite 'Accept: text/csv' en las vistas de exportación. Los datos se
+    emiten con StreamingHttpResponse; este renderer solo se usa para las
+    respuestas de error, que se devuelven como un CSV de una fila: una
+    columna por clave del error ({"detail": ...} o los errores de los filtros).
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        valores = ['; '.join(map(str, v)) if isinstance(v, (list, tuple)) else v for v in data.values()]
+        return ''.join(generar_csv([valores], list(data))).encode(self.charset)
+
+
+RENDERERS_EXPORTACION = RENDERERS_STREAMING + [CSVRenderer]
+
+
+def formato_exportacion(request):
+    """'ndjson' con ?formato=ndjson o Accept: application/x-ndjson; 'csv' en cualquier otro caso."""
+    formato = request.GET.get('formato', '').lower()
+    if formato in FORMATOS_EXPORTACION:
+        return formato
+    if NDJSON_CONTENT_TYPE in request.META.get('HTTP_ACCEPT', ''):
+        return 'ndjson'
+    return 'csv'
+
+
+def queryset_exportacion(recurso, restaurante, ordenes=None):
+    """
+    Queryset de values() del recurso para el restaurante. Para 'ordenes' y
+    'detalles' se puede pasar un queryset de órdenes ya filtrado.
+    """
+    lookups = [lookup for _, lookup in COLUMNAS[recurso]]
+    if ordenes is None:
+        ordenes = Orden.objects.filter(restaurante=restaurante)
+    if recurso == 'productos':
+        queryset = Producto.objects.filter(restaurante=restaurante).order_by('categoria__orden', 'orden', 'id')
+    elif recurso == 'ordenes':
+        queryset = ordenes.order_by('created_at', 'id')
+    else:
+        queryset = DetalleOrden.objects.filter(orden__in=ordenes.values('id')).order_by('orden__created_at', 'orden_id', 'id')
+    return queryset.values_list(*lookups)
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de escribirla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _iso(valor):
+    # Fechas con la misma precisión en CSV y NDJSON (DjangoJSONEncoder recorta a milisegundos)
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, str) and valor.startswith(INICIOS_FORMULA):
+        # Texto del cliente (nombres, instrucciones...) que una hoja de cálculo
+        # interpretaría como fórmula: con la comilla delante se muestra como texto
+        return "'" + valor
+    return _iso(valor)
+
+
+def generar_csv(filas, encabezados):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow([_valor_csv(valor) for valor in fila])
+
+
+def generar_ndjson(filas, encabezados):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for fila in filas:
+        yield encoder.encode(dict(zip(encabezados, map(_iso, fila)))) + '\n'
+
+
+def respuesta_exportacion(recurso, queryset, formato, nombre_archivo):
+    encabezados = [nombre for nombre, _ in COLUMNAS[recurso]]
+    filas = queryset.iterator(chunk_size=CHUNK_SIZE)
+    if formato == 'ndjson':
+        response = StreamingHttpResponse(generar_ndjson(filas, encabezados), content_type=NDJSON_CONTENT_TYPE)
+        extension = 'ndjson'
+    else:
+        response = StreamingHttpResponse(generar_csv(filas, encabezados), content_type='text/csv; charset=utf-8')
+        extension = 'csv'
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.{extension}"'
+    # CSV o NDJSON según el Accept (si no viene ?formato=)
+    patch_vary_headers(response, ['Accept'])
+    return response
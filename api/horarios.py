@@ -0,0 +1,74 @@
+"""
+Ventanas de apertura semanales precalculadas (VentanaApertura).
+
+Cada restaurante tiene un horario diario (hora_apertura / hora_cierre) que se
+expande a intervalos en "minutos de la semana" (lunes 00:00 = 0). Un horario
+que cruza la medianoche (p. ej. 20:00-02:00) se parte en dos intervalos, así
+que "abierto ahora" se resuelve con inicio <= minuto_actual < fin.
+
+Los horarios son horas locales del negocio, no de TIME_ZONE (UTC): el minuto
+actual se calcula en la zona del setting HORARIOS_ZONA (por defecto TIME_ZONE).
+"""
+from datetime import time
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import VentanaApertura
+
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+
+
+def _minuto_del_dia(valor):
+    # Los defaults del modelo son cadenas ('09:00:00') hasta que la instancia se recarga
+    if isinstance(valor, str):
+        valor = time.fromisoformat(valor)
+    return valor.hour * 60 + valor.minute
+
+
+def zona_horarios():
+    return ZoneInfo(getattr(settings, 'HORARIOS_ZONA', settings.TIME_ZONE))
+
+
+def minuto_de_la_semana(momento=None):
+    """Minuto de la semana (lunes 00:00 = 0) de 'momento' (por defecto, ahora) en la zona de los horarios."""
+    momento = timezone.localtime(momento, zona_horarios())
+    return momento.weekday() * MINUTOS_DIA + momento.hour * 60 + momento.minute
+
+
+def ventanas_semana(hora_apertura, hora_cierre):
+    """Devuelve la lista de intervalos [inicio, fin) de la semana para un horario diario."""
+    apertura = _minuto_del_dia(hora_apertura)
+    cierre = _minuto_del_dia(hora_cierre)
+    ventanas = []
+    for dia in range(7):
+        base = dia * MINUTOS_DIA
+        if apertura == cierre:
+            # Misma hora de apertura y cierre: abierto todo el día
+            ventanas.append((base, base + MINUTOS_DIA))
+        elif apertura < cierre:
+            ventanas.append((base + apertura, base + cierre))
+        else:
+            # Cruza la medianoche: hasta el final del día y desde el inicio del día siguiente
+            ventanas.append((base + apertura, base + MINUTOS_DIA))
+            if cierre:
+                siguiente = ((dia + 1) % 7) * MINUTOS_DIA
+                ventanas.append((siguiente, siguiente + cierre))
+    return ventanas
+
+
+def actualizar_ventanas(restaurante):
+    """Regenera las ventanas de apertura de un restaurante."""
+    VentanaApertura.objects.filter(restaurante=restaurante).delete()
+    VentanaApertura.objects.bulk_create([
+        VentanaApertura(restaurante=restaurante, inicio=inicio, fin=fin)
+        for inicio, fin in ventanas_semana(restaurante.hora_apertura, restaurante.hora_cierre)
+    ])
+
+
+def restaurantes_abiertos(momento=None):
+    """Subconsulta con los IDs de los restaurantes abiertos en ese momento (por horario)."""
+    minuto = minuto_de_la_semana(momento)
+    return VentanaApertura.objects.filter(inicio__lte=minuto, fin__gt=minuto).values('restaurante_id')
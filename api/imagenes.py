@@ -0,0 +1,177 @@
+"""
+Variantes redimensionadas (miniaturas y WebP) de Producto.imagen y Restaurante.logo.
+
+Al guardar un producto o restaurante con una imagen nueva, las señales (ver
+signals.py) programan generar_variantes() para después del commit. El trabajo
+se hace en un pool de hilos, así que la petición de subida no espera al
+redimensionado. Cada tamaño de TAMANOS se guarda en el formato original
+(JPEG, o PNG si la imagen tiene transparencia) y en WebP, y las rutas quedan en
+el JSONField <campo>_variantes:
+
+    {"origen": "productos/foto.jpg",
+     "archivos": {"thumb": "...", "thumb_webp": "...", "medium": "...", "medium_webp": "..."}}
+
+Settings opcionales:
+- IMAGENES_VARIANTES_SINCRONO: genera en el mismo hilo (útil en tests y scripts).
+- IMAGENES_VARIANTES_WORKERS: hilos del pool (por defecto 2).
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# nombre -> caja máxima (ancho, alto); se conserva la proporción
+TAMANOS = {
+    'thumb': (200, 200),
+    'medium': (600, 600),
+}
+CALIDAD_JPEG = 85
+CALIDAD_WEBP = 80
+
+# modelo -> campo de imagen (el JSONField de variantes es '<campo>_variantes')
+CAMPOS_IMAGEN = {
+    'producto': 'imagen',
+    'restaurante': 'logo',
+}
+
+_pool = None
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGENES_VARIANTES_WORKERS', 2),
+            thread_name_prefix='variantes',
+        )
+    return _pool
+
+
+def _ruta_variante(nombre_original, tamano, extension):
+    directorio, archivo = os.path.split(nombre_original)
+    base = os.path.splitext(archivo)[0]
+    return os.path.join(directorio, 'variantes', f'{base}_{tamano}.{extension}')
+
+
+def _codificar(imagen, formato, **opciones):
+    salida = BytesIO()
+    imagen.save(salida, format=formato, **opciones)
+    return ContentFile(salida.getvalue())
+
+
+def _eliminar_archivos(storage, variantes):
+    for ruta in (variantes or {}).get('archivos', {}).values():
+        try:
+            storage.delete(ruta)
+        except OSError:
+            logger.warning("No se pudo borrar la variante %s", ruta)
+
+
+def crear_archivos_variantes(archivo_imagen):
+    """
+    Genera y guarda todas las variantes de un FieldFile. Devuelve el dict
+    {nombre_variante: ruta} (lanza OSError/UnidentifiedImageError si no es una imagen).
+    """
+    storage = archivo_imagen.storage
+    with archivo_imagen.open('rb') as f:
+        original = Image.open(f)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    transparente = original.mode in ('RGBA', 'LA') or (original.mode == 'P' and 'transparency' in original.info)
+    if transparente:
+        formato, extension, opciones = 'PNG', 'png', {'optimize': True}
+        original = original.convert('RGBA')
+    else:
+        formato, extension, opciones = 'JPEG', 'jpg', {'quality': CALIDAD_JPEG, 'optimize': True, 'progressive': True}
+        original = original.convert('RGB')
+
+    archivos = {}
+    for tamano, caja in TAMANOS.items():
+        copia = original.copy()
+        copia.thumbnail(caja, Image.Resampling.LANCZOS)
+        archivos[tamano] = storage.save(
+            _ruta_variante(archivo_imagen.name, tamano, extension), _codificar(copia, formato, **opciones)
+        )
+        archivos[f'{tamano}_webp'] = storage.save(
+            _ruta_variante(archivo_imagen.name, tamano, 'webp'),
+            _codificar(copia, 'WEBP', quality=CALIDAD_WEBP, method=4),
+        )
+    return archivos
+
+
+def generar_variantes(modelo, pk):
+    """
+    (Re)genera las variantes de una instancia. Si la imagen cambió mientras se
+    procesaba, no se guarda nada: la nueva imagen ya tiene su propio trabajo.
+    """
+    Modelo = apps.get_model('api', modelo)
+    campo = CAMPOS_IMAGEN[modelo]
+    campo_variantes = f'{campo}_variantes'
+    instancia = Modelo.objects.filter(pk=pk).first()
+    if instancia is None:
+        return
+    archivo_imagen = getattr(instancia, campo)
+    anteriores = getattr(instancia, campo_variantes) or {}
+
+    variantes = {}
+    if archivo_imagen:
+        try:
+            variantes = {'origen': archivo_imagen.name, 'archivos': crear_archivos_variantes(archivo_imagen)}
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.exception("No se pudieron generar las variantes de %s %s", modelo, pk)
+            return
+
+    if archivo_imagen:
+        misma_imagen = Q(**{campo: archivo_imagen.name})
+    else:
+        misma_imagen = Q(**{campo: ''}) | Q(**{f'{campo}__isnull': True})
+    actualizadas = Modelo.objects.filter(misma_imagen, pk=pk).update(
+        **{campo_variantes: variantes, 'updated_at': timezone.now()}
+    )
+    if not actualizadas:
+        # La imagen cambió entretanto: se descartan las variantes recién creadas
+        _eliminar_archivos(archivo_imagen.storage, variantes)
+        return
+    _eliminar_archivos(archivo_imagen.storage, anteriores)
+
+    if modelo == 'producto':
+        # update() no dispara señales: el menú pre-serializado se invalida aquí
+        from .menu_snapshot import invalidar_menu
+        invalidar_menu(instancia.restaurante_id)
+
+
+def _ejecutar(modelo, pk):
+    try:
+        generar_variantes(modelo, pk)
+    except Exception:
+        logger.exception("Error generando variantes de %s %s", modelo, pk)
+    finally:
+        close_old_connections()
+
+
+def necesita_variantes(instancia):
+    """True si la imagen actual no coincide con la que originó las variantes guardadas."""
+    campo = CAMPOS_IMAGEN[instancia._meta.model_name]
+    archivo_imagen = getattr(instancia, campo)
+    variantes = getattr(instancia, f'{campo}_variantes') or {}
+    return (archivo_imagen.name or '') != (variantes.get('origen') or '')
+
+
+def programar_variantes(instancia):
+    """Encola la generación de variantes para cuando se confirme la transacción actual."""
+    modelo, pk = instancia._meta.model_name, instancia.pk
+    if getattr(settings, 'IMAGENES_VARIANTES_SINCRONO', False):
+        transaction.on_commit(lambda: generar_variantes(modelo, pk))
+    else:
+        transaction.on_commit(lambda: _executor().submit(_ejecutar, modelo, pk))
@@ -0,0 +1,258 @@
+"""
+Importación masiva del menú de un restaurante desde CSV o JSON.
+
+El archivo se lee en streaming (CSV fila por fila; JSON como array o NDJSON,
+decodificando objeto por objeto) y se procesa en lotes de TAMANO_LOTE filas.
+Cada lote se valida con FilaMenuSerializer y se guarda en su propia
+transacción:
+
+- crea las categorías que no existan (buscadas por nombre),
+- hace upsert de productos por slug con bulk_create / bulk_update,
+- invalida el snapshot del menú y reindexa la búsqueda (bulk_create y
+  bulk_update no disparan las señales de signals.py).
+
+Columnas / claves: categoria, nombre, precio (obligatorias), slug,
+descripcion, activo, disponibilidad, orden, destacado. Las filas con errores
+se omiten y se informan en el resultado; el resto del lote se guarda igual.
+"""
+import codecs
+import csv
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from .busqueda import obtener_backend
+from .menu_snapshot import invalidar_menu
+from .models import Categoria, Producto
+from .serializers import FilaMenuSerializer
+from .slugs import asignar_slugs, slug_base
+
+TAMANO_LOTE = 500
+MAX_ERRORES = 1000
+BLOQUE_LECTURA = 64 * 1024
+FORMATOS = ('csv', 'json')
+CAMPOS_PRODUCTO = ('nombre', 'descripcion', 'precio', 'activo', 'disponibilidad', 'orden', 'destacado')
+
+
+class ArchivoInvalido(ValueError):
+    """El archivo no se puede leer con el formato indicado."""
+
+
+def detectar_formato(nombre_archivo='', content_type=''):
+    """'csv' o 'json' según la extensión del archivo o el Content-Type; None si no se reconoce."""
+    nombre_archivo = (nombre_archivo or '').lower()
+    content_type = (content_type or '').lower()
+    if nombre_archivo.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if nombre_archivo.endswith(('.json', '.ndjson', '.jsonl')) or 'json' in content_type:
+        return 'json'
+    return None
+
+
+def leer_csv(archivo):
+    """Genera (numero_de_fila, dict) desde un archivo binario CSV con encabezado."""
+    lector = csv.DictReader(codecs.getreader('utf-8-sig')(archivo))
+    try:
+        for numero, fila in enumerate(lector, start=1):
+            # Las celdas vacías cuentan como columnas ausentes
+            yield numero, {
+                clave.strip(): valor.strip()
+                for clave, valor in fila.items()
+                if clave and isinstance(valor, str) and valor.strip()
+            }
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ArchivoInvalido(f"CSV inválido: {e}")
+
+
+def leer_json(archivo):
+    """
+    Genera (numero_de_fila, objeto) desde un array JSON o NDJSON sin cargar
+    el archivo completo: se decodifica un objeto cada vez sobre un buffer.
+    """
+    decoder = json.JSONDecoder()
+    lector = codecs.getreader('utf-8-sig')(archivo)
+    buffer = ''
+    en_array = None
+    numero = 0
+    fin = False
+    while not fin:
+        try:
+            bloque = lector.read(BLOQUE_LECTURA)
+        except UnicodeDecodeError as e:
+            raise ArchivoInvalido(f"JSON inválido: {e}")
+        fin = not bloque
+        buffer += bloque
+        while True:
+            buffer = buffer.lstrip()
+            if en_array is None:
+                if not buffer:
+                    break
+                en_array = buffer.startswith('[')
+                if en_array:
+                    buffer = buffer[1:]
+                continue
+            if en_array and buffer.startswith(','):
+                buffer = buffer[1:]
+                continue
+            if en_array and buffer.startswith(']'):
+                return
+            if not buffer:
+                break
+            try:
+                objeto, posicion = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                if fin:
+                    raise ArchivoInvalido(f"JSON inválido cerca de la fila {numero + 1}: {e.msg}")
+                break  # El objeto está incompleto: leer otro bloque
+            buffer = buffer[posicion:]
+            numero += 1
+            yield numero, objeto
+    if en_array:
+        raise ArchivoInvalido("JSON inválido: falta el ']' final.")
+
+
+LECTORES = {'csv': leer_csv, 'json': leer_json}
+
+
+def en_lotes(filas, tamano):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class ImportacionMenu:
+    """Acumula el resultado de importar un archivo en un restaurante."""
+
+    def __init__(self, restaurante, tamano_lote=TAMANO_LOTE):
+        self.restaurante = restaurante
+        self.tamano_lote = tamano_lote
+        self.filas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.categorias_creadas = 0
+        self.errores = []
+        self.errores_omitidos = 0
+        self.error_archivo = None
+        # Slugs ya vistos en el archivo, para detectar productos repetidos entre lotes
+        self.slugs_vistos = set()
+
+    def error(self, numero, detalle):
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'fila': numero, 'errores': detalle})
+        else:
+            self.errores_omitidos += 1
+
+    def importar(self, archivo, formato):
+        try:
+            for lote in en_lotes(LECTORES[formato](archivo), self.tamano_lote):
+                self.procesar_lote(lote)
+        except ArchivoInvalido as e:
+            # Los lotes anteriores ya quedaron guardados; se informa dónde se cortó la lectura
+            self.error_archivo = str(e)
+        return self.resultado()
+
+    def validar(self, lote):
+        validas = []
+        max_slug = Producto._meta.get_field('slug').max_length
+        for numero, datos in lote:
+            self.filas += 1
+            if not isinstance(datos, dict):
+                self.error(numero, {'non_field_errors': ['Cada fila debe ser un objeto.']})
+                continue
+            serializer = FilaMenuSerializer(data=datos)
+            if not serializer.is_valid():
+                self.error(numero, serializer.errors)
+                continue
+            fila = serializer.validated_data
+            slug = fila.get('slug') or slug_base(fila['nombre'], max_slug, '')
+            if not slug:
+                self.error(numero, {'slug': ['No se pudo generar un slug a partir del nombre.']})
+                continue
+            if slug in self.slugs_vistos:
+                self.error(numero, {'slug': [f"Producto repetido en el archivo: {slug}."]})
+                continue
+            self.slugs_vistos.add(slug)
+            fila['slug'] = slug
+            validas.append(fila)
+        return validas
+
+    def categorias_del_lote(self, nombres):
+        """Categorías del restaurante por nombre, creando las que falten."""
+        categorias = {}
+        for categoria in Categoria.objects.filter(restaurante=self.restaurante, nombre__in=nombres).order_by('id'):
+            categorias.setdefault(categoria.nombre, categoria)
+        nuevas = [
+            Categoria(restaurante=self.restaurante, nombre=nombre)
+            for nombre in sorted(nombres - categorias.keys())
+        ]
+        if nuevas:
+            asignar_slugs(nuevas)
+            Categoria.objects.bulk_create(nuevas)
+            self.categorias_creadas += len(nuevas)
+            for categoria in Categoria.objects.filter(restaurante=self.restaurante, nombre__in=[c.nombre for c in nuevas]):
+                categorias.setdefault(categoria.nombre, categoria)
+        return categorias
+
+    def procesar_lote(self, lote):
+        filas = self.validar(lote)
+        if not filas:
+            return
+        with transaction.atomic():
+            categorias = self.categorias_del_lote({fila['categoria'] for fila in filas})
+            existentes = {
+                producto.slug: producto
+                for producto in Producto.objects.filter(
+                    restaurante=self.restaurante, slug__in=[fila['slug'] for fila in filas]
+                )
+            }
+            ahora = timezone.now()
+            nuevos, modificados, campos = [], [], {'categoria', 'updated_at'}
+            for fila in filas:
+                producto = existentes.get(fila['slug'])
+                if producto is None:
+                    producto = Producto(restaurante=self.restaurante, slug=fila['slug'])
+                    nuevos.append(producto)
+                else:
+                    modificados.append(producto)
+                    campos.update(campo for campo in CAMPOS_PRODUCTO if campo in fila)
+                producto.categoria = categorias[fila['categoria']]
+                producto.updated_at = ahora
+                for campo in CAMPOS_PRODUCTO:
+                    if campo in fila:
+                        setattr(producto, campo, fila[campo])
+
+            Producto.objects.bulk_create(nuevos)
+            Producto.objects.bulk_update(modificados, sorted(campos))
+            self.creados += len(nuevos)
+            self.actualizados += len(modificados)
+
+            ids = list(
+                Producto.objects.filter(restaurante=self.restaurante, slug__in=[fila['slug'] for fila in filas])
+                .values_list('id', flat=True)
+            )
+            obtener_backend().indexar(ids)
+            invalidar_menu(self.restaurante.id)
+
+    def resultado(self):
+        return {
+            'filas': self.filas,
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'categorias_creadas': self.categorias_creadas,
+            'errores': self.errores,
+            'errores_omitidos': self.errores_omitidos,
+            'error_archivo': self.error_archivo,
+        }
+
+
+def importar_menu(restaurante, archivo, formato, tamano_lote=TAMANO_LOTE):
+    """Importa un archivo binario (CSV o JSON) al menú del restaurante y devuelve el informe."""
+    if formato not in FORMATOS:
+        raise ArchivoInvalido(f"Formato no soportado: {formato}.")
+    return ImportacionMenu(restaurante, tamano_lote).importar(archivo, formato)
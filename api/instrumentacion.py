@@ -0,0 +1,243 @@
+"""
+Instrumentación por petición: consultas SQL, tiempo de base de datos,
+consultas repetidas (posibles N+1), tiempo de serialización y tiempo total.
+
+InstrumentacionMiddleware abre una Medicion por petición muestreada y la deja
+en un ContextVar. Un execute_wrapper instalado en cada conexión (ver
+instalar_en_conexiones) cuenta y cronometra todas las consultas que se hacen
+mientras la medición está activa; como el ContextVar se copia al pasar por
+sync_to_async, también cuenta las de las vistas async (async_views.en_hilo).
+
+Los serializadores con SerializacionMedida suman su tiempo a 'ser' (incluye
+las consultas perezosas que disparen, que también cuentan en 'db'). Cualquier
+otro tramo se puede medir con `with medir('nombre'):`.
+
+Al terminar se añade la cabecera Server-Timing (visible en las herramientas de
+desarrollo del navegador) y se emite un registro en el logger
+'api.instrumentacion' con las métricas en `extra`; si una misma consulta se
+repite INSTRUMENTACION_UMBRAL_N1 veces o más, el registro es un WARNING con
+las firmas repetidas.
+
+Settings opcionales:
+- INSTRUMENTACION_MUESTREO: fracción de peticiones medidas, de 0 a 1 (por defecto 1).
+- INSTRUMENTACION_CABECERA: añade Server-Timing a la respuesta: True (por
+  defecto), False o 'staff' (solo si el usuario autenticado es staff; las
+  cifras revelan detalles internos a cualquier cliente).
+- INSTRUMENTACION_UMBRAL_N1: repeticiones de una consulta para avisar (por defecto 5).
+
+En las respuestas en streaming solo se mide hasta que la vista devuelve la
+respuesta; las consultas que se hagan al recorrer el stream no se cuentan.
+"""
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+MAX_FIRMAS_LOG = 5
+LARGO_FIRMA_LOG = 300
+
+_medicion_actual = ContextVar('medicion_instrumentacion', default=None)
+
+# IN (%s, %s, ...) con distinto número de parámetros es la misma consulta
+_LISTA_PARAMETROS = re.compile(r'\((?:%s,\s*)+%s\)')
+
+
+def firma_sql(sql):
+    return _LISTA_PARAMETROS.sub('(%s, ...)', sql)
+
+
+class Medicion:
+    """Métricas acumuladas durante una petición."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.firmas = Counter()
+        self.segmentos = {}
+        self.serializando = False
+
+    def registrar_consulta(self, sql, duracion):
+        self.consultas += 1
+        self.tiempo_db += duracion
+        self.firmas[firma_sql(sql)] += 1
+
+    def sumar(self, nombre, duracion):
+        self.segmentos[nombre] = self.segmentos.get(nombre, 0.0) + duracion
+
+    @property
+    def repetidas(self):
+        """Firmas ejecutadas más de una vez, de más a menos repetida."""
+        return [(firma, veces) for firma, veces in self.firmas.most_common() if veces > 1]
+
+
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+@contextmanager
+def medir(nombre):
+    """Suma la duración del bloque al segmento 'nombre' de la petición en curso (si se está midiendo)."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar(nombre, time.perf_counter() - inicio)
+
+
+class SerializacionMedida:
+    """
+    Mixin para serializadores: suma el tiempo de to_representation() al
+    segmento 'ser'. Solo cuenta el serializador más externo, así los anidados
+    (y cada elemento de un many=True) no se cuentan dos veces.
+    """
+
+    def to_representation(self, instance):
+        medicion = _medicion_actual.get()
+        if medicion is None or medicion.serializando:
+            return super().to_representation(instance)
+        medicion.serializando = True
+        inicio = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            medicion.serializando = False
+            medicion.sumar('ser', time.perf_counter() - inicio)
+
+
+def _contar_consulta(execute, sql, params, many, context):
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+def _instalar(connection, **kwargs):
+    if _contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_contar_consulta)
+
+
+def instalar_en_conexiones():
+    """Instala el contador en las conexiones abiertas y en las que se abran después (en cualquier hilo)."""
+    connection_created.connect(_instalar, dispatch_uid='api.instrumentacion')
+    for conexion in connections.all(initialized_only=True):
+        _instalar(conexion)
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 2)
+
+
+def server_timing(medicion, total):
+    partes = [
+        f'db;dur={_ms(medicion.tiempo_db)};desc="{medicion.consultas} consultas"',
+    ]
+    repetidas = sum(veces - 1 for _, veces in medicion.repetidas)
+    if repetidas:
+        partes.append(f'dup;desc="{repetidas} consultas repetidas"')
+    for nombre, duracion in medicion.segmentos.items():
+        partes.append(f'{nombre};dur={_ms(duracion)}')
+    partes.append(f'total;dur={_ms(total)}')
+    return ', '.join(partes)
+
+
+class InstrumentacionMiddleware:
+    """Mide cada petición muestreada (síncrona o async) y publica las métricas."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'INSTRUMENTACION_MUESTREO', 1.0)
+        self.cabecera = getattr(settings, 'INSTRUMENTACION_CABECERA', True)
+        self.umbral_n1 = getattr(settings, 'INSTRUMENTACION_UMBRAL_N1', 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instalar_en_conexiones()
+
+    def muestreada(self):
+        return self.muestreo >= 1 or random.random() < self.muestreo
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.muestreada():
+            return self.get_response(request)
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        self.publicar(request, response, medicion)
+        return response
+
+    async def __acall__(self, request):
+        if not self.muestreada():
+            return await self.get_response(request)
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        self.publicar(request, response, medicion)
+        return response
+
+    def publicar(self, request, response, medicion):
+        total = time.perf_counter() - medicion.inicio
+        if self.cabecera == 'staff':
+            # DRF deja en la petición de Django el usuario autenticado por JWT
+            usuario = getattr(request, 'user', None)
+            mostrar = usuario is not None and usuario.is_staff
+        else:
+            mostrar = bool(self.cabecera)
+        if mostrar:
+            response['Server-Timing'] = server_timing(medicion, total)
+
+        repetidas = medicion.repetidas
+        sospechosas = [(firma, veces) for firma, veces in repetidas if veces >= self.umbral_n1]
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else None
+        datos = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': vista,
+            'status': response.status_code,
+            'consultas': medicion.consultas,
+            'db_ms': _ms(medicion.tiempo_db),
+            'total_ms': _ms(total),
+            'segmentos_ms': {nombre: _ms(duracion) for nombre, duracion in medicion.segmentos.items()},
+            'consultas_repetidas': sum(veces - 1 for _, veces in repetidas),
+            'firmas_repetidas': [
+                {'sql': firma[:LARGO_FIRMA_LOG], 'veces': veces} for firma, veces in repetidas[:MAX_FIRMAS_LOG]
+            ],
+        }
+        nivel = logging.WARNING if sospechosas else logging.INFO
+        logger.log(
+            nivel, "%s %s (%s) -> %s: %d consultas, %.1f ms en db, %.1f ms en total%s",
+            request.method, request.path, vista, response.status_code, medicion.consultas,
+            datos['db_ms'], datos['total_ms'],
+            f"; posible N+1 ({sospechosas[0][1]}x la misma consulta)" if sospechosas else '',
+            extra={'instrumentacion': datos},
+        )
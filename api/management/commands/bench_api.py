@@ -0,0 +1,296 @@
+import json
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import urls as api_urls
+from api.datos_prueba import sembrar
+from api.models import Restaurante, Orden, Categoria, Producto
+
+from .bench_async import logs_silenciados, percentil
+
+# Endpoints que no se pueden medir con peticiones sueltas
+EXCLUIDOS = {
+    'async_eventos_ordenes': 'stream SSE sin fin',
+}
+# Parámetros de consulta necesarios para que el endpoint haga su trabajo
+QUERY_STRINGS = {
+    'buscar_productos_global': 'q=producto',
+    'buscar_productos_restaurante': 'q=producto',
+}
+# Cabeceras de respuesta de InstrumentacionMiddleware
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) consultas"')
+
+
+class ClienteDjango:
+    """Peticiones en el mismo proceso con el cliente de pruebas (un Client por hilo)."""
+
+    def __init__(self, cabeceras):
+        self.cabeceras = cabeceras
+        self.locales = threading.local()
+
+    def get(self, ruta):
+        if not hasattr(self.locales, 'cliente'):
+            self.locales.cliente = Client(headers=self.cabeceras)
+        respuesta = self.locales.cliente.get(ruta)
+        cuerpo = b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+        return respuesta.status_code, len(cuerpo), respuesta.get('Server-Timing', '')
+
+
+class ClienteHTTP:
+    """Peticiones reales contra un servidor en marcha (runserver, gunicorn, uvicorn...)."""
+
+    def __init__(self, base, cabeceras):
+        self.base = base.rstrip('/')
+        self.cabeceras = cabeceras
+
+    def get(self, ruta):
+        peticion = urllib.request.Request(self.base + ruta, headers=self.cabeceras)
+        try:
+            with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+                return respuesta.status, len(respuesta.read()), respuesta.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as e:
+            return e.code, len(e.read()), e.headers.get('Server-Timing', '')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide todos los endpoints GET de api/urls.py con clientes concurrentes: "
+        "req/s, latencia p50/p95/p99, consultas SQL por petición y tamaño de respuesta. "
+        "Por defecto siembra una base de datos de prueba temporal y usa el cliente de "
+        "pruebas de Django; con --servidor mide un servidor en marcha con los datos de la "
+        "base de datos configurada. Los resultados en JSON se pueden comparar entre ejecuciones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones por endpoint')
+        parser.add_argument('--concurrencia', type=int, default=8, help='Clientes simultáneos')
+        parser.add_argument('--filtro', help='Regex sobre el nombre de la URL para medir solo algunos endpoints')
+        parser.add_argument('--servidor', help='URL base de un servidor en marcha, p. ej. http://127.0.0.1:8000')
+        parser.add_argument('--restaurantes', type=int, default=5)
+        parser.add_argument('--productos', type=int, default=100, help='Productos por restaurante')
+        parser.add_argument('--ordenes', type=int, default=500, help='Órdenes por restaurante')
+        parser.add_argument('--items', type=int, default=4, help='Máximo de líneas por orden')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--json', dest='salida_json', help='Ruta donde guardar los resultados en JSON')
+        parser.add_argument('--comparar', help='JSON de una ejecución anterior con la que comparar')
+        parser.add_argument(
+            '--umbral', type=float, default=10.0,
+            help='Porcentaje de aumento del p95 a partir del cual se marca una regresión',
+        )
+        parser.add_argument(
+            '--fallar-si-empeora', action='store_true',
+            help='Termina con error si hay regresiones respecto a --comparar (útil en CI)',
+        )
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar']) as f:
+                anterior = json.load(f)
+
+        if options['servidor']:
+            resultados = self.ejecutar(options)
+        else:
+            nombre_original = connection.settings_dict['NAME']
+            # Igual que el runner de tests: permite el host 'testserver' del cliente de pruebas
+            setup_test_environment()
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.stdout.write("Sembrando datos...")
+                self.sembrar(options)
+                # Todas las peticiones medidas, con las métricas en la cabecera Server-Timing
+                with override_settings(INSTRUMENTACION_MUESTREO=1.0, INSTRUMENTACION_CABECERA=True):
+                    resultados = self.ejecutar(options)
+            finally:
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+                teardown_test_environment()
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w') as f:
+                json.dump(resultados, f, indent=2, default=str)
+            self.stdout.write(f"Resultados guardados en {options['salida_json']}")
+
+        if anterior is not None:
+            regresiones = self.comparar(anterior, resultados, options['umbral'], todos=not options['filtro'])
+            if regresiones and options['fallar_si_empeora']:
+                raise CommandError(f"Regresiones en: {', '.join(regresiones)}")
+
+    def sembrar(self, options):
+        inicio = time.perf_counter()
+        sembrar(
+            restaurantes=options['restaurantes'], productos=options['productos'],
+            ordenes=options['ordenes'], items=options['items'], semilla=options['semilla'],
+        )
+        self.stdout.write(f"  listo en {time.perf_counter() - inicio:.1f}s")
+
+    def parametros_url(self):
+        """Valores para los parámetros de las URLs, tomados del restaurante con más órdenes."""
+        restaurante = (
+            Restaurante.objects.annotate(n_ordenes=Count('ordenes')).order_by('-n_ordenes', 'id').first()
+        )
+        if restaurante is None:
+            raise CommandError("No hay restaurantes en la base de datos.")
+        orden = Orden.objects.filter(restaurante=restaurante).order_by('-id').first()
+        categoria = Categoria.objects.filter(restaurante=restaurante, productos__isnull=False).first()
+        producto = Producto.objects.filter(categoria=categoria).first() if categoria else None
+        valores = {
+            'slug': restaurante.slug,
+            'restaurante_slug': restaurante.slug,
+            'pk': orden.pk if orden else None,
+            'orden_id': orden.pk if orden else None,
+            'categoria_id': categoria.pk if categoria else None,
+            'producto_id': producto.pk if producto else None,
+            'product_id': producto.pk if producto else None,
+            'red_social_id': restaurante.redes_sociales.values_list('id', flat=True).first(),
+            'metodo_pago_id': restaurante.metodos_pago.values_list('id', flat=True).first(),
+            'envio_id': restaurante.envios.values_list('id', flat=True).first(),
+            'recurso': 'productos',
+        }
+        por_nombre = {'restaurante_detail_by_pk': {'pk': restaurante.pk}}
+        return restaurante, valores, por_nombre
+
+    def endpoints(self, options):
+        """(nombre, ruta) de cada URL de api/urls.py, o (nombre, None, motivo) si no se puede medir."""
+        restaurante, valores, por_nombre = self.parametros_url()
+        filtro = re.compile(options['filtro']) if options['filtro'] else None
+        for patron in api_urls.urlpatterns:
+            nombre = patron.name
+            if filtro and not filtro.search(nombre):
+                continue
+            if nombre in EXCLUIDOS:
+                yield nombre, None, EXCLUIDOS[nombre]
+                continue
+            kwargs = {
+                parametro: por_nombre.get(nombre, {}).get(parametro, valores.get(parametro))
+                for parametro in patron.pattern.converters
+            }
+            faltantes = [parametro for parametro, valor in kwargs.items() if valor is None]
+            if faltantes:
+                yield nombre, None, f"sin datos para {', '.join(faltantes)}"
+                continue
+            ruta = reverse(nombre, kwargs=kwargs)
+            if nombre in QUERY_STRINGS:
+                ruta = f'{ruta}?{QUERY_STRINGS[nombre]}'
+            yield nombre, ruta, None
+
+    def ejecutar(self, options):
+        restaurante, _, _ = self.parametros_url()
+        token = str(AccessToken.for_user(restaurante.propietario))
+        cabeceras = {'Authorization': f'Bearer {token}'}
+        if options['servidor']:
+            cliente = ClienteHTTP(options['servidor'], cabeceras)
+        else:
+            cliente = ClienteDjango(cabeceras)
+
+        resultados = {
+            'fecha': timezone.now().isoformat(),
+            'parametros': options,
+            'endpoints': {},
+            'omitidos': {},
+        }
+        self.stdout.write(
+            f"{'endpoint':<52} {'status':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'consultas':>9} {'KB':>8}"
+        )
+        with logs_silenciados('api.instrumentacion', 'django.request'):
+            for nombre, ruta, motivo in self.endpoints(options):
+                if ruta is not None:
+                    # Calentamiento: snapshots, cachés y conexiones; descarta los endpoints sin GET
+                    codigo, _, _ = cliente.get(ruta)
+                    if codigo == 405:
+                        motivo = 'no admite GET'
+                if motivo:
+                    resultados['omitidos'][nombre] = motivo
+                    continue
+                medida = self.medir(cliente, ruta, options)
+                resultados['endpoints'][nombre] = medida
+                self.stdout.write(
+                    f"{nombre:<52} {medida['status']:>6} {medida['req_s']:>8.1f} {medida['p50']:>8.2f} "
+                    f"{medida['p95']:>8.2f} {medida['p99']:>8.2f} {self.formato(medida['consultas']):>9} "
+                    f"{medida['bytes'] / 1024:>8.1f}"
+                )
+        for nombre, motivo in resultados['omitidos'].items():
+            self.stdout.write(f"  omitido {nombre}: {motivo}")
+        return resultados
+
+    @staticmethod
+    def formato(valor):
+        return '-' if valor is None else f'{valor:g}'
+
+    def medir(self, cliente, ruta, options):
+        def peticion(_):
+            inicio = time.perf_counter()
+            codigo, tamano, server_timing = cliente.get(ruta)
+            return (time.perf_counter() - inicio) * 1000, codigo, tamano, _SERVER_TIMING_DB.search(server_timing)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+            medidas = list(pool.map(peticion, range(options['peticiones'])))
+        duracion = time.perf_counter() - inicio
+
+        tiempos = [ms for ms, _, _, _ in medidas]
+        codigos = [codigo for _, codigo, _, _ in medidas]
+        db = [match for _, _, _, match in medidas if match]
+        return {
+            'ruta': ruta,
+            'status': statistics.mode(codigos),
+            'errores': sum(1 for codigo in codigos if codigo >= 400),
+            'req_s': len(medidas) / duracion if duracion else 0,
+            'media': statistics.fmean(tiempos),
+            'p50': statistics.median(tiempos),
+            'p95': percentil(tiempos, 95),
+            'p99': percentil(tiempos, 99),
+            # Sin la cabecera Server-Timing (servidor sin instrumentación) no hay consultas
+            'consultas': statistics.median(int(match.group(2)) for match in db) if db else None,
+            'db_ms_p50': statistics.median(float(match.group(1)) for match in db) if db else None,
+            'bytes': statistics.median(tamano for _, _, tamano, _ in medidas),
+        }
+
+    def comparar(self, anterior, actual, umbral, todos=True):
+        """Imprime las diferencias con una ejecución anterior y devuelve los endpoints que empeoraron."""
+        self.stdout.write(f"\nComparación con la ejecución del {anterior.get('fecha', '?')}:")
+        self.stdout.write(f"{'endpoint':<52} {'p50':>9} {'p95':>9} {'consultas':>11} {'bytes':>9}")
+        regresiones = []
+        for nombre, medida in actual['endpoints'].items():
+            previa = anterior.get('endpoints', {}).get(nombre)
+            if previa is None:
+                self.stdout.write(f"{nombre:<52} (nuevo)")
+                continue
+            delta_p50 = self.variacion(previa['p50'], medida['p50'])
+            delta_p95 = self.variacion(previa['p95'], medida['p95'])
+            delta_bytes = self.variacion(previa['bytes'], medida['bytes'])
+            if medida['consultas'] is None or previa.get('consultas') is None:
+                delta_consultas = '-'
+                mas_consultas = False
+            else:
+                delta_consultas = f"{medida['consultas'] - previa['consultas']:+g}"
+                mas_consultas = medida['consultas'] > previa['consultas']
+            empeora = mas_consultas or delta_p95 > umbral
+            if empeora:
+                regresiones.append(nombre)
+            self.stdout.write(
+                f"{nombre:<52} {delta_p50:>+8.1f}% {delta_p95:>+8.1f}% {delta_consultas:>11} {delta_bytes:>+8.1f}%"
+                + ('  <- regresión' if empeora else '')
+            )
+        for nombre in anterior.get('endpoints', {}) if todos else ():
+            if nombre not in actual['endpoints']:
+                self.stdout.write(f"{nombre:<52} (no medido en esta ejecución)")
+        return regresiones
+
+    @staticmethod
+    def variacion(antes, despues):
+        return (despues - antes) / antes * 100 if antes else 0.0
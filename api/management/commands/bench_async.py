@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.datos_prueba import sembrar
+from api.models import Orden
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+@contextmanager
+def logs_silenciados(*nombres):
+    """Evita escribir un registro por petición mientras se mide."""
+    loggers = [logging.getLogger(nombre) for nombre in nombres]
+    niveles = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        for logger, nivel in zip(loggers, niveles):
+            logger.setLevel(nivel)
+
+
+@contextmanager
+def latencia_db(segundos):
+    """Simula una base de datos remota añadiendo una espera a cada consulta (en todas las conexiones)."""
+    if not segundos:
+        yield
+        return
+
+    def esperar(execute, sql, params, many, context):
+        time.sleep(segundos)
+        return execute(sql, params, many, context)
+
+    # Las conexiones de los hilos del benchmark se crean después: se instala en cada una al conectarse
+    from django.db.backends.signals import connection_created
+
+    def instalar(sender, connection, **kwargs):
+        connection.execute_wrappers.append(esperar)
+
+    connection_created.connect(instalar)
+    for conexion in connections.all(initialized_only=True):
+        conexion.execute_wrappers.append(esperar)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(instalar)
+        for conexion in connections.all(initialized_only=True):
+            if esperar in conexion.execute_wrappers:
+                conexion.execute_wrappers.remove(esperar)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el rendimiento de los endpoints públicos de lectura en su versión WSGI "
+        "(vistas DRF síncronas, atendidas por un pool de hilos) y ASGI (vistas async bajo "
+        "el prefijo async/, atendidas por un event loop) con clientes concurrentes, sobre "
+        "una base de datos de prueba temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=400, help='Peticiones por endpoint y modo')
+        parser.add_argument('--concurrencia', type=int, default=32, help='Clientes simultáneos')
+        parser.add_argument('--hilos-wsgi', type=int, default=8, help='Hilos del "servidor" WSGI simulado')
+        parser.add_argument('--latencia-db', type=float, default=0.0, help='Milisegundos extra por consulta')
+        parser.add_argument(
+            '--latencia-cliente', type=float, default=0.0,
+            help='Milisegundos que un cliente lento tarda en recibir cada respuesta (ocupa el hilo en WSGI)',
+        )
+        parser.add_argument('--restaurantes', type=int, default=5)
+        parser.add_argument('--productos', type=int, default=100, help='Productos por restaurante')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--json', dest='salida_json', help='Ruta donde guardar los resultados en JSON')
+
+    def handle(self, *args, **options):
+        nombre_original = connection.settings_dict['NAME']
+        # Igual que el runner de tests: permite el host 'testserver' de los clientes de prueba
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            resultados = self.ejecutar(options)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w') as f:
+                json.dump(resultados, f, indent=2, default=str)
+            self.stdout.write(f"Resultados guardados en {options['salida_json']}")
+
+    def ejecutar(self, options):
+        restaurantes = sembrar(
+            restaurantes=options['restaurantes'], productos=options['productos'],
+            ordenes=20, semilla=options['semilla'],
+        )
+        restaurante = restaurantes[0]
+        orden = Orden.objects.filter(restaurante=restaurante).first()
+        token = str(AccessToken.for_user(restaurante.propietario))
+        # (nombre, ruta WSGI, ruta ASGI)
+        endpoints = [
+            ('restaurante_detail', f'/api/restaurantes/{restaurante.slug}/', f'/api/async/restaurantes/{restaurante.slug}/'),
+            ('productos', f'/api/restaurantes/{restaurante.slug}/productos/', f'/api/async/restaurantes/{restaurante.slug}/productos/'),
+            ('menu', f'/api/restaurantes/{restaurante.slug}/menu/', f'/api/async/restaurantes/{restaurante.slug}/menu/'),
+            ('orden_detail', f'/api/ordenes/{orden.pk}/', f'/api/async/ordenes/{orden.pk}/'),
+        ]
+        cabeceras = {'Authorization': f'Bearer {token}'}
+
+        # Calentamiento: construye los snapshots del menú antes de medir
+        cliente = Client(headers=cabeceras)
+        for _, ruta_wsgi, _ in endpoints:
+            cliente.get(ruta_wsgi)
+
+        resultados = {'parametros': options, 'endpoints': {}}
+        self.stdout.write(
+            f"{'endpoint':<20} {'modo':<5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}"
+        )
+        with latencia_db(options['latencia_db'] / 1000), logs_silenciados('api.instrumentacion', 'django.request'):
+            for nombre, ruta_wsgi, ruta_asgi in endpoints:
+                medidas = {
+                    'wsgi': self.medir_wsgi(ruta_wsgi, cabeceras, options),
+                    'asgi': asyncio.run(self.medir_asgi(ruta_asgi, cabeceras, options)),
+                }
+                resultados['endpoints'][nombre] = medidas
+                for modo, medida in medidas.items():
+                    self.stdout.write(
+                        f"{nombre:<20} {modo:<5} {medida['req_s']:>9.1f} {medida['p50']:>9.2f} "
+                        f"{medida['p95']:>9.2f} {medida['p99']:>9.2f} {medida['errores']:>8}"
+                    )
+        return resultados
+
+    def resumen(self, tiempos, errores, duracion):
+        return {
+            'req_s': len(tiempos) / duracion if duracion else 0,
+            'p50': statistics.median(tiempos),
+            'p95': percentil(tiempos, 95),
+            'p99': percentil(tiempos, 99),
+            'errores': errores,
+        }
+
+    def medir_wsgi(self, ruta, cabeceras, options):
+        """
+        Simula un servidor WSGI con --hilos-wsgi hilos: 'concurrencia' clientes
+        compiten por ellos y cada petición ocupa un hilo hasta terminar. La
+        latencia incluye la espera por un hilo libre, como la ve el cliente.
+        """
+        hilos_servidor = threading.BoundedSemaphore(options['hilos_wsgi'])
+
+        def peticion(_):
+            cliente = Client(headers=cabeceras)
+            inicio = time.perf_counter()
+            with hilos_servidor:
+                respuesta = cliente.get(ruta)
+                # Un cliente lento mantiene ocupado el hilo del worker mientras recibe la respuesta
+                time.sleep(options['latencia_cliente'] / 1000)
+            return (time.perf_counter() - inicio) * 1000, respuesta.status_code
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+            medidas = list(pool.map(peticion, range(options['peticiones'])))
+        duracion = time.perf_counter() - inicio
+        errores = sum(1 for _, codigo in medidas if codigo != 200)
+        return self.resumen([ms for ms, _ in medidas], errores, duracion)
+
+    async def medir_asgi(self, ruta, cabeceras, options):
+        """Todas las peticiones en un único event loop, con 'concurrencia' clientes a la vez."""
+        cliente = AsyncClient()
+        semaforo = asyncio.Semaphore(options['concurrencia'])
+
+        async def peticion():
+            async with semaforo:
+                inicio = time.perf_counter()
+                respuesta = await cliente.get(ruta, headers=cabeceras)
+                # En ASGI la espera del cliente lento no bloquea el event loop
+                await asyncio.sleep(options['latencia_cliente'] / 1000)
+                return (time.perf_counter() - inicio) * 1000, respuesta.status_code
+
+        inicio = time.perf_counter()
+        medidas = await asyncio.gather(*(peticion() for _ in range(options['peticiones'])))
+        duracion = time.perf_counter() - inicio
+        errores = sum(1 for _, codigo in medidas if codigo != 200)
+        return self.resumen([ms for ms, _ in medidas], errores, duracion)
@@ -0,0 +1,127 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from api.datos_prueba import sembrar
+from api.models import Orden, Producto, Categoria
+
+
+# Modelos cuyos Meta.indexes (índices compuestos) se comparan
+MODELOS_CON_INDICES = (Orden, Producto, Categoria)
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra datos en una base de datos de prueba temporal y compara el plan de "
+        "consulta y el tiempo de las consultas más frecuentes sin y con los índices compuestos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurantes', type=int, default=20)
+        parser.add_argument('--productos', type=int, default=200, help='Productos por restaurante')
+        parser.add_argument('--ordenes', type=int, default=5000, help='Órdenes por restaurante')
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--json', dest='salida_json', help='Ruta donde guardar los resultados en JSON')
+
+    def handle(self, *args, **options):
+        # Trabajamos siempre sobre una base de datos de prueba desechable
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            resultados = self.ejecutar(options)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w') as f:
+                json.dump(resultados, f, indent=2, default=str)
+            self.stdout.write(f"Resultados guardados en {options['salida_json']}")
+
+    def ejecutar(self, options):
+        self.stdout.write("Sembrando datos...")
+        inicio = time.perf_counter()
+        restaurantes = sembrar(
+            restaurantes=options['restaurantes'],
+            productos=options['productos'],
+            ordenes=options['ordenes'],
+            semilla=options['semilla'],
+        )
+        self.stdout.write(f"  listo en {time.perf_counter() - inicio:.1f}s")
+
+        consultas = self.consultas(restaurantes[len(restaurantes) // 2])
+
+        self.cambiar_indices(crear=False)
+        antes = self.medir(consultas, options['repeticiones'])
+        self.cambiar_indices(crear=True)
+        despues = self.medir(consultas, options['repeticiones'])
+
+        self.stdout.write("")
+        self.stdout.write(f"{'consulta':<28} {'sin índices':>12} {'con índices':>12} {'mejora':>8}")
+        for nombre in consultas:
+            ms_antes, ms_despues = antes[nombre]['ms'], despues[nombre]['ms']
+            mejora = ms_antes / ms_despues if ms_despues else float('inf')
+            self.stdout.write(f"{nombre:<28} {ms_antes:>10.3f}ms {ms_despues:>10.3f}ms {mejora:>7.1f}x")
+        for etiqueta, medidas in (('SIN ÍNDICES', antes), ('CON ÍNDICES', despues)):
+            self.stdout.write(f"\n--- Planes {etiqueta} ---")
+            for nombre, medida in medidas.items():
+                self.stdout.write(f"[{nombre}]\n{medida['plan']}")
+
+        return {'parametros': options, 'sin_indices': antes, 'con_indices': despues}
+
+    def consultas(self, restaurante):
+        """Las consultas que hacen las vistas del dashboard y del menú."""
+        hoy = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        categoria = Categoria.objects.filter(restaurante=restaurante).first()
+        ordenes = Orden.objects.filter(restaurante=restaurante)
+        # nombre -> (queryset, forma de ejecutarlo)
+        return {
+            'ordenes_por_estado': (ordenes.filter(estado='pendiente').order_by(), 'count'),
+            'ordenes_recientes': (ordenes.order_by('-created_at', '-id')[:50], 'list'),
+            'ordenes_rango_fechas': (
+                ordenes.filter(created_at__gte=hoy - timedelta(days=7)).order_by('-created_at', '-id'), 'list'),
+            'ventas_estado_fecha': (
+                ordenes.filter(estado='entregada', created_at__gte=hoy - timedelta(days=30)).order_by(), 'sum'),
+            'menu_restaurante': (Producto.objects.filter(restaurante=restaurante).order_by('orden', 'nombre'), 'list'),
+            'productos_categoria': (Producto.objects.filter(categoria=categoria).order_by('orden', 'nombre'), 'list'),
+            'categorias_restaurante': (
+                Categoria.objects.filter(restaurante=restaurante).order_by('orden', 'nombre'), 'list'),
+        }
+
+    def medir(self, consultas, repeticiones):
+        resultados = {}
+        ejecutores = {
+            'count': lambda qs: qs.count(),
+            'sum': lambda qs: qs.aggregate(Sum('total')),
+            'list': list,
+        }
+        for nombre, (queryset, forma) in consultas.items():
+            tiempos = []
+            for _ in range(repeticiones):
+                # .all() crea un queryset nuevo para no reutilizar la caché de resultados
+                inicio = time.perf_counter()
+                ejecutores[forma](queryset.all())
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nombre] = {
+                'ms': statistics.median(tiempos),
+                'plan': queryset.explain(),
+            }
+        return resultados
+
+    def cambiar_indices(self, crear):
+        with connection.schema_editor() as editor:
+            for model in MODELOS_CON_INDICES:
+                for index in model._meta.indexes:
+                    if crear:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+        # Actualizar las estadísticas del planificador tras el cambio
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
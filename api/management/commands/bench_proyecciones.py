@@ -0,0 +1,86 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from api.datos_prueba import GeneradorDatos
+from api.models import Restaurante, Producto
+from api.proyecciones import proyectar
+from api.serializers import RestauranteSerializer, ProductoClienteSerializer, ProductoSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara, en una base de datos de prueba, el tiempo de serializar los listados "
+        "con los ModelSerializer y con las proyecciones sobre values() (api/proyecciones.py). "
+        "Comprueba además que ambas salidas son idénticas byte a byte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurantes', type=int, default=1000)
+        parser.add_argument('--productos', type=int, default=1000, help='Productos del restaurante del menú')
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--json', dest='salida_json', help='Ruta donde guardar los resultados en JSON')
+
+    def handle(self, *args, **options):
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write("Sembrando datos...")
+            generador = GeneradorDatos(semilla=options['semilla'])
+            restaurantes = generador.restaurantes(options['restaurantes'], categorias=8)
+            generador.productos(restaurantes[:1], options['productos'])
+            menu = Producto.objects.filter(restaurante=restaurantes[0])
+            casos = [
+                ('restaurantes', RestauranteSerializer, Restaurante.objects.order_by('estado', 'slug')),
+                ('menu_cliente', ProductoClienteSerializer, menu),
+                ('menu_propietario', ProductoSerializer, menu),
+            ]
+            resultados = [self.medir(nombre, *caso, options['repeticiones']) for nombre, *caso in casos]
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        self.stdout.write(
+            f"{'listado':<18}{'filas':>8}{'serializer ms/1000':>20}{'proyección ms/1000':>20}{'mejora':>9}")
+        for r in resultados:
+            self.stdout.write(
+                f"{r['listado']:<18}{r['filas']:>8}{r['serializer_ms_1000']:>20.2f}"
+                f"{r['proyeccion_ms_1000']:>20.2f}{r['mejora']:>8.1f}x")
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w') as f:
+                json.dump(resultados, f, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['salida_json']}")
+
+    def medir(self, nombre, serializer_class, queryset, repeticiones):
+        """Mediana de 'repeticiones' ejecuciones (consulta + serialización + render) de cada variante."""
+        render = JSONRenderer().render
+        variantes = {
+            'serializer': lambda: render(serializer_class(queryset.all(), many=True).data),
+            'proyeccion': lambda: render(proyectar(serializer_class, queryset.all())),
+        }
+        salidas = {clave: funcion() for clave, funcion in variantes.items()}  # calentamiento
+        if salidas['serializer'] != salidas['proyeccion']:
+            raise CommandError(f"La proyección de {nombre} no coincide con {serializer_class.__name__}.")
+
+        filas = queryset.count()
+        tiempos = {}
+        for clave, funcion in variantes.items():
+            muestras = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                funcion()
+                muestras.append(time.perf_counter() - inicio)
+            tiempos[clave] = statistics.median(muestras) * 1000 * 1000 / max(filas, 1)
+        return {
+            'listado': nombre,
+            'filas': filas,
+            'bytes': len(salidas['serializer']),
+            'serializer_ms_1000': round(tiempos['serializer'], 2),
+            'proyeccion_ms_1000': round(tiempos['proyeccion'], 2),
+            'mejora': round(tiempos['serializer'] / tiempos['proyeccion'], 1),
+        }
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importacion import FORMATOS, TAMANO_LOTE, detectar_formato, importar_menu
+from api.models import Restaurante
+
+
+class Command(BaseCommand):
+    help = "Importa productos y categorías de un archivo CSV o JSON (array o NDJSON) al menú de un restaurante."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Slug del restaurante')
+        parser.add_argument('archivo', help='Ruta del archivo a importar')
+        parser.add_argument('--formato', choices=FORMATOS, help='Por defecto se deduce de la extensión')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por transacción')
+
+    def handle(self, *args, **options):
+        try:
+            restaurante = Restaurante.objects.get(slug=options['slug'])
+        except Restaurante.DoesNotExist:
+            raise CommandError(f"No existe el restaurante '{options['slug']}'.")
+        formato = options['formato'] or detectar_formato(options['archivo'])
+        if formato is None:
+            raise CommandError("No se reconoce el formato del archivo; usa --formato.")
+
+        with open(options['archivo'], 'rb') as archivo:
+            resultado = importar_menu(restaurante, archivo, formato, tamano_lote=options['lote'])
+
+        for error in resultado['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {error['errores']}")
+        if resultado['errores_omitidos']:
+            self.stderr.write(f"... y {resultado['errores_omitidos']} errores más.")
+        resumen = (
+            f"{resultado['filas']} filas: {resultado['creados']} productos creados, "
+            f"{resultado['actualizados']} actualizados, {resultado['categorias_creadas']} categorías nuevas, "
+            f"{len(resultado['errores']) + resultado['errores_omitidos']} con errores."
+        )
+        if resultado['error_archivo']:
+            raise CommandError(f"{resultado['error_archivo']} ({resumen})")
+        self.stdout.write(self.style.SUCCESS(resumen))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.busqueda import obtener_backend
+
+
+class Command(BaseCommand):
+    help = "Regenera el índice de búsqueda de productos a partir del catálogo actual."
+
+    def handle(self, *args, **options):
+        backend = obtener_backend()
+        backend.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Índice de búsqueda reconstruido ({type(backend).__name__})."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Restaurante
+from api.ventas import reconstruir_ventas_diarias
+
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen diario de ventas (VentaDiaria) a partir de las órdenes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help='Slugs de restaurantes (por defecto, todos)')
+
+    def handle(self, *args, **options):
+        restaurante_ids = None
+        if options['slugs']:
+            restaurante_ids = list(
+                Restaurante.objects.filter(slug__in=options['slugs']).values_list('id', flat=True)
+            )
+        reconstruir_ventas_diarias(restaurante_ids)
+        self.stdout.write(self.style.SUCCESS("Resumen de ventas reconstruido."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.imagenes import CAMPOS_IMAGEN, generar_variantes, necesita_variantes
+from api.models import Producto, Restaurante
+
+MODELOS = {'producto': Producto, 'restaurante': Restaurante}
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas y variantes WebP de imágenes de productos y logos de restaurantes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modelo', choices=sorted(MODELOS), help='Por defecto, ambos')
+        parser.add_argument('--todas', action='store_true', help='Regenerar también las que ya están al día')
+
+    def handle(self, *args, **options):
+        modelos = [options['modelo']] if options['modelo'] else sorted(MODELOS)
+        for modelo in modelos:
+            campo = CAMPOS_IMAGEN[modelo]
+            instancias = (
+                MODELOS[modelo].objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+                .only('pk', campo, f'{campo}_variantes')
+            )
+            total = 0
+            for instancia in instancias.iterator():
+                if options['todas'] or necesita_variantes(instancia):
+                    generar_variantes(modelo, instancia.pk)
+                    total += 1
+            self.stdout.write(self.style.SUCCESS(f"{modelo}: {total} imágenes procesadas."))
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.datos_prueba import GeneradorDatos
+from api.models import Restaurante, Producto, Orden, DetalleOrden
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos de prueba a escala (miles de restaurantes, cientos de miles de "
+        "productos, millones de órdenes) en la base de datos configurada, de forma "
+        "determinista a partir de una semilla. Si ya existen datos de la misma semilla "
+        "solo añade lo que falta hasta las cantidades pedidas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurantes', type=int, default=2000)
+        parser.add_argument('--categorias', type=int, default=8, help='Categorías por restaurante nuevo')
+        parser.add_argument('--productos', type=int, default=100, help='Productos por restaurante')
+        parser.add_argument('--ordenes', type=int, default=1000, help='Órdenes por restaurante')
+        parser.add_argument('--items', type=int, default=5, help='Máximo de líneas por orden (0: sin líneas)')
+        parser.add_argument('--dias', type=int, default=365, help='Días de historial de órdenes')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--prefijo', default='escala', help='Prefijo de los slugs de los restaurantes generados')
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por bulk_create')
+        parser.add_argument(
+            '--referencia',
+            help='Fecha-hora ISO desde la que se generan las órdenes hacia atrás (por defecto, la hora actual). '
+                 'Con la misma semilla y referencia los datos son idénticos.',
+        )
+        parser.add_argument(
+            '--sin-derivados', action='store_true',
+            help='No reconstruir el índice de búsqueda ni el resumen de ventas al terminar',
+        )
+
+    def handle(self, *args, **options):
+        referencia = None
+        if options['referencia']:
+            referencia = parse_datetime(options['referencia'])
+            if referencia is None:
+                raise CommandError("--referencia debe ser una fecha-hora ISO 8601.")
+            if timezone.is_naive(referencia):
+                referencia = timezone.make_aware(referencia)
+
+        generador = GeneradorDatos(
+            semilla=options['semilla'], prefijo=options['prefijo'], dias=options['dias'],
+            lote=options['lote'], referencia=referencia, salida=self.stdout.write,
+        )
+        self.stdout.write(f"Referencia de fechas: {generador.referencia.isoformat()}")
+        inicio = time.perf_counter()
+
+        self.stdout.write("Restaurantes...")
+        restaurantes = generador.restaurantes(options['restaurantes'], options['categorias'])
+        self.stdout.write("Productos...")
+        generador.productos(restaurantes, options['productos'])
+        self.stdout.write("Órdenes...")
+        try:
+            generador.ordenes(restaurantes, options['ordenes'], options['items'])
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+        if not options['sin_derivados']:
+            self.stdout.write("Datos derivados...")
+            generador.finalizar()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo en {time.perf_counter() - inicio:.1f}s. Totales en la base de datos: "
+            f"{Restaurante.objects.count()} restaurantes, {Producto.objects.count()} productos, "
+            f"{Orden.objects.count()} órdenes, {DetalleOrden.objects.count()} líneas."
+        ))
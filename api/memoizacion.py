@@ -0,0 +1,98 @@
+"""
+Memoización de objetos relacionados durante una misma respuesta.
+
+Al serializar una lista de órdenes (o de ítems) el mismo Restaurante,
+MetodoPago, Envio, Producto o Categoria aparece en muchas filas, y sin
+memoización se vuelve a serializar cada vez, con sus propias consultas para
+las relaciones inversas (tipos_cocina, redes_sociales...).
+
+MemoSerializacion vive en el contexto del serializador raíz (clave 'memo'),
+así que dura lo que dura la respuesta, y guarda:
+- la salida ya serializada de cada objeto por (serializador, modelo, pk);
+- un mapa de identidad (modelo, pk) -> instancia, para que cada fila
+  relacionada que no venga ya cargada se consulte una sola vez.
+
+Con MemoizadoMixin el coste de una lista crece con el número de objetos
+relacionados distintos, no con el número de filas. La salida de un objeto se
+comparte entre las filas que lo referencian: no debe modificarse después.
+
+Solo se memoizan los serializadores usados como campo de otro (una FK
+anidada); como raíz o como elemento de una lista se serializan normalmente,
+así una respuesta en streaming no acumula cada fila en la memo.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+class MemoSerializacion:
+    def __init__(self):
+        self.salidas = {}
+        self.objetos = {}
+        self.aciertos = 0
+
+    def objeto(self, model, pk):
+        """Instancia de model con esa pk, consultada como mucho una vez por respuesta."""
+        clave = (model, pk)
+        if clave not in self.objetos:
+            self.objetos[clave] = model._default_manager.filter(pk=pk).first()
+        return self.objetos[clave]
+
+
+def memo_de(context):
+    """La MemoSerializacion del contexto, creándola la primera vez."""
+    memo = context.get('memo')
+    if memo is None:
+        memo = context['memo'] = MemoSerializacion()
+    return memo
+
+
+class MemoizadoMixin:
+    """
+    Mixin para ModelSerializer usados como anidados (restaurante_details,
+    producto_details...). Reutiliza la salida de un objeto ya serializado en
+    la misma respuesta y, si la relación no viene cargada en la instancia
+    padre, la resuelve con el mapa de identidad en lugar de una consulta por fila.
+    """
+
+    def _clave(self, model, pk):
+        return (type(self), model, pk)
+
+    def _memoizable(self):
+        return self.parent is not None and not isinstance(self.parent, serializers.ListSerializer)
+
+    def get_attribute(self, instance):
+        campo = _clave_foranea(type(instance), self.source_attrs)
+        if campo is None or campo.is_cached(instance):
+            return super().get_attribute(instance)
+        pk = getattr(instance, campo.attname)
+        if pk is None:
+            return None
+        memo = memo_de(self.context)
+        model = campo.related_model
+        if self._clave(model, pk) in memo.salidas:
+            # Ya serializado: basta una referencia con la pk, sin consultar nada
+            return model(pk=pk)
+        return memo.objeto(model, pk)
+
+    def to_representation(self, instance):
+        pk = getattr(instance, 'pk', None)
+        if pk is None or not self._memoizable():
+            return super().to_representation(instance)
+        memo = memo_de(self.context)
+        clave = self._clave(type(instance), pk)
+        if clave in memo.salidas:
+            memo.aciertos += 1
+            return memo.salidas[clave]
+        salida = memo.salidas[clave] = super().to_representation(instance)
+        return salida
+
+
+def _clave_foranea(model, source_attrs):
+    """El ForeignKey/OneToOneField de model nombrado por source_attrs, o None."""
+    if len(source_attrs) != 1 or not hasattr(model, '_meta'):
+        return None
+    try:
+        campo = model._meta.get_field(source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    return campo if campo.many_to_one or (campo.one_to_one and campo.concrete) else None
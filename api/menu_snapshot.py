@@ -0,0 +1,76 @@
+"""
+Snapshots pre-serializados del menú de cada restaurante.
+
+Los endpoints públicos del menú devuelven siempre lo mismo hasta que cambia
+algún Producto o Categoria del restaurante, así que guardamos el JSON ya
+renderizado en MenuSnapshot y lo devolvemos tal cual. Las señales (ver
+signals.py) llaman a invalidar_menu() y el documento se reconstruye de forma
+perezosa en la siguiente lectura.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import MenuSnapshot, Producto
+from .proyecciones import proyectar
+from .serializers import ProductoClienteSerializer, ProductoSerializer
+
+# tipo de menú -> (campo del snapshot, serializador que genera el documento)
+TIPOS_MENU = {
+    'cliente': ('contenido_cliente', ProductoClienteSerializer),
+    'menu': ('contenido_menu', ProductoSerializer),
+}
+
+
+def _obtener_o_crear_snapshot(restaurante):
+    try:
+        return MenuSnapshot.objects.get(restaurante=restaurante)
+    except MenuSnapshot.DoesNotExist:
+        try:
+            with transaction.atomic():
+                return MenuSnapshot.objects.create(restaurante=restaurante)
+        except IntegrityError:
+            # Otra petición lo creó en paralelo
+            return MenuSnapshot.objects.get(restaurante=restaurante)
+
+
+def construir_menu(restaurante, tipo):
+    """Serializa el menú completo del restaurante y devuelve los bytes JSON."""
+    _, serializer_class = TIPOS_MENU[tipo]
+    productos = Producto.objects.filter(restaurante=restaurante)
+    # Proyección sobre values(): los mismos bytes que serializer_class(productos, many=True)
+    return JSONRenderer().render(proyectar(serializer_class, productos))
+
+
+def obtener_menu(restaurante, tipo):
+    """
+    Devuelve (contenido, snapshot) con el JSON del menú del restaurante.
+    Si el snapshot no existe o fue invalidado, lo reconstruye y lo guarda.
+    """
+    campo, _ = TIPOS_MENU[tipo]
+    snapshot = _obtener_o_crear_snapshot(restaurante)
+    contenido = getattr(snapshot, campo)
+    if contenido is not None:
+        return contenido.encode('utf-8'), snapshot
+
+    version_leida = snapshot.version
+    contenido = construir_menu(restaurante, tipo)
+    # Solo guardamos si nadie invalidó el snapshot mientras lo construíamos;
+    # si la versión cambió, devolvemos el contenido pero no lo persistimos.
+    MenuSnapshot.objects.filter(pk=snapshot.pk, version=version_leida).update(
+        **{campo: contenido.decode('utf-8')}
+    )
+    return contenido, snapshot
+
+
+def invalidar_menu(restaurante_id):
+    """Marca como obsoletos los menús del restaurante (no hace nada si no existe snapshot)."""
+    if restaurante_id is None:
+        return
+    MenuSnapshot.objects.filter(restaurante_id=restaurante_id).update(
+        version=F('version') + 1,
+        contenido_cliente=None,
+        contenido_menu=None,
+        updated_at=timezone.now(),
+    )
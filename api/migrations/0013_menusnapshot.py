@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-16 23:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_alter_producto_unique_together'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orden',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('en_camino', 'En Camino'), ('lista_retiro', 'Lista para Retiro'), ('entregada', 'Entregada'), ('cancelada', 'Cancelada')], default='pendiente', max_length=20, verbose_name='Estado de la Orden'),
+        ),
+        migrations.CreateModel(
+            name='MenuSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('contenido_cliente', models.TextField(blank=True, null=True)),
+                ('contenido_menu', models.TextField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('restaurante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='menu_snapshot', to='api.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Snapshot del Menú',
+                'verbose_name_plural': 'Snapshots de Menús',
+            },
+        ),
+    ]
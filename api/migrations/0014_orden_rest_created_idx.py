@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-16 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_menusnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['restaurante', '-created_at', '-id'], name='orden_rest_created_idx'),
+        ),
+    ]
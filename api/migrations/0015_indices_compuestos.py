@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-16 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_orden_rest_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['restaurante', 'orden', 'nombre'], name='categoria_rest_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(fields=['restaurante', 'estado', 'created_at'], name='orden_rest_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['restaurante', 'orden', 'nombre'], name='producto_rest_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', 'orden', 'nombre'], name='producto_cat_orden_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-16 23:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def poblar_ventas_diarias(apps, schema_editor):
+    # Resumen inicial a partir de las órdenes existentes (ver api/ventas.py)
+    Orden = apps.get_model('api', 'Orden')
+    VentaDiaria = apps.get_model('api', 'VentaDiaria')
+    filas = (
+        Orden.objects.annotate(fecha=TruncDate('created_at'))
+        .values('restaurante_id', 'fecha')
+        .order_by()
+        .annotate(
+            num_ordenes=Count('id'),
+            num_entregadas=Count('id', filter=Q(estado='entregada')),
+            ventas=Sum('total', filter=Q(estado='entregada')),
+        )
+    )
+    VentaDiaria.objects.bulk_create([
+        VentaDiaria(
+            restaurante_id=fila['restaurante_id'],
+            fecha=fila['fecha'],
+            num_ordenes=fila['num_ordenes'],
+            num_entregadas=fila['num_entregadas'],
+            ventas=fila['ventas'] or 0,
+        )
+        for fila in filas
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('num_ordenes', models.PositiveIntegerField(default=0)),
+                ('num_entregadas', models.PositiveIntegerField(default=0)),
+                ('ventas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('restaurante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='api.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria',
+                'verbose_name_plural': 'Ventas Diarias',
+                'ordering': ['-fecha'],
+                'unique_together': {('restaurante', 'fecha')},
+            },
+        ),
+        migrations.RunPython(poblar_ventas_diarias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def crear_indice_fts(apps, schema_editor):
+    # Tabla virtual FTS5 para la búsqueda de productos (solo SQLite, ver api/busqueda.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS api_producto_fts USING fts5("
+        "nombre, descripcion, categoria, restaurante_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO api_producto_fts (rowid, nombre, descripcion, categoria, restaurante_id) "
+        "SELECT p.id, p.nombre, COALESCE(p.descripcion, ''), c.nombre, p.restaurante_id "
+        "FROM api_producto p JOIN api_categoria c ON c.id = p.categoria_id WHERE p.activo"
+    )
+
+
+def eliminar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS api_producto_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_ventadiaria'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_fts, eliminar_indice_fts),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-16 23:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_ventanas(apps, schema_editor):
+    # Misma expansión que api/horarios.py:ventanas_semana para los restaurantes existentes
+    Restaurante = apps.get_model('api', 'Restaurante')
+    VentanaApertura = apps.get_model('api', 'VentanaApertura')
+    ventanas = []
+    for restaurante in Restaurante.objects.all():
+        apertura = restaurante.hora_apertura.hour * 60 + restaurante.hora_apertura.minute
+        cierre = restaurante.hora_cierre.hour * 60 + restaurante.hora_cierre.minute
+        for dia in range(7):
+            base = dia * 1440
+            if apertura == cierre:
+                tramos = [(base, base + 1440)]
+            elif apertura < cierre:
+                tramos = [(base + apertura, base + cierre)]
+            else:
+                siguiente = ((dia + 1) % 7) * 1440
+                tramos = [(base + apertura, base + 1440)]
+                if cierre:
+                    tramos.append((siguiente, siguiente + cierre))
+            ventanas.extend(
+                VentanaApertura(restaurante=restaurante, inicio=inicio, fin=fin) for inicio, fin in tramos
+            )
+    VentanaApertura.objects.bulk_create(ventanas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_producto_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentanaApertura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.PositiveIntegerField(verbose_name='Minuto de inicio en la semana')),
+                ('fin', models.PositiveIntegerField(verbose_name='Minuto de fin en la semana')),
+                ('restaurante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventanas_apertura', to='api.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Ventana de Apertura',
+                'verbose_name_plural': 'Ventanas de Apertura',
+                'ordering': ['inicio'],
+                'indexes': [models.Index(fields=['inicio', 'fin'], name='ventana_inicio_fin_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_ventanas, migrations.RunPython.noop),
+    ]
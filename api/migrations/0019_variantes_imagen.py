@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-16 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_ventanaapertura'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurante',
+            name='logo_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
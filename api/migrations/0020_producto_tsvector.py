@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def crear_indice_tsvector(apps, schema_editor):
+    # Tabla con el tsvector de cada producto e índice GIN (solo PostgreSQL, ver api/busqueda.py)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE TABLE IF NOT EXISTS api_producto_tsv ("
+        "producto_id bigint PRIMARY KEY REFERENCES api_producto (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "restaurante_id bigint NOT NULL, "
+        "documento tsvector NOT NULL)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS api_producto_tsv_documento_gin ON api_producto_tsv USING GIN (documento)"
+    )
+    schema_editor.execute(
+        "INSERT INTO api_producto_tsv (producto_id, restaurante_id, documento) "
+        "SELECT p.id, p.restaurante_id, "
+        "setweight(to_tsvector('spanish', p.nombre), 'A') "
+        "|| setweight(to_tsvector('spanish', c.nombre), 'B') "
+        "|| setweight(to_tsvector('spanish', COALESCE(p.descripcion, '')), 'C') "
+        "FROM api_producto p JOIN api_categoria c ON c.id = p.categoria_id WHERE p.activo"
+    )
+
+
+def eliminar_indice_tsvector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS api_producto_tsv")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_variantes_imagen'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_tsvector, eliminar_indice_tsvector),
+    ]
@@ -4,6 +4,8 @@ from django.core.validators import URLValidator
 from django.conf import settings
 from django.utils import timezone
 
+from .slugs import SlugUnicoMixin
+
 
 class TipoCocina(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -23,7 +25,7 @@ class TipoCocina(models.Model):
         verbose_name_plural = "Tipos de Cocina"
         ordering = ['nombre']
 
-class Restaurante(models.Model):
+class Restaurante(SlugUnicoMixin, models.Model):
     ESTADOS = [
         ('abierto', 'Abierto'),
         ('cerrado', 'Cerrado'),
@@ -40,6 +42,8 @@ class Restaurante(models.Model):
     nombre = models.CharField(max_length=100)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     logo = models.ImageField(upload_to='logos/', null=True, blank=True)
+    # Miniaturas y WebP del logo, generadas en segundo plano (ver imagenes.py)
+    logo_variantes = models.JSONField(default=dict, blank=True, editable=False)
     direccion = models.CharField(max_length=200)
     telefono = models.CharField(max_length=20)
     descripcion = models.TextField()
@@ -52,17 +56,6 @@ class Restaurante(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.nombre)
-            slug = base_slug
-            num = 1
-            while Restaurante.objects.filter(slug=slug).exists():
-                slug = f'{base_slug}-{num}'
-                num += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
-
     def __str__(self):
         owner_info = f" ({self.propietario.username})"
         return f"{self.nombre} - {owner_info}"
@@ -150,7 +143,7 @@ class Envio(models.Model):
         return f"{self.nombre} - {self.restaurante.nombre}"
 
 
-class Categoria(models.Model):
+class Categoria(SlugUnicoMixin, models.Model):
     """Categorías para los productos del menú """
     restaurante = models.ForeignKey(
         'Restaurante', # O Restaurante si está importado/definido antes
@@ -170,18 +163,8 @@ class Categoria(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            # Crear slug único para la categoría dentro del restaurante
-            base_slug = slugify(self.nombre)
-            slug = base_slug
-            num = 1
-            # Asegurar que el slug sea único PARA ESTE RESTAURANTE
-            while Categoria.objects.filter(restaurante=self.restaurante, slug=slug).exists():
-                slug = f'{base_slug}-{num}'
-                num += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+    # Slug único dentro del restaurante (ver SlugUnicoMixin)
+    slug_alcance = ('restaurante',)
 
     def __str__(self):
         return f"{self.nombre}"
@@ -192,12 +175,16 @@ class Categoria(models.Model):
         #luego por orden y nombre
         ordering = ['orden', 'nombre']
         unique_together = ['restaurante', 'slug']
+        indexes = [
+            # Categorías de un restaurante en el orden del menú
+            models.Index(fields=['restaurante', 'orden', 'nombre'], name='categoria_rest_orden_idx'),
+        ]
         
         
         
 
 
-class Producto(models.Model):
+class Producto(SlugUnicoMixin, models.Model):
     """Productos individuales del menú"""
     DISPONIBILIDAD = [
         ('disponible', 'Disponible'),
@@ -215,6 +202,8 @@ class Producto(models.Model):
     descripcion = models.TextField(blank=True, null=True)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     imagen = models.ImageField(upload_to='productos/', null=True, blank=True)
+    # Miniaturas y WebP de la imagen, generadas en segundo plano (ver imagenes.py)
+    imagen_variantes = models.JSONField(default=dict, blank=True, editable=False)
     activo = models.BooleanField(
         default=True, help_text="Indica si el producto se muestra en el menú")
     disponibilidad = models.CharField(
@@ -227,18 +216,8 @@ class Producto(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            # Crear slug único para el producto dentro de su categoría
-            base_slug = slugify(self.nombre)
-            slug = base_slug
-            num = 1
-            # Asegurar que el slug sea único PARA ESTA CATEGORÍA
-            while Producto.objects.filter(categoria=self.categoria, slug=slug).exists():
-                slug = f'{base_slug}-{num}'
-                num += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+    # Slug único dentro del restaurante, igual que el unique_together (ver SlugUnicoMixin)
+    slug_alcance = ('restaurante',)
 
     def __str__(self):
         return f"{self.nombre} ({self.categoria.nombre})"
@@ -249,7 +228,11 @@ class Producto(models.Model):
         # Ordenar por categoría, luego por orden y nombre
         ordering = ['orden', 'nombre']
         unique_together = ['restaurante', 'slug']
-        # El slug debe ser único por categoría
+        indexes = [
+            # Menú completo de un restaurante y productos de una categoría, ya ordenados
+            models.Index(fields=['restaurante', 'orden', 'nombre'], name='producto_rest_orden_idx'),
+            models.Index(fields=['categoria', 'orden', 'nombre'], name='producto_cat_orden_idx'),
+        ]
         
         
 class Orden(models.Model):
@@ -330,6 +313,14 @@ class Orden(models.Model):
         verbose_name = 'Orden'
         verbose_name_plural = 'Órdenes'
         ordering = ['-created_at'] # Las órdenes más recientes primero
+        indexes = [
+            # Listado paginado por cursor de las órdenes de un restaurante
+            # (cubre también los filtros por restaurante + rango de created_at)
+            models.Index(fields=['restaurante', '-created_at', '-id'], name='orden_rest_created_idx'),
+            # Conteos por estado del dashboard y ventas por estado + rango de fechas
+            # (su prefijo cubre también restaurante + estado)
+            models.Index(fields=['restaurante', 'estado', 'created_at'], name='orden_rest_estado_idx'),
+        ]
 
     def __str__(self):
         return f"Orden #{self.pk} - {self.get_estado_display()}"
@@ -390,4 +381,92 @@ class DetalleOrden(models.Model):
     # Opcional: Sobrescribir save para asegurar que el subtotal se calcule automáticamente
     def save(self, *args, **kwargs):
         self.subtotal = self.cantidad * self.precio_unitario
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class MenuSnapshot(models.Model):
+    """
+    Menú pre-serializado de un restaurante.
+    Guarda el JSON ya renderizado de los endpoints públicos del menú para no
+    re-serializar todos los productos en cada GET. Las señales de Producto y
+    Categoria lo invalidan (incrementando 'version') y se reconstruye en la
+    siguiente lectura.
+    """
+    restaurante = models.OneToOneField(
+        'Restaurante',
+        on_delete=models.CASCADE,
+        related_name='menu_snapshot',
+        verbose_name='Restaurante'
+    )
+    version = models.PositiveIntegerField(default=0)
+    # JSON de ProductoClienteSerializer (productos_por_restaurante)
+    contenido_cliente = models.TextField(blank=True, null=True)
+    # JSON de ProductoSerializer (restaurant_menu_list)
+    contenido_menu = models.TextField(blank=True, null=True)
+    # Se asigna explícitamente al invalidar (queryset.update no respeta auto_now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Snapshot del Menú'
+        verbose_name_plural = 'Snapshots de Menús'
+
+    def __str__(self):
+        return f"Menú de {self.restaurante_id} (v{self.version})"
+
+
+class VentaDiaria(models.Model):
+    """
+    Resumen de ventas por restaurante y día, mantenido de forma incremental
+    al crear órdenes y al cambiar su estado (ver ventas.py). Permite leer las
+    ventas de hoy / la semana / el mes sin recorrer la tabla de órdenes.
+    """
+    restaurante = models.ForeignKey(
+        'Restaurante',
+        on_delete=models.CASCADE,
+        related_name='ventas_diarias',
+        verbose_name='Restaurante'
+    )
+    fecha = models.DateField(verbose_name='Fecha')
+    # Órdenes creadas ese día (cualquier estado)
+    num_ordenes = models.PositiveIntegerField(default=0)
+    # Órdenes creadas ese día que están entregadas
+    num_entregadas = models.PositiveIntegerField(default=0)
+    # Suma de 'total' de las órdenes entregadas creadas ese día
+    ventas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Venta Diaria'
+        verbose_name_plural = 'Ventas Diarias'
+        ordering = ['-fecha']
+        unique_together = ['restaurante', 'fecha']
+
+    def __str__(self):
+        return f"{self.restaurante_id} - {self.fecha}: {self.ventas}"
+
+
+class VentanaApertura(models.Model):
+    """
+    Intervalo semanal en que un restaurante está abierto, en minutos desde el
+    lunes 00:00 (0 a 10080, 'fin' excluido). Se precalcula a partir de
+    hora_apertura/hora_cierre (ver horarios.py) para que "abierto ahora" sea
+    una búsqueda por rango sobre un índice.
+    """
+    restaurante = models.ForeignKey(
+        'Restaurante',
+        on_delete=models.CASCADE,
+        related_name='ventanas_apertura',
+        verbose_name='Restaurante'
+    )
+    inicio = models.PositiveIntegerField(verbose_name='Minuto de inicio en la semana')
+    fin = models.PositiveIntegerField(verbose_name='Minuto de fin en la semana')
+
+    class Meta:
+        verbose_name = 'Ventana de Apertura'
+        verbose_name_plural = 'Ventanas de Apertura'
+        ordering = ['inicio']
+        indexes = [
+            models.Index(fields=['inicio', 'fin'], name='ventana_inicio_fin_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurante_id}: {self.inicio}-{self.fin}"
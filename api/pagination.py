@@ -0,0 +1,88 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre (created_at, id) en orden descendente.
+
+    Cada página filtra con "(created_at, id) < (cursor)" en lugar de usar OFFSET,
+    así que con el índice compuesto de Orden cada página cuesta lo mismo sin
+    importar qué tan atrás en el historial esté. El cursor es opaco para el cliente:
+    solo debe reenviar el valor de 'next'.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, obj):
+        posicion = {'c': obj.created_at.isoformat(), 'i': obj.pk}
+        return base64.urlsafe_b64encode(json.dumps(posicion).encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        valor = request.query_params.get(self.cursor_query_param)
+        if not valor:
+            return None
+        try:
+            posicion = json.loads(base64.urlsafe_b64decode(valor.encode('ascii')))
+            created_at = parse_datetime(posicion['c'])
+            pk = int(posicion['i'])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_actual = self.get_page_size(request)
+        queryset = queryset.order_by('-created_at', '-id')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            created_at, pk = cursor
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        # Pedimos un elemento extra para saber si hay una página siguiente
+        resultados = list(queryset[:self.page_size_actual + 1])
+        self.has_next = len(resultados) > self.page_size_actual
+        self.page = resultados[:self.page_size_actual]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class DescubrimientoPagination(PageNumberPagination):
+    """Paginación por número de página para el endpoint de descubrimiento de restaurantes."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
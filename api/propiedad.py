@@ -0,0 +1,173 @@
+"""
+Propiedad de restaurantes en los claims del token JWT.
+
+Casi todas las vistas del propietario empezaban cargando el Restaurante por
+slug para comparar restaurante.propietario con request.user (y esa
+comparación carga además el usuario). Ahora el token de acceso lleva los
+restaurantes del usuario:
+
+    "restaurantes": {"<slug>": <id>, ...}
+    "rv": "<versión>"
+
+La versión es una huella de esos pares (slug, id), así que se puede
+recalcular siempre desde la base de datos. La versión vigente de cada
+usuario se guarda en la caché de Django (PROPIEDAD_CACHE_TTL segundos) y las
+señales de Restaurante la borran cuando cambia el propietario o el slug de
+alguno de sus restaurantes. EsPropietarioRestaurante autoriza con los claims
+si la versión del token coincide con la vigente (un acierto de caché, sin
+consultas); si no coincide, o el token no trae claims (tokens antiguos, o
+usuarios con más de MAX_RESTAURANTES_EN_TOKEN restaurantes), comprueba la
+propiedad en la base de datos.
+
+Los claims solo se usan si la caché es compartida entre procesos (Redis,
+Memcached, base de datos...). Con la caché local por proceso (LocMemCache, la
+que Django usa si no se configura CACHES) el borrado de la versión que hacen
+las señales no llega a los demás workers, y un antiguo propietario seguiría
+autorizado en ellos hasta PROPIEDAD_CACHE_TTL: en ese caso la propiedad se
+comprueba siempre en la base de datos. El setting PROPIEDAD_CACHE_COMPARTIDA
+fuerza la decisión (p. ej. True con un único proceso). Los queryset.update()
+sobre Restaurante no disparan señales: tardan hasta PROPIEDAD_CACHE_TTL en
+verse incluso con caché compartida.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import BasePermission
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import Restaurante
+
+CLAIM_RESTAURANTES = 'restaurantes'
+CLAIM_VERSION = 'rv'
+MAX_RESTAURANTES_EN_TOKEN = 100
+
+
+def cache_compartida():
+    """True si la versión guardada en la caché la ven todos los procesos."""
+    compartida = getattr(settings, 'PROPIEDAD_CACHE_COMPARTIDA', None)
+    if compartida is not None:
+        return compartida
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+@checks.register(checks.Tags.security, deploy=True)
+def comprobar_cache_propiedad(app_configs, **kwargs):
+    if cache_compartida():
+        return []
+    return [checks.Warning(
+        "La caché por defecto es local a cada proceso: la propiedad de los restaurantes se "
+        "comprueba en la base de datos en cada petición en lugar de usar los claims del token.",
+        hint="Configura una caché compartida en CACHES (Redis, Memcached...) o "
+             "PROPIEDAD_CACHE_COMPARTIDA = True si solo hay un proceso.",
+        id='api.W001',
+    )]
+
+
+def _clave_cache(usuario_id):
+    return f'propiedad:{usuario_id}'
+
+
+def restaurantes_de(usuario_id):
+    """{slug: id} de los restaurantes del usuario."""
+    return dict(Restaurante.objects.filter(propietario_id=usuario_id).order_by('id').values_list('slug', 'id'))
+
+
+def huella(restaurantes):
+    """Versión de un conjunto {slug: id}: cambia si se añade, quita o renombra alguno."""
+    contenido = ','.join(f'{id_}:{slug}' for slug, id_ in sorted(restaurantes.items(), key=lambda par: par[1]))
+    return hashlib.sha1(contenido.encode()).hexdigest()[:12]
+
+
+def version_actual(usuario_id):
+    """Versión vigente de la propiedad del usuario (de la caché o, si no está, de la base de datos)."""
+    version = cache.get(_clave_cache(usuario_id))
+    if version is None:
+        version = huella(restaurantes_de(usuario_id))
+        cache.set(_clave_cache(usuario_id), version, getattr(settings, 'PROPIEDAD_CACHE_TTL', 60))
+    return version
+
+
+def invalidar_propiedad(*usuario_ids):
+    cache.delete_many([_clave_cache(usuario_id) for usuario_id in usuario_ids if usuario_id is not None])
+
+
+def poner_claims(token, usuario_id):
+    """Añade al token los restaurantes del usuario y su versión (sin la lista si son demasiados)."""
+    restaurantes = restaurantes_de(usuario_id)
+    version = huella(restaurantes)
+    cache.set(_clave_cache(usuario_id), version, getattr(settings, 'PROPIEDAD_CACHE_TTL', 60))
+    if len(restaurantes) <= MAX_RESTAURANTES_EN_TOKEN:
+        token[CLAIM_RESTAURANTES] = restaurantes
+        token[CLAIM_VERSION] = version
+    return token
+
+
+class TokenPropiedadSerializer(TokenObtainPairSerializer):
+    """Login (/api/token/): el refresh y el access llevan los restaurantes del usuario."""
+
+    @classmethod
+    def get_token(cls, user):
+        # Los claims del refresh se copian al access token que se genera a partir de él
+        return poner_claims(super().get_token(user), user.pk)
+
+
+class TokenRefreshPropiedadSerializer(TokenRefreshSerializer):
+    """/api/token/refresh/: el nuevo access token lleva la propiedad vigente, no la del login."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        poner_claims(access, access[api_settings.USER_ID_CLAIM])
+        data['access'] = str(access)
+        return data
+
+
+def restaurante_propio_id(request, slug):
+    """
+    Id del restaurante 'slug' si es del usuario autenticado, o None. Con un
+    token de claims vigentes y una caché compartida no consulta la base de datos.
+    """
+    usuario_id = request.user.pk
+    token = request.auth
+    restaurantes = token.get(CLAIM_RESTAURANTES) if token is not None and cache_compartida() else None
+    if restaurantes is not None and token.get(CLAIM_VERSION) == version_actual(usuario_id):
+        return restaurantes.get(slug)
+    return Restaurante.objects.filter(slug=slug, propietario_id=usuario_id).values_list('id', flat=True).first()
+
+
+def restaurante_de(request):
+    """
+    Referencia al restaurante autorizado por EsPropietarioRestaurante,
+    Restaurante(pk=...) sin consultarlo: sirve para filtrar y para asignarlo
+    como FK. Si la vista necesita otros campos debe cargarlo.
+    """
+    return Restaurante(pk=request.restaurante_id, slug=request.restaurante_slug, propietario_id=request.user.pk)
+
+
+class EsPropietarioRestaurante(BasePermission):
+    """
+    Solo el propietario del restaurante de la URL (kwarg restaurante_slug).
+    Deja el id en request.restaurante_id (ver restaurante_de()). Si el
+    restaurante no existe responde 404, como antes hacía get_object_or_404.
+    """
+    message = "No tienes permiso para gestionar este restaurante."
+
+    def has_permission(self, request, view):
+        slug = view.kwargs.get('restaurante_slug')
+        if slug is None or not request.user or not request.user.is_authenticated:
+            return False
+        restaurante_id = restaurante_propio_id(request, slug)
+        if restaurante_id is None:
+            if not Restaurante.objects.filter(slug=slug).exists():
+                raise NotFound("No encontrado.")
+            return False
+        request.restaurante_id = restaurante_id
+        request.restaurante_slug = slug
+        return True
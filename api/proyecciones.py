@@ -0,0 +1,188 @@
+"""
+Proyecciones de solo lectura para los listados calientes.
+
+Un ModelSerializer con many=True instancia un modelo por fila y recorre sus
+campos uno a uno (get_attribute, to_representation, serializadores anidados
+por cada relación). Proyeccion precalcula, una sola vez por clase de
+serializador, qué columna de values() alimenta cada campo y cómo convertirla,
+y luego construye los dicts directamente desde values(). Las relaciones
+many=True (tipos_cocina, redes_sociales...) se cargan con una consulta por
+relación para todas las filas, igual que prefetch_related.
+
+La salida es idéntica, byte a byte al renderizarla, a la del serializador:
+mismas claves en el mismo orden y mismas conversiones (fechas, decimales,
+URLs de imágenes); los campos que no son triviales usan el to_representation
+del propio campo de DRF. Si un serializador usa un tipo de campo que la
+proyección no sabe reproducir, Proyeccion lanza TypeError al construirse en
+lugar de producir una salida distinta.
+"""
+from functools import lru_cache
+
+from django.core.files.storage import default_storage
+from django.db.models import F, ForeignObjectRel, ManyToManyField
+from rest_framework import serializers
+
+from .instrumentacion import medir
+from .serializers import VariantesImagenField
+
+# Campos cuyo to_representation devuelve el valor de values() sin cambios
+CAMPOS_IDENTIDAD = (
+    serializers.CharField,      # también SlugField, URLField, EmailField
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+)
+CLAVE_PADRE = '_padre'
+
+
+def _url_imagen(storage):
+    def convertir(nombre, request):
+        # Igual que FileField.to_representation con use_url=True
+        if not nombre:
+            return None
+        url = storage.url(nombre)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convertir
+
+
+def _url_variantes(variantes, request):
+    # Igual que VariantesImagenField.to_representation
+    urls = {}
+    for nombre, ruta in (variantes or {}).get('archivos', {}).items():
+        url = default_storage.url(ruta)
+        urls[nombre] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def _sin_request(to_representation):
+    return lambda valor, request: to_representation(valor)
+
+
+def _identidad(valor, request):
+    return valor
+
+
+class Proyeccion:
+    """Plan de proyección de un ModelSerializer de lectura (ver proyectar())."""
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        # (nombre en la salida, lookup de values() o None, conversor(valor, request) o None)
+        self.campos = []
+        self.anidados = []   # (nombre, Proyeccion, lookup de la FK) para serializadores anidados simples
+        self.relaciones = {}  # nombre -> (Proyeccion hija, modelo hijo, lookup hacia el padre)
+        for nombre, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            self._planificar(nombre, field)
+        self.lookups = list(dict.fromkeys(
+            [self.pk] + [lookup for _, lookup, _ in self.campos if lookup is not None]
+        ))
+
+    def _planificar(self, nombre, field):
+        source = field.source
+        if isinstance(field, serializers.ListSerializer):
+            self.relaciones[nombre] = self._relacion(source, field.child.__class__)
+            self.campos.append((nombre, None, None))
+        elif isinstance(field, serializers.Serializer):
+            fk = self.model._meta.get_field(source)
+            self.anidados.append((nombre, Proyeccion(field.__class__), fk.attname))
+            self.campos.append((nombre, fk.attname, None))
+        elif isinstance(field, VariantesImagenField):
+            self.campos.append((nombre, source, _url_variantes))
+        elif isinstance(field, serializers.FileField):
+            self.campos.append((nombre, source, _url_imagen(self.model._meta.get_field(source).storage)))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            self.campos.append((nombre, self.model._meta.get_field(source).attname, _identidad))
+        elif isinstance(field, (serializers.ManyRelatedField, serializers.SerializerMethodField)) or '.' in source:
+            raise TypeError(f"Proyeccion no soporta el campo {nombre} ({type(field).__name__})")
+        elif isinstance(field, CAMPOS_IDENTIDAD) and not isinstance(field, serializers.MultipleChoiceField):
+            self.campos.append((nombre, source, _identidad))
+        else:
+            self.campos.append((nombre, source, _sin_request(field.to_representation)))
+
+    def _relacion(self, source, child_class):
+        campo = self.model._meta.get_field(source)
+        hija = Proyeccion(child_class)
+        if isinstance(campo, ManyToManyField):
+            # Filas del modelo relacionado anotadas con el id del padre (como prefetch_related)
+            return hija, campo.related_model, campo.related_query_name()
+        if isinstance(campo, ForeignObjectRel) and not campo.many_to_many:
+            return hija, campo.related_model, campo.field.name
+        raise TypeError(f"Proyeccion no soporta la relación {source}")
+
+    def _filas_relacion(self, nombre, padres, request):
+        """{id del padre: [dicts]} para una relación many=True, con una sola consulta."""
+        hija, modelo, hacia_padre = self.relaciones[nombre]
+        agrupadas = {pk: [] for pk in padres}
+        if not padres:
+            return agrupadas
+        filas = modelo._default_manager.filter(**{f'{hacia_padre}__in': padres}).values(
+            *hija.lookups, **{CLAVE_PADRE: F(hacia_padre)}
+        )
+        for fila, dato in zip(filas, hija._convertir(filas, request)):
+            agrupadas[fila[CLAVE_PADRE]].append(dato)
+        return agrupadas
+
+    def _convertir(self, filas, request):
+        filas = list(filas)
+        relaciones = {}
+        if self.relaciones:
+            padres = [fila[self.pk] for fila in filas]
+            relaciones = {nombre: self._filas_relacion(nombre, padres, request) for nombre in self.relaciones}
+        anidados = {}
+        for nombre, proyeccion, fk in self.anidados:
+            ids = {fila[fk] for fila in filas if fila[fk] is not None}
+            objetos = proyeccion._consultar(proyeccion.model._default_manager.filter(pk__in=ids), request)
+            anidados[nombre] = {dato_pk: dato for dato_pk, dato in objetos}
+
+        resultado = []
+        for fila in filas:
+            dato = {}
+            for nombre, lookup, conversor in self.campos:
+                if nombre in relaciones:
+                    dato[nombre] = relaciones[nombre][fila[self.pk]]
+                elif nombre in anidados:
+                    valor = fila[lookup]
+                    dato[nombre] = None if valor is None else anidados[nombre][valor]
+                else:
+                    valor = fila[lookup]
+                    dato[nombre] = None if valor is None else conversor(valor, request)
+            resultado.append(dato)
+        return resultado
+
+    def _consultar(self, queryset, request):
+        """[(pk, dict)] para un queryset de objetos de este modelo (usado por los anidados)."""
+        filas = list(queryset.values(*self.lookups))
+        return [(fila[self.pk], dato) for fila, dato in zip(filas, self._convertir(filas, request))]
+
+    def valores(self, queryset):
+        """El queryset como values() con las columnas que necesita la proyección (se puede paginar)."""
+        return queryset.values(*self.lookups)
+
+    def convertir(self, filas, request=None):
+        """Convierte filas de valores() en los dicts del serializador, en el mismo orden."""
+        with medir('ser'):
+            return self._convertir(filas, request)
+
+    def lista(self, queryset, request=None):
+        """Equivale a Serializer(queryset, many=True).data."""
+        return self.convertir(self.valores(queryset), request)
+
+
+@lru_cache(maxsize=None)
+def proyeccion(serializer_class):
+    return Proyeccion(serializer_class)
+
+
+def proyectar(serializer_class, queryset, request=None):
+    """
+    Serializa un queryset con la proyección de serializer_class. Pasar request
+    solo si el serializador original recibiría {'request': request} en su
+    contexto (URLs absolutas de imágenes).
+    """
+    return proyeccion(serializer_class).lista(queryset, request)
@@ -0,0 +1,206 @@
+"""
+Logging estructurado y asíncrono.
+
+- ContextoPeticionMiddleware asigna a cada petición un request id (el de la
+  cabecera X-Request-ID si viene, o uno nuevo) y recuerda el slug del
+  restaurante de la URL. ContextoPeticionFilter los añade a cada registro
+  junto con los milisegundos transcurridos desde el inicio de la petición.
+- ColaHandler solo encola el registro: la escritura (JSON, una línea por
+  registro) la hace un QueueListener en un hilo propio, así que un stdout o un
+  disco lento no bloquean a los workers. Si la cola se llena se descartan
+  registros en lugar de bloquear.
+- MuestreoFilter deja pasar solo una fracción de los mensajes de alto volumen
+  (por defecto, DEBUG e INFO) de los loggers donde se configure.
+- FormateadorJSON no escribe credenciales: una petición en los 'extra' (p. ej.
+  la que añade django.request a los 4xx/5xx) se registra como "MÉTODO ruta",
+  sin la query string, y los parámetros como ?token= se ocultan en el resto
+  de la línea (el stream SSE acepta el JWT en ?token=).
+
+La configuración (niveles por módulo, muestreo) está en LOGGING en settings.py.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpRequest
+
+CABECERA_REQUEST_ID = 'X-Request-ID'
+_REQUEST_ID_VALIDO = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Atributos propios de LogRecord; el resto son los 'extra' del registro
+_ATRIBUTOS_LOGRECORD = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+_ATRIBUTOS_CONTEXTO = ('request_id', 'restaurante', 't_ms')
+# Parámetros de URL con credenciales que no deben llegar a los logs
+_PARAMETROS_SECRETOS = re.compile(r'([?&](?:token|access|refresh|password)=)[^&\s"\'<>]+', re.IGNORECASE)
+
+_contexto = ContextVar('contexto_peticion', default=None)
+
+
+def contexto_peticion():
+    """Dict mutable con el contexto de la petición en curso (o None fuera de una petición)."""
+    return _contexto.get()
+
+
+def anotar(**datos):
+    """Añade datos al contexto de la petición en curso, p. ej. anotar(restaurante=slug)."""
+    contexto = _contexto.get()
+    if contexto is not None:
+        contexto.update(datos)
+
+
+class ContextoPeticionMiddleware:
+    """Request id por petición (también en la respuesta) y slug del restaurante para los logs."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def iniciar(self, request):
+        request_id = request.headers.get(CABECERA_REQUEST_ID, '')
+        if not _REQUEST_ID_VALIDO.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        # Es un dict mutable: lo que se anote en copias del contexto (sync_to_async) se ve aquí
+        return _contexto.set({'request_id': request_id, 'restaurante': None, 'inicio': time.perf_counter()})
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = self.iniciar(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _contexto.reset(token)
+        response[CABECERA_REQUEST_ID] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        token = self.iniciar(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _contexto.reset(token)
+        response[CABECERA_REQUEST_ID] = request.request_id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slug = view_kwargs.get('restaurante_slug') or view_kwargs.get('slug')
+        if slug:
+            anotar(restaurante=slug)
+
+
+class ContextoPeticionFilter(logging.Filter):
+    """Añade request_id, restaurante y t_ms (ms desde el inicio de la petición) al registro."""
+
+    def filter(self, record):
+        contexto = _contexto.get()
+        if contexto is None:
+            record.request_id = record.restaurante = record.t_ms = None
+        else:
+            record.request_id = contexto['request_id']
+            record.restaurante = contexto['restaurante']
+            record.t_ms = round((time.perf_counter() - contexto['inicio']) * 1000, 2)
+        return True
+
+
+class MuestreoFilter(logging.Filter):
+    """Deja pasar una fracción 'tasa' de los registros de nivel <= 'nivel'; los demás pasan siempre."""
+
+    def __init__(self, tasa=1.0, nivel='INFO'):
+        super().__init__()
+        self.tasa = float(tasa)
+        self.nivel = logging.getLevelName(nivel) if isinstance(nivel, str) else nivel
+
+    def filter(self, record):
+        if record.levelno > self.nivel or self.tasa >= 1:
+            return True
+        return random.random() < self.tasa
+
+
+class FormateadorJSON(logging.Formatter):
+    """Un objeto JSON por línea, con el contexto de la petición y los 'extra' del registro."""
+
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+        }
+        for atributo in _ATRIBUTOS_CONTEXTO:
+            valor = getattr(record, atributo, None)
+            if valor is not None:
+                datos[atributo] = valor
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_LOGRECORD and clave not in _ATRIBUTOS_CONTEXTO:
+                if isinstance(valor, HttpRequest):
+                    # Su repr incluye la query string completa
+                    valor = f'{valor.method} {valor.path}'
+                datos[clave] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        if record.stack_info:
+            datos['stack'] = record.stack_info
+        return _PARAMETROS_SECRETOS.sub(r'\1[oculto]', json.dumps(datos, ensure_ascii=False, default=str))
+
+
+class ColaHandler(QueueHandler):
+    """
+    Encola los registros y los escribe desde un hilo de fondo con un
+    StreamHandler (stdout por defecto) o un FileHandler si se indica 'archivo'.
+    Los filtros del handler (p. ej. ContextoPeticionFilter) se aplican en el
+    hilo que registra, donde está el contexto de la petición.
+    """
+
+    def __init__(self, archivo=None, tamano_cola=10000, formateador=None):
+        super().__init__(queue.Queue(maxsize=tamano_cola))
+        destino = logging.FileHandler(archivo, encoding='utf-8') if archivo else logging.StreamHandler(sys.stdout)
+        destino.setFormatter(formateador or FormateadorJSON())
+        self.destino = destino
+        self.descartados = 0
+        self.listener = QueueListener(self.queue, destino, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self.detener)
+
+    def prepare(self, record):
+        # El mensaje y la traza se resuelven aquí: los argumentos pueden cambiar antes de que se escriba
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def detener(self):
+        """Vacía la cola y detiene el hilo de escritura (también al salir del proceso)."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.destino.close()
+
+    def close(self):
+        self.detener()
+        super().close()
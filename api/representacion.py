@@ -0,0 +1,119 @@
+"""
+Campos a elegir (?fields=) y relaciones a expandir (?expand=) en las respuestas.
+
+Un serializador con RepresentacionMixin declara en EXPANSIONES las relaciones
+que solo se incluyen si el cliente las pide:
+
+    EXPANSIONES = {
+        # nombre en ?expand= -> campo de salida
+        'envio': 'envio_details',
+    }
+
+La vista construye una Representacion a partir de la petición y la pasa en el
+contexto del serializador con la clave 'representacion'; sin ella el
+serializador devuelve todos sus campos, como siempre. Con el mismo contexto,
+cargas.optimizar() carga solo las relaciones que se van a serializar.
+
+    ?fields=id,estado,items.cantidad   campos a incluir ('items.x' se aplica al anidado)
+    ?expand=restaurante,items.producto relaciones a expandir
+"""
+from rest_framework import serializers
+
+
+class Representacion:
+    """Campos y expansiones pedidos para un serializador (y, con anidada(), para sus anidados)."""
+
+    def __init__(self, campos=None, expandir=()):
+        self.campos = set(campos) if campos is not None else None
+        self.expandir = set(expandir)
+
+    @classmethod
+    def desde_parametros(cls, query_params, serializer_class):
+        """Lee ?fields= y ?expand=; lanza ValidationError (400) con nombres desconocidos."""
+        campos = _lista(query_params.get('fields'))
+        expandir = _lista(query_params.get('expand')) or []
+        representacion = cls(campos, expandir)
+        errores = {}
+        desconocidas = sorted(set(expandir) - _expansiones(serializer_class))
+        if desconocidas:
+            errores['expand'] = [f"No se puede expandir: {', '.join(desconocidas)}."]
+        if campos is not None:
+            desconocidos = sorted(c for c in campos if not _campo_existe(serializer_class(), c.split('.')))
+            if desconocidos:
+                errores['fields'] = [f"Campos desconocidos: {', '.join(desconocidos)}."]
+        if errores:
+            raise serializers.ValidationError(errores)
+        return representacion
+
+    def anidada(self, nombre):
+        """Representacion para el serializador anidado en el campo 'nombre'."""
+        prefijo = f'{nombre}.'
+        campos = None
+        if self.campos is not None:
+            campos = {c[len(prefijo):] for c in self.campos if c.startswith(prefijo)}
+            # 'items' sin subcampos: el anidado completo
+            campos = campos or None
+        return Representacion(campos, {e[len(prefijo):] for e in self.expandir if e.startswith(prefijo)})
+
+    def incluye(self, nombre):
+        if self.campos is None:
+            return True
+        return nombre in self.campos or any(c.startswith(f'{nombre}.') for c in self.campos)
+
+    def filtrar(self, serializer, fields):
+        """Quita de fields los campos no pedidos y las expansiones no solicitadas."""
+        expansiones = type(serializer).EXPANSIONES
+        ocultos = {campo for nombre, campo in expansiones.items() if nombre not in self.expandir}
+        expandidos = {campo for nombre, campo in expansiones.items() if nombre in self.expandir}
+        for nombre in list(fields):
+            if nombre in ocultos or not (nombre in expandidos or self.incluye(nombre)):
+                del fields[nombre]
+        for nombre, field in fields.items():
+            anidado = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(anidado, RepresentacionMixin):
+                anidado.representacion = self.anidada(nombre)
+        return fields
+
+
+class RepresentacionMixin:
+    """
+    Mixin para ModelSerializer: aplica la Representacion del contexto (o la
+    que le asigna el serializador padre) a sus campos. EXPANSIONES declara las
+    relaciones que solo se serializan con ?expand=.
+    """
+    EXPANSIONES = {}
+    representacion = None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        representacion = self.representacion or self.context.get('representacion')
+        if representacion is None:
+            return fields
+        return representacion.filtrar(self, fields)
+
+
+def _lista(valor):
+    if valor is None:
+        return None
+    return [parte.strip() for parte in valor.split(',') if parte.strip()]
+
+
+def _lista_representable(field):
+    return isinstance(field, serializers.ListSerializer) and isinstance(field.child, RepresentacionMixin)
+
+
+def _expansiones(serializer_class):
+    """Nombres de ?expand= válidos: los del serializador y los de sus anidados many=True con prefijo."""
+    nombres = set(serializer_class.EXPANSIONES)
+    for nombre, field in serializer_class().fields.items():
+        if _lista_representable(field):
+            nombres.update(f'{nombre}.{sub}' for sub in _expansiones(type(field.child)))
+    return nombres
+
+
+def _campo_existe(serializer, partes):
+    campo = serializer.fields.get(partes[0])
+    if campo is None or len(partes) == 1:
+        return campo is not None
+    campo = campo.child if isinstance(campo, serializers.ListSerializer) else campo
+    return isinstance(campo, serializers.Serializer) and _campo_existe(campo, partes[1:])
@@ -1,9 +1,40 @@
+import logging
+
 from rest_framework import serializers
+from django.core.files.storage import default_storage
 from django.db import transaction
 from django.utils import timezone
 from .models import Restaurante, Envio, RedSocial, MetodoPago, TipoCocina, Categoria, Producto, Orden, DetalleOrden
+from .instrumentacion import SerializacionMedida
+from .cargas import ListaOptimizada
+from .memoizacion import MemoizadoMixin
+from .representacion import RepresentacionMixin
+from .ventas import registrar_orden_creada
+
+logger = logging.getLogger(__name__)
+
+class VariantesImagenField(serializers.Field):
+    """
+    Expone las variantes de una imagen (ver imagenes.py) como un mapa
+    {tamaño: URL}, p. ej. {"thumb": ..., "thumb_webp": ..., "medium": ...}.
+    Vacío mientras las variantes se están generando.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
 
-class RedSocialSerializer(serializers.ModelSerializer):
+    def to_representation(self, value):
+        archivos = (value or {}).get('archivos', {})
+        request = self.context.get('request')
+        urls = {}
+        for nombre, ruta in archivos.items():
+            url = default_storage.url(ruta)
+            urls[nombre] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+
+class RedSocialSerializer(SerializacionMedida, serializers.ModelSerializer):
     # Para la entrada (creación/actualización): Este campo NO se espera del frontend.
     # Se asignará en la vista basándose en el restaurante de la URL y la propiedad.
     # Para la salida (lectura): Por defecto, serializará al ID del Restaurante.
@@ -33,22 +64,20 @@ class RedSocialSerializer(serializers.ModelSerializer):
         
     # Método create() - Necesario para asociar el restaurante.
     def create(self, validated_data):
-         print("[RedSocialSerializer - create] Method called.")
          # Usa .pop() para obtener el restaurante de validated_data
          restaurante = validated_data.pop('restaurante', None)
 
          if not restaurante:
-             print("[RedSocialSerializer - create] Error: 'restaurante' not found in validated_data.")
+             logger.error("RedSocialSerializer.create: falta 'restaurante' en validated_data")
              raise serializers.ValidationError("Error interno: Restaurante no fue proporcionado al serializador.")
 
-         print(f"[RedSocialSerializer - create] Creating RedSocial for restaurant: {restaurante.slug}")
          # Crea la nueva instancia
          red_social = RedSocial.objects.create(restaurante=restaurante, **validated_data)
 
-         print(f"[RedSocialSerializer - create] RedSocial created with ID: {red_social.id}")
+         logger.debug("RedSocial %s creada para %s", red_social.id, restaurante.slug)
          return red_social
 
-class MetodoPagoSerializer(serializers.ModelSerializer):
+class MetodoPagoSerializer(SerializacionMedida, MemoizadoMixin, serializers.ModelSerializer):
     # Para la entrada (creación/actualización): Este campo NO se espera del frontend.
     # Se asignará en la vista basándose en el restaurante de la URL y la propiedad.
     # Para la salida (lectura): Por defecto, serializará al ID del Restaurante.
@@ -77,29 +106,25 @@ class MetodoPagoSerializer(serializers.ModelSerializer):
         
     # Método create() - **<<-- ¡CORREGIDO para usar .pop() ! -->>**
     def create(self, validated_data):
-         print("[MetodoPagoSerializer - create] Method called.")
-
          # **<<-- ¡Obtiene el objeto 'restaurante' USANDO .pop() Y LO REMUEVE de validated_data -->>**
          # Usa .pop('nombre_clave', valor_por_defecto_si_no_existe)
          restaurante = validated_data.pop('restaurante', None) # <<-- ¡Cambio clave aquí! Usa .pop()
 
          # Tu verificación personalizada (opcional pero útil)
          if not restaurante:
-             print("[MetodoPagoSerializer - create] Error: 'restaurante' not found in validated_data after pop.")
+             logger.error("MetodoPagoSerializer.create: falta 'restaurante' en validated_data")
              raise serializers.ValidationError("Error interno: Restaurante no fue proporcionado al serializador.")
 
-         print(f"[MetodoPagoSerializer - create] Creating MetodoPago for restaurant: {restaurante.slug}")
-
          # Crea la nueva instancia de MetodoPago.
          # Ahora, cuando uses **validated_data, el diccionario YA NO contendrá la clave 'restaurante',
          # evitando el TypeError.
          metodo_pago = MetodoPago.objects.create(restaurante=restaurante, **validated_data) # <<-- Esto ya no causa conflicto
 
-         print(f"[MetodoPagoSerializer - create] MetodoPago created with ID: {metodo_pago.id}")
+         logger.debug("MetodoPago %s creado para %s", metodo_pago.id, restaurante.slug)
          return metodo_pago
 
 
-class EnvioSerializer(serializers.ModelSerializer):
+class EnvioSerializer(SerializacionMedida, MemoizadoMixin, serializers.ModelSerializer):
     # Para la entrada (creación/actualización): Este campo NO se espera del frontend.
     # Se asignará en la vista basándose en el restaurante de la URL y la propiedad.
     # Para la salida (lectura): Por defecto, serializará al ID del Restaurante.
@@ -125,13 +150,13 @@ class EnvioSerializer(serializers.ModelSerializer):
         # 'restaurante' se asigna en la vista.
         read_only_fields = ('id', 'restaurante', 'created_at', 'updated_at')
         
-class TipoCocinaSerializer(serializers.ModelSerializer):
+class TipoCocinaSerializer(SerializacionMedida, serializers.ModelSerializer):
     class Meta:
         model = TipoCocina
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at')
         
-class CategoriaSerializer(serializers.ModelSerializer):
+class CategoriaSerializer(SerializacionMedida, MemoizadoMixin, serializers.ModelSerializer):
     # Campo para el restaurante asociado. Lo marcamos como read_only=True porque
     # no esperamos que el frontend envíe el ID del restaurante al crear/actualizar categorías;
     # el restaurante se determinará por la URL y el usuario autenticado en la vista.
@@ -148,23 +173,29 @@ class CategoriaSerializer(serializers.ModelSerializer):
         # 'restaurante' se asigna en la vista, no se acepta en la entrada.
         read_only_fields = ('id', 'restaurante', 'slug', 'created_at', 'updated_at')
         
-class ProductoClienteSerializer(serializers.ModelSerializer):
+class ProductoClienteSerializer(SerializacionMedida, serializers.ModelSerializer):
     categoria = CategoriaSerializer(read_only=True)
+    imagen_variantes = VariantesImagenField()
     class Meta:
         model = Producto
+        select_related = ('categoria',)
+        list_serializer_class = ListaOptimizada
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at')
 
-class RestauranteSerializer(serializers.ModelSerializer):
+class RestauranteSerializer(SerializacionMedida, MemoizadoMixin, serializers.ModelSerializer):
     tipos_cocina = TipoCocinaSerializer(many=True, read_only=True) 
     redes_sociales = RedSocialSerializer(many=True, read_only=True)
     metodos_pago = MetodoPagoSerializer(many=True, read_only=True)
     envios = EnvioSerializer(many=True, read_only=True)
+    logo_variantes = VariantesImagenField()
     
     
     
     class Meta:
         model = Restaurante
+        prefetch_related = ('tipos_cocina', 'redes_sociales', 'metodos_pago', 'envios')
+        list_serializer_class = ListaOptimizada
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at')
 
@@ -181,7 +212,7 @@ class RestauranteSerializer(serializers.ModelSerializer):
 
 
 
-class ProductoSerializer(serializers.ModelSerializer):
+class ProductoSerializer(SerializacionMedida, MemoizadoMixin, serializers.ModelSerializer):
     # Para la entrada (creación/actualización): Aceptar el ID de la Categoría.
     categoria = serializers.PrimaryKeyRelatedField(queryset=Categoria.objects.all()) # <-- Sigue siendo escribible
 
@@ -191,10 +222,13 @@ class ProductoSerializer(serializers.ModelSerializer):
 
     # Opcional: Si quieres los detalles completos de la Categoría en la salida
     categoria_details = CategoriaSerializer(source='categoria', read_only=True)
+    imagen_variantes = VariantesImagenField()
 
 
     class Meta:
         model = Producto
+        select_related = ('categoria',)
+        list_serializer_class = ListaOptimizada
         fields = [
             'id',
             'categoria',
@@ -205,6 +239,7 @@ class ProductoSerializer(serializers.ModelSerializer):
             'descripcion',
             'precio',
             'imagen',
+            'imagen_variantes',
             'activo',
             'disponibilidad',
             'orden',
@@ -222,37 +257,55 @@ class ProductoSerializer(serializers.ModelSerializer):
         # y usarlo para crear la instancia de Producto. El método que te di antes es este:
 
     def create(self, validated_data):
-        print("[ProductoSerializer - create] Method called.")
         restaurante = self.context.get('restaurante') # Obtiene el objeto restaurante del contexto
 
         if not restaurante:
-            print("[ProductoSerializer - create] Error: 'restaurante' not found in serializer context.")
+            logger.error("ProductoSerializer.create: falta 'restaurante' en el contexto del serializador")
             # Esto debería lanzar un error si la vista no pasó el restaurante correctamente
             raise serializers.ValidationError("Error interno: Restaurante no fue proporcionado al serializador.")
 
-        print(f"[ProductoSerializer - create] Creating product for restaurant: {restaurante.slug}")
         # Crea la nueva instancia de Producto, pasando el objeto restaurante
         producto = Producto.objects.create(restaurante=restaurante, **validated_data)
 
-        print(f"[ProductoSerializer - create] Product created with ID: {producto.id}")
+        logger.debug("Producto %s creado para %s", producto.id, restaurante.slug)
         return producto
 
 
 
 
+class ProductoIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Acepta el ID de un producto sin consultarlo en la base de datos.
+    Devuelve una referencia Producto(pk=...) y deja la verificación de existencia
+    (y de pertenencia al restaurante) a OrdenSerializer.create, que carga todos
+    los productos de la orden en una sola consulta.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        return Producto(pk=pk)
+
+
 ## Serializador para los detalles de la orden (ítems)
-class DetalleOrdenSerializer(serializers.ModelSerializer):
+class DetalleOrdenSerializer(SerializacionMedida, RepresentacionMixin, serializers.ModelSerializer):
     # Este campo 'producto_details' es SOLO para la SALIDA (lectura).
     # Obtiene los datos del campo 'producto' del modelo y los serializa usando ProductoSerializer.
     producto_details = ProductoSerializer(source='producto', read_only=True) # Campo para la SALIDA
 
-    # El campo 'producto' (la ForeignKey al modelo Producto) se maneja implícitamente
-    # por ModelSerializer al estar en Meta.fields.
-    # Acepta el ID del producto en la ENTRADA por defecto. No necesitamos definirlo explícitamente aquí.
+    # Acepta el ID del producto en la ENTRADA sin hacer una consulta por ítem;
+    # OrdenSerializer.create valida todos los productos de una vez.
+    producto = ProductoIdField(queryset=Producto.objects.all())
 
+    # Con ?expand=items.producto (ver representacion.py); si no, solo el ID en 'producto'
+    EXPANSIONES = {'producto': 'producto_details'}
 
     class Meta:
         model = DetalleOrden
+        select_related = ('producto',)
         # Incluimos TODOS los campos que queremos manejar.
         # 'producto': Campo del modelo (ForeignKey) - Para ENTRADA (ID) y mapeo interno.
         # 'producto_details': Campo del serializador - Para SALIDA (detalles completos del producto).
@@ -281,7 +334,7 @@ class DetalleOrdenSerializer(serializers.ModelSerializer):
 
 
 # Serializador para la orden principal
-class OrdenSerializer(serializers.ModelSerializer):
+class OrdenSerializer(SerializacionMedida, RepresentacionMixin, serializers.ModelSerializer):
     restaurante_details = RestauranteSerializer(source='restaurante', read_only=True) # <-- Salida completa del Restaurante
     metodo_pago_details = MetodoPagoSerializer(source='metodo_pago', read_only=True) # <-- Salida completa del MetodoPago
     envio_details = EnvioSerializer(source='envio', read_only=True) # <-- Salida completa del Envio
@@ -292,8 +345,19 @@ class OrdenSerializer(serializers.ModelSerializer):
     # El nombre del campo DEBE coincidir con el related_name='items' en el ForeignKey de DetalleOrden a Orden
     items = DetalleOrdenSerializer(many=True) # many=True para una lista, NO read_only=True para aceptar entrada
 
+    # Relaciones que las vistas de lectura solo incluyen con ?expand= (ver representacion.py)
+    EXPANSIONES = {
+        'restaurante': 'restaurante_details',
+        'metodo_pago': 'metodo_pago_details',
+        'envio': 'envio_details',
+    }
+
     class Meta:
         model = Orden
+        # Plan de carga de los anidados (ver cargas.py)
+        select_related = ('restaurante', 'metodo_pago', 'envio')
+        prefetch_related = ('items',)
+        list_serializer_class = ListaOptimizada
         # Incluimos todos los campos necesarios para la entrada y salida.
         # 'usuario' se asigna típicamente en la vista desde request.user.
         # 'estado' tiene un default en el modelo.
@@ -324,11 +388,19 @@ class OrdenSerializer(serializers.ModelSerializer):
         # read_only_fields = ('id', 'usuario', 'estado', 'total', 'created_at', 'updated_at')
 
 
+    def validate_items(self, items):
+        # DetalleOrden tiene unique_together (orden, producto): un producto por línea
+        ids = [item['producto'].pk for item in items]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Cada producto solo puede aparecer una vez en la orden.")
+        return items
+
     # Sobrescribir el método create para manejar la creación de la Orden y sus DetalleOrden
     @transaction.atomic # Usar una transacción para asegurar que todo se guarde o nada se guarde
     def create(self, validated_data):
         # Extraer la lista de ítems de los datos validados ANTES de crear la Orden
         items_data = validated_data.pop('items')
+        restaurante = validated_data['restaurante']
 
         # **Asignar el usuario actual si está autenticado**
         # Esto se hace comúnmente en la vista, pasando request.user al serializador:
@@ -336,70 +408,78 @@ class OrdenSerializer(serializers.ModelSerializer):
         # Si lo haces en el serializador (menos común pero posible si pasas el request en el context):
         usuario_instance = validated_data.pop('usuario')
 
-        # Crear la instancia de la Orden (sin los ítems aún)
-        # validated_data ahora contiene todos los campos de Orden excepto 'items'
-        orden = Orden.objects.create(**validated_data)
+        # **Cargar todos los productos de la orden en UNA sola consulta**
+        # Filtrar también por restaurante: un producto de otro restaurante
+        # se trata igual que uno inexistente.
+        producto_ids = [item['producto'].pk for item in items_data]
+        productos = Producto.objects.filter(
+            id__in=producto_ids, restaurante=restaurante
+        ).only('id', 'precio').in_bulk()
+
+        faltantes = [pk for pk in producto_ids if pk not in productos]
+        if faltantes:
+            raise serializers.ValidationError(
+                f"Los productos con ID {faltantes} no existen o no pertenecen a este restaurante."
+            )
 
+        # Calcular los detalles y el total en memoria, con el precio actual de la BD
+        detalles = []
         total_orden_calculado = 0
-
-        # Procesar los ítems y crear los DetalleOrden
         for item_data in items_data:
-            producto_id = item_data.get('producto') # Obtenemos el ID del producto de los datos del ítem
-            cantidad = item_data.get('cantidad') # Obtenemos la cantidad
-
-            # **Validar y obtener el producto y su precio actual de la base de datos**
-            try:
-                producto = Producto.objects.get(id=producto_id.id) # item_data['producto'] es una instancia por PrimaryKeyRelatedField
-                precio_unitario_actual = producto.precio # OBTENER EL PRECIO DE LA BD
-            except Producto.DoesNotExist:
-                # Manejar error: el producto no existe. Lanzar una excepción de validación.
-                raise serializers.ValidationError(f"El producto con ID {producto_id.id} no existe.")
-            except AttributeError:
-                 # Manejar error si 'producto' no es una instancia válida (debería ser manejado por PrimaryKeyRelatedField)
-                 raise serializers.ValidationError("Datos de producto inválidos o faltantes en los ítems.")
-
-            # Calcular subtotal para este ítem
-            subtotal_item = cantidad * precio_unitario_actual
-
-            # Crear la instancia de DetalleOrden
-            DetalleOrden.objects.create(
-                orden=orden, # Asignar la orden que acabamos de crear
-                producto=producto, # Asignar la instancia del producto
+            producto = productos[item_data['producto'].pk]
+            cantidad = item_data['cantidad']
+            subtotal_item = cantidad * producto.precio
+            detalles.append(DetalleOrden(
+                producto=producto,
                 cantidad=cantidad,
-                precio_unitario=precio_unitario_actual, # Usar el precio obtenido de la BD
-                subtotal=subtotal_item # Usar el subtotal calculado
-            )
-
-            # Sumar al total calculado de la orden
+                precio_unitario=producto.precio,
+                # bulk_create no llama a DetalleOrden.save, así que el subtotal se asigna aquí
+                subtotal=subtotal_item,
+            ))
             total_orden_calculado += subtotal_item
 
-        # **Calcular y añadir el costo de envío al total**
-        costo_envio = 0
-        if orden.envio: # Verificar si se seleccionó una opción de envío (la instancia ya está en orden.envio)
-             try:
-                 # No necesitas hacer otro query si ya tienes la instancia relacionada
-                 costo_envio = orden.envio.precio
-             except AttributeError:
-                  # Manejar si 'envio' no tiene el atributo precio (no debería pasar si el modelo está bien)
-                  print(f"Advertencia: La instancia de Envío {orden.envio} no tiene el atributo precio.")
-                  costo_envio = 0
+        # **Añadir el costo de envío al total** (la instancia ya viene cargada por el serializador)
+        envio = validated_data.get('envio')
+        if envio is not None:
+            total_orden_calculado += envio.precio
 
+        # Crear la Orden con el total ya calculado (un solo INSERT, sin un segundo save)
+        orden = Orden.objects.create(total=total_orden_calculado, **validated_data)
 
-        total_orden_calculado += costo_envio
+        # Insertar todas las líneas de la orden en un único INSERT
+        for detalle in detalles:
+            detalle.orden = orden
+        DetalleOrden.objects.bulk_create(detalles)
 
-        # Guardar el total calculado en la instancia de la Orden
-        orden.total = total_orden_calculado
-        orden.save() # Guardar la orden nuevamente para actualizar el total
+        # Actualizar el resumen diario de ventas del restaurante
+        registrar_orden_creada(orden)
 
         # Devolver la instancia de la Orden creada y completa
         return orden
 
  
 
-class OrdenEstadoUpdateSerializer(serializers.ModelSerializer):
+class OrdenEstadoUpdateSerializer(SerializacionMedida, serializers.ModelSerializer):
     """
     Serializador para permitir solo la actualización del campo 'estado' de una orden.
     """
     class Meta:
         model = Orden
         fields = ['estado'] 
+
+
+class FilaMenuSerializer(serializers.Serializer):
+    """
+    Valida una fila de la importación masiva del menú (ver importacion.py).
+    La categoría se indica por nombre y se crea si no existe; el producto se
+    identifica por slug (si no viene, se deriva del nombre).
+    """
+    categoria = serializers.CharField(max_length=100)
+    nombre = serializers.CharField(max_length=150)
+    slug = serializers.SlugField(max_length=150, required=False, allow_blank=True)
+    descripcion = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    precio = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    activo = serializers.BooleanField(required=False)
+    disponibilidad = serializers.ChoiceField(choices=Producto.DISPONIBILIDAD, required=False)
+    orden = serializers.IntegerField(min_value=0, required=False)
+    destacado = serializers.BooleanField(required=False)
@@ -0,0 +1,130 @@
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Producto, Categoria, Restaurante, TipoCocina
+from .menu_snapshot import invalidar_menu
+from .busqueda import obtener_backend
+from .horarios import actualizar_ventanas
+from .imagenes import necesita_variantes, programar_variantes
+from .propiedad import invalidar_propiedad
+from .autenticacion import invalidar_usuario
+
+
+# --- Snapshots del menú ---
+# Cualquier cambio en productos o categorías deja obsoleto el menú pre-serializado
+# del restaurante. Nota: queryset.update() y bulk_create() no disparan señales,
+# quien los use debe llamar a invalidar_menu() manualmente.
+
+@receiver([post_save, post_delete], sender=Producto)
+def invalidar_menu_por_producto(sender, instance, **kwargs):
+    invalidar_menu(instance.restaurante_id)
+
+
+@receiver([post_save, post_delete], sender=Categoria)
+def invalidar_menu_por_categoria(sender, instance, **kwargs):
+    invalidar_menu(instance.restaurante_id)
+
+
+# --- ETag de restaurantes ---
+# TipoCocina no tiene updated_at: cuando cambian los tipos de un restaurante
+# (o el nombre de un tipo) se actualiza updated_at de los restaurantes afectados
+# para que su ETag / Last-Modified cambie (ver conditional.py).
+
+@receiver(m2m_changed, sender=Restaurante.tipos_cocina.through)
+def tocar_restaurante_por_tipos_cocina(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # instance es un TipoCocina; pk_set son restaurantes (None en clear)
+        restaurantes = Restaurante.objects.filter(pk__in=pk_set) if pk_set else Restaurante.objects.none()
+    else:
+        restaurantes = Restaurante.objects.filter(pk=instance.pk)
+    restaurantes.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=TipoCocina)
+def tocar_restaurantes_por_tipo_cocina(sender, instance, created, **kwargs):
+    if not created:
+        Restaurante.objects.filter(tipos_cocina=instance).update(updated_at=timezone.now())
+
+
+# --- Índice de búsqueda de productos ---
+# Igual que con los snapshots, bulk_create/update() no disparan estas señales:
+# quien los use debe llamar a obtener_backend().indexar(ids).
+
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, **kwargs):
+    obtener_backend().indexar([instance.pk])
+
+
+@receiver(post_delete, sender=Producto)
+def desindexar_producto(sender, instance, **kwargs):
+    obtener_backend().eliminar([instance.pk])
+
+
+@receiver(post_save, sender=Categoria)
+def reindexar_productos_de_categoria(sender, instance, created, **kwargs):
+    # El nombre de la categoría forma parte del documento indexado
+    if not created:
+        obtener_backend().indexar(instance.productos.values_list('id', flat=True))
+
+
+# --- Ventanas de apertura ("abierto ahora") ---
+
+@receiver(post_save, sender=Restaurante)
+def actualizar_ventanas_apertura(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'hora_apertura', 'hora_cierre'} & set(update_fields):
+        return
+    actualizar_ventanas(instance)
+
+
+# --- Variantes de imágenes (miniaturas y WebP) ---
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Restaurante)
+def programar_variantes_imagen(sender, instance, **kwargs):
+    if necesita_variantes(instance):
+        programar_variantes(instance)
+
+
+# --- Propiedad de restaurantes en los tokens JWT ---
+# Crear, borrar, transferir o renombrar un restaurante cambia la versión de la
+# propiedad del propietario anterior y del nuevo (ver propiedad.py). Como con
+# los snapshots, queryset.update() no dispara señales: quien cambie así
+# propietarios o slugs debe llamar a invalidar_propiedad().
+
+@receiver(pre_save, sender=Restaurante)
+def recordar_propiedad_anterior(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if instance.pk is None or (update_fields is not None and not {'propietario', 'slug'} & set(update_fields)):
+        instance._propiedad_anterior = None
+        return
+    instance._propiedad_anterior = (
+        Restaurante.objects.filter(pk=instance.pk).values_list('propietario_id', 'slug').first()
+    )
+
+
+@receiver(post_save, sender=Restaurante)
+def invalidar_propiedad_por_restaurante(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_propiedad_anterior', None)
+    if created:
+        invalidar_propiedad(instance.propietario_id)
+    elif anterior is not None and anterior != (instance.propietario_id, instance.slug):
+        invalidar_propiedad(instance.propietario_id, anterior[0])
+
+
+@receiver(post_delete, sender=Restaurante)
+def invalidar_propiedad_por_borrado(sender, instance, **kwargs):
+    invalidar_propiedad(instance.propietario_id)
+
+
+# --- Instantáneas de usuarios para la autenticación JWT ---
+# Guardar (p. ej. desactivar) o borrar un usuario descarta su instantánea en
+# este proceso; en los demás caduca tras AUTENTICACION_CACHE_TTL (ver autenticacion.py).
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidar_instantanea_usuario(sender, instance, **kwargs):
+    invalidar_usuario(instance)
@@ -0,0 +1,157 @@
+"""
+Asignación de slugs únicos con un número constante de consultas.
+
+En vez de probar 'pizza', 'pizza-1', 'pizza-2'... con un .exists() por intento,
+se leen de una vez todos los slugs del alcance que empiezan por la base (un
+rango sobre el índice único del slug), se quedan los de la forma '<base>' o
+'<base>-<n>' y se elige en memoria lo mismo que elegían los .exists(): la
+base si está libre y, si no, el primer '<base>-<n>' libre. Si otra petición
+inserta el mismo slug en paralelo, el guardado falla por la restricción única y
+se reintenta con un slug nuevo.
+
+- SlugUnicoMixin: para save() de un modelo (un objeto).
+- asignar_slugs(): modo en bloque para bulk_create (miles de objetos, una
+  consulta por alcance y por cada 200 bases distintas).
+"""
+import operator
+import re
+from functools import reduce
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+INTENTOS = 5
+BASES_POR_CONSULTA = 200
+PREFIJO_MAXIMO = '\U0010ffff'
+
+
+def slug_base(texto, max_length, respaldo):
+    """slugify del texto, recortado al largo del campo; 'respaldo' si queda vacío."""
+    return slugify(texto or '')[:max_length].strip('-') or respaldo
+
+
+def con_sufijo(base, num, max_length):
+    sufijo = f'-{num}'
+    return f"{base[:max_length - len(sufijo)].rstrip('-')}{sufijo}"
+
+
+def _filtro_alcance(obj, alcance):
+    """Filtro del queryset con los campos que delimitan la unicidad (p. ej. restaurante)."""
+    filtro = {}
+    for nombre in alcance:
+        attname = obj._meta.get_field(nombre).attname
+        filtro[attname] = getattr(obj, attname)
+    return filtro
+
+
+def _con_prefijo(base, vendor):
+    """
+    Filtro de los slugs que empiezan por base. En PostgreSQL el LIKE usa el
+    índice *_like que Django crea para los slugs; el LIKE de SQLite no usa
+    índices (no distingue mayúsculas), así que se acota además con un rango
+    [base, base + U+10FFFF), que coincide con el prefijo en su orden binario.
+    """
+    filtro = Q(slug__startswith=base)
+    if vendor == 'sqlite':
+        filtro &= Q(slug__gte=base, slug__lt=base + PREFIJO_MAXIMO)
+    return filtro
+
+
+def _slugs_ocupados(queryset, bases):
+    """Slugs existentes en el queryset que son alguna de las bases o base-<n>."""
+    ocupados = set()
+    bases = sorted(bases)
+    vendor = connections[queryset.db].vendor
+    for i in range(0, len(bases), BASES_POR_CONSULTA):
+        grupo = bases[i:i + BASES_POR_CONSULTA]
+        # REGEXP no puede usar el índice (en SQLite es una función de Python por fila):
+        # la base y el sufijo -<n> se comprueban aquí sobre los slugs con ese prefijo
+        forma = re.compile(rf"^({'|'.join(re.escape(base) for base in grupo)})(-[0-9]+)?$")
+        filtro = reduce(operator.or_, (_con_prefijo(base, vendor) for base in grupo))
+        ocupados.update(
+            slug for slug in queryset.filter(filtro).values_list('slug', flat=True) if forma.match(slug)
+        )
+    return ocupados
+
+
+def _primer_sufijo_libre(base, ocupados, max_length, desde=1):
+    """(n, slug) del primer '<base>-<n>' con n >= desde que no está en ocupados."""
+    num = desde
+    slug = con_sufijo(base, num, max_length)
+    while slug in ocupados:
+        num += 1
+        slug = con_sufijo(base, num, max_length)
+    return num, slug
+
+
+def generar_slug(obj):
+    """Slug libre para obj según su slug_origen y slug_alcance (una consulta)."""
+    max_length = obj._meta.get_field('slug').max_length
+    base = slug_base(getattr(obj, obj.slug_origen), max_length, obj._meta.model_name)
+    queryset = type(obj)._default_manager.filter(**_filtro_alcance(obj, obj.slug_alcance))
+    if obj.pk is not None:
+        queryset = queryset.exclude(pk=obj.pk)
+    ocupados = _slugs_ocupados(queryset, [base])
+    if base not in ocupados:
+        return base
+    return _primer_sufijo_libre(base, ocupados, max_length)[1]
+
+
+def asignar_slugs(objetos):
+    """
+    Asigna slugs únicos a objetos nuevos (sin guardar) que no tengan slug,
+    para usar antes de bulk_create. Tiene en cuenta tanto los slugs de la base
+    de datos como los ya repartidos dentro del mismo lote.
+    """
+    objetos = [obj for obj in objetos if not obj.slug]
+    if not objetos:
+        return
+    modelo = type(objetos[0])
+    max_length = modelo._meta.get_field('slug').max_length
+    por_alcance = {}
+    for obj in objetos:
+        base = slug_base(getattr(obj, obj.slug_origen), max_length, modelo._meta.model_name)
+        filtro = _filtro_alcance(obj, obj.slug_alcance)
+        por_alcance.setdefault(tuple(sorted(filtro.items())), []).append((obj, base))
+
+    for alcance, pendientes in por_alcance.items():
+        bases = {base for _, base in pendientes}
+        ocupados = _slugs_ocupados(modelo._default_manager.filter(**dict(alcance)), bases)
+        # Por base, el sufijo desde el que seguir buscando (los anteriores ya están ocupados)
+        siguiente = {}
+        for obj, base in pendientes:
+            if base not in ocupados:
+                slug = base
+            else:
+                num, slug = _primer_sufijo_libre(base, ocupados, max_length, siguiente.get(base, 1))
+                siguiente[base] = num + 1
+            ocupados.add(slug)
+            obj.slug = slug
+
+
+class SlugUnicoMixin:
+    """
+    Autogenera el slug en save() cuando viene vacío. slug_origen es el campo
+    del que se deriva y slug_alcance los campos que, junto con el slug, deben
+    ser únicos (vacío = único en toda la tabla).
+    """
+    slug_origen = 'nombre'
+    slug_alcance = ()
+
+    def save(self, *args, **kwargs):
+        if self.slug:
+            return super().save(*args, **kwargs)
+        for intento in range(INTENTOS):
+            self.slug = generar_slug(self)
+            try:
+                with transaction.atomic(using=kwargs.get('using')):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Solo se reintenta si el conflicto fue el slug (p. ej. insert concurrente)
+                repetido = type(self)._default_manager.filter(
+                    slug=self.slug, **_filtro_alcance(self, self.slug_alcance)
+                ).exclude(pk=self.pk).exists()
+                if not repetido or intento == INTENTOS - 1:
+                    raise
+                self.slug = ''
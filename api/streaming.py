@@ -0,0 +1,92 @@
+"""
+Respuestas JSON en streaming para listados grandes.
+
+En lugar de serializar toda la lista en memoria, se recorre el queryset por
+bloques con .iterator(chunk_size=...) y se serializa fila por fila, emitiendo
+un array JSON (o NDJSON, un objeto por línea) desde un generador. La memoria
+por worker se mantiene constante y el primer byte sale enseguida.
+
+Modos (opt-in, sin cambiar la respuesta por defecto de los endpoints):
+- ?stream=json (o ?stream=1)          -> array JSON idéntico al de la vista normal
+- ?stream=ndjson o Accept: application/x-ndjson -> NDJSON
+"""
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+from .cargas import optimizar
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+CHUNK_SIZE = 500
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer para 'application/x-ndjson'. Permite que la negociación de contenido
+    de DRF acepte ese Accept en las vistas con streaming; las respuestas que no
+    salen por streaming (p. ej. errores) se renderizan como una línea por elemento.
+    """
+    media_type = NDJSON_CONTENT_TYPE
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        filas = data if isinstance(data, list) else [data]
+        return b''.join(JSONRenderer().render(fila) + b'\n' for fila in filas)
+
+
+# Renderers de las vistas que admiten streaming: los de siempre más NDJSON
+RENDERERS_STREAMING = list(api_settings.DEFAULT_RENDERER_CLASSES) + [NDJSONRenderer]
+
+
+def formato_streaming(request):
+    """Devuelve 'json', 'ndjson' o None (sin streaming) según la petición."""
+    valor = request.GET.get('stream', '').lower()
+    if valor == 'ndjson' or NDJSON_CONTENT_TYPE in request.META.get('HTTP_ACCEPT', ''):
+        return 'ndjson'
+    if valor in ('1', 'true', 'json'):
+        return 'json'
+    return None
+
+
+def _filas_serializadas(queryset, serializer_class, context, chunk_size):
+    renderer = JSONRenderer()
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        yield renderer.render(serializer_class(obj, context=context).data)
+
+
+def generar_json(filas):
+    """Emite un array JSON a partir de filas ya renderizadas."""
+    yield b'['
+    primero = True
+    for fila in filas:
+        if not primero:
+            yield b','
+        primero = False
+        yield fila
+    yield b']'
+
+
+def generar_ndjson(filas):
+    for fila in filas:
+        yield fila + b'\n'
+
+
+def respuesta_streaming(queryset, serializer_class, formato, context=None, chunk_size=CHUNK_SIZE):
+    """
+    Construye un StreamingHttpResponse que serializa el queryset fila por fila.
+    formato es el valor devuelto por formato_streaming(): 'json' o 'ndjson'.
+    """
+    # Las relaciones anidadas se cargan por bloques con el plan del serializador (ver cargas.py)
+    queryset = optimizar(queryset, serializer_class, context)
+    filas = _filas_serializadas(queryset, serializer_class, context or {}, chunk_size)
+    if formato == 'ndjson':
+        response = StreamingHttpResponse(generar_ndjson(filas), content_type=NDJSON_CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(generar_json(filas), content_type='application/json')
+    # El mismo URL devuelve array JSON o NDJSON según el Accept: las cachés deben separarlos
+    patch_vary_headers(response, ['Accept'])
+    return response
@@ -1,3 +1,1451 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gc
+import io
+import json
+import logging.handlers
+import tempfile
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import Restaurante, Categoria, Producto, Envio, Orden, TipoCocina, VentaDiaria, MenuSnapshot
+from .serializers import (
+    OrdenSerializer, RestauranteSerializer, ProductoSerializer, ProductoClienteSerializer, VariantesImagenField,
+)
+from .slugs import generar_slug, asignar_slugs
+from .importacion import importar_menu
+from .instrumentacion import firma_sql
+from .registro import ContextoPeticionFilter, FormateadorJSON
+from .proyecciones import proyectar
+from .datos_prueba import GeneradorDatos
+from .propiedad import cache_compartida, comprobar_cache_propiedad, version_actual
+from .autenticacion import CacheUsuarios, cache_usuarios
+from .menu_snapshot import construir_menu, invalidar_menu, obtener_menu
+from .ventas import reconstruir_ventas_diarias
+from .busqueda import TABLA_FTS, buscar_productos, obtener_backend
+from .exportacion import COLUMNAS
+from .eventos import Broker, BrokerEnMemoria, canal_restaurante, obtener_broker
+from .horarios import minuto_de_la_semana, restaurantes_abiertos, ventanas_semana
+
+
+def setUpModule():
+    # Un registro INFO de instrumentación por petición inunda la salida de los tests:
+    # solo se escriben los avisos (N+1). Los tests que los leen bajan el nivel con assertLogs.
+    logger = logging.getLogger('api.instrumentacion')
+    global _nivel_instrumentacion
+    _nivel_instrumentacion = logger.level
+    logger.setLevel(logging.WARNING)
+
+
+def tearDownModule():
+    logging.getLogger('api.instrumentacion').setLevel(_nivel_instrumentacion)
+
+
+class OrdenesTestCase(TestCase):
+    """Restaurante con productos y un envío, y ayudas para crear órdenes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.propietario = User.objects.create_user('propietario', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=cls.propietario, nombre='La Esquina',
+            direccion='Calle 1', telefono='123', descripcion='Comida casera')
+        cls.otro_restaurante = Restaurante.objects.create(
+            propietario=cls.propietario, nombre='Otro Local',
+            direccion='Calle 2', telefono='456', descripcion='Otro')
+        categoria = Categoria.objects.create(restaurante=cls.restaurante, nombre='Platos')
+        cls.productos = [
+            Producto.objects.create(
+                restaurante=cls.restaurante, categoria=categoria,
+                nombre=f'Plato {i}', precio=Decimal('10.00') + i)
+            for i in range(30)
+        ]
+        cls.envio = Envio.objects.create(restaurante=cls.restaurante, nombre='Domicilio', precio=Decimal('3.50'))
+        otra_categoria = Categoria.objects.create(restaurante=cls.otro_restaurante, nombre='Otros')
+        cls.producto_ajeno = Producto.objects.create(
+            restaurante=cls.otro_restaurante, categoria=otra_categoria, nombre='Ajeno', precio=Decimal('5.00'))
+
+    def datos_orden(self, productos, **extra):
+        datos = {
+            'restaurante': self.restaurante.id,
+            'direccion_envio': 'Av. Siempre Viva 742',
+            'items': [{'producto': p.id, 'cantidad': 2} for p in productos],
+        }
+        datos.update(extra)
+        return datos
+
+    def crear(self, datos):
+        serializer = OrdenSerializer(data=datos)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save(usuario=None)
+
+
+class CrearOrdenTests(OrdenesTestCase):
+    """Creación de órdenes con carga de productos e inserción de ítems en bloque."""
+
+    def test_calcula_total_con_envio(self):
+        orden = self.crear(self.datos_orden(self.productos[:3], envio=self.envio.id))
+        # (10 + 11 + 12) * 2 + 3.50
+        self.assertEqual(orden.total, Decimal('69.50'))
+        self.assertEqual(orden.items.count(), 3)
+        self.assertEqual(
+            sorted(orden.items.values_list('subtotal', flat=True)),
+            [Decimal('20.00'), Decimal('22.00'), Decimal('24.00')])
+
+    def test_rechaza_productos_de_otro_restaurante(self):
+        serializer = OrdenSerializer(data=self.datos_orden([self.productos[0], self.producto_ajeno]))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(ValidationError):
+            serializer.save(usuario=None)
+        self.assertFalse(Orden.objects.exists())
+
+    def test_rechaza_productos_repetidos(self):
+        serializer = OrdenSerializer(data=self.datos_orden([self.productos[0], self.productos[0]]))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('items', serializer.errors)
+
+    def test_numero_de_consultas_no_crece_con_los_items(self):
+        # Benchmark de consultas: validar y crear una orden de 1 ítem y otra de 30
+        # debe costar exactamente lo mismo en número de consultas.
+        # La primera orden del día además crea la fila de VentaDiaria; se crea antes de medir.
+        self.crear(self.datos_orden(self.productos[:1]))
+        conteos = {}
+        for n in (1, 5, 30):
+            with CaptureQueriesContext(connection) as ctx:
+                self.crear(self.datos_orden(self.productos[:n]))
+            conteos[n] = len(ctx.captured_queries)
+        self.assertEqual(conteos[1], conteos[5])
+        self.assertEqual(conteos[1], conteos[30])
+
+
+class RepresentacionOrdenTests(OrdenesTestCase):
+    """?fields= y ?expand= en las vistas de órdenes (ver representacion.py)."""
+    client_class = APIClient
+
+    def setUp(self):
+        self.client.force_authenticate(self.propietario)
+        self.url = f'/api/restaurantes/{self.restaurante.slug}/ordenes/'
+
+    def test_compacta_por_defecto_y_expansion_opcional(self):
+        orden = self.crear(self.datos_orden(self.productos[:2], envio=self.envio.id))
+        compacta = self.client.get(self.url).json()[0]
+        self.assertEqual(compacta['envio'], self.envio.id)
+        self.assertNotIn('restaurante_details', compacta)
+        self.assertNotIn('producto_details', compacta['items'][0])
+
+        expandida = self.client.get(self.url, {'expand': 'envio,items.producto', 'fields': 'id,items.cantidad'}).json()[0]
+        self.assertEqual(expandida['id'], orden.id)
+        self.assertEqual(expandida['envio_details']['nombre'], 'Domicilio')
+        self.assertEqual(set(expandida['items'][0]), {'cantidad', 'producto_details'})
+        self.assertNotIn('restaurante_details', expandida)
+
+        respuesta = self.client.get(f'/api/ordenes/{orden.id}/', {'expand': 'menu'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('expand', respuesta.json())
+
+    def test_consultas_no_crecen_con_las_ordenes(self):
+        parametros = {'expand': 'restaurante,metodo_pago,envio,items.producto'}
+        self.crear(self.datos_orden(self.productos[:3], envio=self.envio.id))
+        with CaptureQueriesContext(connection) as una:
+            self.client.get(self.url, parametros)
+        for i in range(5):
+            self.crear(self.datos_orden(self.productos[i:i + 3]))
+        with CaptureQueriesContext(connection) as varias:
+            self.client.get(self.url, parametros)
+        self.assertEqual(len(una.captured_queries), len(varias.captured_queries))
+
+
+class MemoizacionTests(OrdenesTestCase):
+    """Cada objeto relacionado se consulta y serializa una vez por respuesta (ver memoizacion.py)."""
+
+    def serializar(self):
+        ordenes = Orden.objects.prefetch_related('items')
+        with CaptureQueriesContext(connection) as ctx:
+            datos = OrdenSerializer(ordenes, many=True).data
+        return datos, len(ctx.captured_queries)
+
+    def test_consultas_por_objeto_distinto(self):
+        self.crear(self.datos_orden(self.productos[:3], envio=self.envio.id))
+        _, una = self.serializar()
+        for _ in range(5):
+            self.crear(self.datos_orden(self.productos[:3], envio=self.envio.id))
+        datos, seis = self.serializar()
+        self.assertEqual(una, seis)
+        self.assertEqual(datos[0]['restaurante_details'], datos[5]['restaurante_details'])
+        self.assertEqual(datos[0]['items'][0]['producto_details']['categoria_details']['nombre'], 'Platos')
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Las consultas de los listados no deben crecer con el número de filas (ver cargas.py)."""
+    client_class = APIClient
+    maxDiff = None
+
+    def sembrar(self, cantidad):
+        generador = GeneradorDatos(semilla=7, prefijo='presupuesto')
+        restaurantes = generador.restaurantes(cantidad, categorias=2)
+        generador.productos(restaurantes, 4 * cantidad)
+        generador.ordenes(restaurantes, 4 * cantidad, items=3)
+        generador.finalizar()
+        return restaurantes[0]
+
+    def contar(self, urls):
+        conteos = {}
+        for url in urls:
+            # La primera petición construye el snapshot del menú y llena las cachés
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                respuesta = self.client.get(url)
+                if respuesta.streaming:
+                    b''.join(respuesta.streaming_content)
+            self.assertEqual(respuesta.status_code, 200, url)
+            conteos[url] = len(ctx.captured_queries)
+        return conteos
+
+    def test_listados_no_crecen_con_las_filas(self):
+        restaurante = self.sembrar(2)
+        self.client.force_authenticate(restaurante.propietario)
+        slug = {'restaurante_slug': restaurante.slug}
+        categoria = Categoria.objects.filter(restaurante=restaurante).first()
+        ordenes = reverse('listar_ordenes_restaurante', kwargs=slug)
+        todo = 'expand=restaurante,metodo_pago,envio,items.producto'
+        urls = [
+            reverse('restaurante_list_create'),
+            reverse('restaurante_list_create') + '?stream=json',
+            reverse('descubrir_restaurantes'),
+            reverse('listar_mis_restaurantes'),
+            ordenes,
+            f'{ordenes}?{todo}',
+            f'{ordenes}?{todo}&page_size=200',
+            f'{ordenes}?{todo}&stream=ndjson',
+            reverse('restaurante_dashboard_summary', kwargs=slug),
+            reverse('productos_por_restaurante', kwargs=slug),
+            reverse('productos_por_restaurante', kwargs=slug) + '?stream=json',
+            reverse('restaurant_menu_list', kwargs=slug),
+            reverse('categoria_list_create_restaurante', kwargs=slug),
+            reverse('producto_list_create_restaurante_categoria', kwargs={**slug, 'categoria_id': categoria.id}),
+            reverse('redsocial_list_create_restaurante', kwargs=slug),
+            reverse('metodopago_list_create_restaurante', kwargs=slug),
+            reverse('envio_list_create_restaurante', kwargs=slug),
+            reverse('buscar_productos_restaurante', kwargs=slug) + '?q=producto',
+        ]
+        pocas = self.contar(urls)
+        self.sembrar(5)
+        self.assertEqual(self.contar(urls), pocas)
+
+
+class SlugUnicoTests(TestCase):
+    """Slugs autogenerados con una sola consulta de prefijo y modo en bloque."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.propietario = User.objects.create_user('propietario', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=cls.propietario, nombre='Pizza', direccion='Calle 1',
+            telefono='123', descripcion='Pizzas')
+        cls.categoria = Categoria.objects.create(restaurante=cls.restaurante, nombre='Pizzas')
+
+    def test_siguiente_sufijo_libre(self):
+        slugs = [
+            Restaurante.objects.create(
+                propietario=self.propietario, nombre='Pizza', direccion='d',
+                telefono='1', descripcion='x').slug
+            for _ in range(3)
+        ]
+        self.assertEqual(slugs, ['pizza-1', 'pizza-2', 'pizza-3'])
+        # Una sola consulta para encontrar el sufijo, sin importar cuántos existan
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(generar_slug(Restaurante(nombre='Pizza')), 'pizza-4')
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_ignora_slugs_que_solo_comparten_prefijo(self):
+        for nombre in ['Pizzas', 'Pizza napolitana', 'Pizza 7b']:
+            Restaurante.objects.create(
+                propietario=self.propietario, nombre=nombre, direccion='d', telefono='1', descripcion='x')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(generar_slug(Restaurante(nombre='Pizza')), 'pizza-1')
+        sql = ctx.captured_queries[0]['sql']
+        self.assertNotIn('REGEXP', sql.upper())
+        # El rango del prefijo usa el índice único del slug en vez de recorrer la tabla
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(fila[-1]) for fila in cursor.fetchall())
+        self.assertIn('USING', plan)
+        self.assertNotIn('SCAN api_restaurante', plan)
+
+    def test_base_libre_aunque_existan_sufijos(self):
+        Restaurante.objects.filter(pk=self.restaurante.pk).update(slug='pizza-2')
+        self.assertEqual(generar_slug(Restaurante(nombre='Pizza')), 'pizza')
+        nuevos = [Restaurante(propietario=self.propietario, nombre='Pizza') for _ in range(3)]
+        asignar_slugs(nuevos)
+        self.assertEqual([r.slug for r in nuevos], ['pizza', 'pizza-1', 'pizza-3'])
+
+    def test_nombre_con_numero_no_desplaza_el_sufijo(self):
+        Restaurante.objects.create(
+            propietario=self.propietario, nombre='Pizza 2024', direccion='d', telefono='1', descripcion='x')
+        self.assertEqual(generar_slug(Restaurante(nombre='Pizza')), 'pizza-1')
+
+    def test_productos_unicos_por_restaurante(self):
+        otra = Categoria.objects.create(restaurante=self.restaurante, nombre='Especiales')
+        a = Producto.objects.create(restaurante=self.restaurante, categoria=self.categoria, nombre='Combo', precio=1)
+        b = Producto.objects.create(restaurante=self.restaurante, categoria=otra, nombre='Combo', precio=1)
+        self.assertEqual((a.slug, b.slug), ('combo', 'combo-1'))
+
+    def test_asignar_slugs_en_bloque(self):
+        Producto.objects.create(restaurante=self.restaurante, categoria=self.categoria, nombre='Bebida', precio=1)
+        nuevos = [
+            Producto(restaurante=self.restaurante, categoria=self.categoria, nombre=nombre, precio=1)
+            for nombre in ['Bebida', 'Bebida', 'Agua', '¡!']
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            asignar_slugs(nuevos)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual([p.slug for p in nuevos], ['bebida-1', 'bebida-2', 'agua', 'producto'])
+        Producto.objects.bulk_create(nuevos)
+
+
+class ImportarMenuTests(TestCase):
+    """Importación masiva del menú: upsert por slug y errores por fila."""
+
+    @classmethod
+    def setUpTestData(cls):
+        propietario = User.objects.create_user('propietario', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=propietario, nombre='La Esquina', direccion='Calle 1',
+            telefono='123', descripcion='Comida casera')
+        categoria = Categoria.objects.create(restaurante=cls.restaurante, nombre='Pizzas')
+        Producto.objects.create(
+            restaurante=cls.restaurante, categoria=categoria, nombre='Margarita', precio=Decimal('9.00'))
+
+    def test_csv_crea_actualiza_e_informa_errores(self):
+        archivo = io.BytesIO(
+            "categoria,nombre,precio\n"
+            "Pizzas,Margarita,11.00\n"
+            "Bebidas,Agua,2\n"
+            "Bebidas,Jugo,no-es-precio\n".encode()
+        )
+        resultado = importar_menu(self.restaurante, archivo, 'csv', tamano_lote=2)
+        self.assertEqual((resultado['creados'], resultado['actualizados']), (1, 1))
+        self.assertEqual(resultado['categorias_creadas'], 1)
+        self.assertEqual([error['fila'] for error in resultado['errores']], [3])
+        self.assertEqual(
+            Producto.objects.get(restaurante=self.restaurante, slug='margarita').precio, Decimal('11.00'))
+        self.assertTrue(Categoria.objects.filter(restaurante=self.restaurante, nombre='Bebidas').exists())
+
+    def test_json_array_y_ndjson(self):
+        filas = [{'categoria': 'Postres', 'nombre': f'Postre {i}', 'precio': '3.50'} for i in range(5)]
+        for contenido in (json.dumps(filas), '\n'.join(json.dumps(fila) for fila in filas)):
+            resultado = importar_menu(self.restaurante, io.BytesIO(contenido.encode()), 'json')
+            self.assertIsNone(resultado['error_archivo'])
+            self.assertEqual(resultado['filas'], 5)
+        self.assertEqual(Producto.objects.filter(categoria__nombre='Postres').count(), 5)
+
+
+class InstrumentacionTests(TestCase):
+    """Métricas por petición del middleware de instrumentación."""
+
+    @classmethod
+    def setUpTestData(cls):
+        propietario = User.objects.create_user('propietario', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=propietario, nombre='La Esquina', direccion='Calle 1',
+            telefono='123', descripcion='Comida casera')
+
+    def test_server_timing_y_registro(self):
+        with self.assertLogs('api.instrumentacion', level='INFO') as logs:
+            response = self.client.get(f'/api/restaurantes/{self.restaurante.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", .*total;dur=')
+        datos = logs.records[-1].instrumentacion
+        self.assertEqual(datos['vista'], 'restaurante_detail')
+        self.assertGreater(datos['consultas'], 0)
+        self.assertIn('ser', datos['segmentos_ms'])
+
+    def test_server_timing_solo_para_staff(self):
+        url = f'/api/restaurantes/{self.restaurante.slug}/'
+        staff = User.objects.create_user('staff', password='x', is_staff=True)
+        with self.settings(INSTRUMENTACION_CABECERA='staff'):
+            cliente = APIClient()
+            self.assertNotIn('Server-Timing', cliente.get(url))
+            cliente.force_authenticate(User.objects.create_user('cliente', password='x'))
+            self.assertNotIn('Server-Timing', cliente.get(url))
+            cliente.force_authenticate(staff)
+            self.assertIn('Server-Timing', cliente.get(url))
+        with self.settings(INSTRUMENTACION_CABECERA=False):
+            self.assertNotIn('Server-Timing', APIClient().get(url))
+
+    def test_firma_agrupa_listas_de_parametros(self):
+        self.assertEqual(
+            firma_sql('SELECT * FROM t WHERE id IN (%s, %s, %s)'), firma_sql('SELECT * FROM t WHERE id IN (%s, %s)'))
+
+
+class RegistroTests(TestCase):
+    """Request id por petición y formato JSON de los logs."""
+
+    def test_request_id_en_respuesta_y_registros(self):
+        # Handler con el filtro de contexto, como el de LOGGING (assertLogs no aplica los filtros)
+        handler = logging.handlers.BufferingHandler(capacity=100)
+        handler.addFilter(ContextoPeticionFilter())
+        logger = logging.getLogger('api.instrumentacion')
+        # En los tests el logger solo deja pasar WARNING (ver setUpModule)
+        nivel = logger.level
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        try:
+            response = self.client.get('/api/descubrir/', headers={'X-Request-ID': 'abc-123'})
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(nivel)
+        self.assertEqual(response['X-Request-ID'], 'abc-123')
+        linea = json.loads(FormateadorJSON().format(handler.buffer[-1]))
+        self.assertEqual(linea['request_id'], 'abc-123')
+        self.assertEqual(linea['instrumentacion']['vista'], 'descubrir_restaurantes')
+
+        # Un id no válido se reemplaza por uno generado
+        response = self.client.get('/api/descubrir/', headers={'X-Request-ID': 'no válido'})
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_no_registra_la_query_string_ni_tokens(self):
+        # django.request añade la petición a los registros de 4xx; su repr incluye la query string
+        handler = logging.handlers.BufferingHandler(capacity=100)
+        logger = logging.getLogger('django.request')
+        logger.addHandler(handler)
+        try:
+            response = self.client.get('/api/ordenes/999999/?token=secreto.jwt&expand=restaurante')
+        finally:
+            logger.removeHandler(handler)
+        self.assertEqual(response.status_code, 404)
+        linea = FormateadorJSON().format(handler.buffer[-1])
+        self.assertNotIn('secreto', linea)
+        self.assertEqual(json.loads(linea)['request'], 'GET /api/ordenes/999999/')
+
+        registro = logging.makeLogRecord({'msg': 'GET /api/x/?a=1&token=secreto.jwt HTTP/1.1'})
+        self.assertEqual(
+            json.loads(FormateadorJSON().format(registro))['mensaje'], 'GET /api/x/?a=1&token=[oculto] HTTP/1.1')
+
+
+class ProyeccionTests(TestCase):
+    """Las proyecciones sobre values() deben producir los mismos bytes que los serializadores."""
+
+    @classmethod
+    def setUpTestData(cls):
+        propietario = User.objects.create_user('propietario', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=propietario, nombre='La Esquina', direccion='Calle 1',
+            telefono='123', descripcion='Comida casera')
+        Restaurante.objects.create(
+            propietario=propietario, nombre='Otro', direccion='Calle 2', telefono='456', descripcion='')
+        cls.restaurante.tipos_cocina.add(TipoCocina.objects.create(nombre='Casera'))
+        Envio.objects.create(restaurante=cls.restaurante, nombre='Moto', precio=Decimal('2.50'))
+        categoria = Categoria.objects.create(restaurante=cls.restaurante, nombre='Platos')
+        Producto.objects.create(
+            restaurante=cls.restaurante, categoria=categoria, nombre='Guiso', precio=Decimal('9.90'))
+        Producto.objects.create(
+            restaurante=cls.restaurante, categoria=categoria, nombre='Pan', precio=Decimal('1'))
+        # Sin pasar por save() para no disparar la generación de variantes
+        Producto.objects.filter(nombre='Guiso').update(
+            imagen='productos/guiso.jpg', imagen_variantes={'archivos': {'thumb': 'productos/guiso_thumb.jpg'}})
+
+    def test_misma_salida_que_el_serializador(self):
+        casos = [
+            (RestauranteSerializer, Restaurante.objects.order_by('estado', 'slug')),
+            (ProductoClienteSerializer, Producto.objects.all()),
+            (ProductoSerializer, Producto.objects.all()),
+        ]
+        render = JSONRenderer().render
+        for serializer_class, queryset in casos:
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertEqual(
+                    render(proyectar(serializer_class, queryset)),
+                    render(serializer_class(queryset, many=True).data),
+                )
+
+    def test_consultas_constantes(self):
+        # Una consulta por la lista y una por cada relación many=True, sin importar el número de filas
+        with self.assertNumQueries(5):
+            proyectar(RestauranteSerializer, Restaurante.objects.all())
+
+
+class PropiedadTokenTests(OrdenesTestCase):
+    """La propiedad de restaurantes viaja en el token y se revisa en la base de datos si cambia (ver propiedad.py)."""
+    client_class = APIClient
+
+    def login(self, usuario):
+        respuesta = self.client.post(reverse('token_obtain_pair'), {'username': usuario, 'password': 'x'})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def usar(self, tokens):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+    def test_token_lleva_los_restaurantes(self):
+        access = AccessToken(self.login('propietario')['access'])
+        self.assertEqual(access['restaurantes'], {
+            self.restaurante.slug: self.restaurante.id,
+            self.otro_restaurante.slug: self.otro_restaurante.id,
+        })
+        self.assertEqual(access['rv'], version_actual(self.propietario.pk))
+
+    def consultas_restaurante(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(url)
+        tabla = Restaurante._meta.db_table
+        return respuesta, [q['sql'] for q in ctx.captured_queries if f'FROM "{tabla}"' in q['sql']]
+
+    @override_settings(PROPIEDAD_CACHE_COMPARTIDA=True)
+    def test_autoriza_sin_consultar_el_restaurante(self):
+        self.usar(self.login('propietario'))
+        url = reverse('categoria_list_create_restaurante', kwargs={'restaurante_slug': self.restaurante.slug})
+        respuesta, consultas = self.consultas_restaurante(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(consultas)
+
+    def test_con_cache_local_decide_la_base_de_datos(self):
+        # Sin CACHES la caché es LocMem: otro worker no vería la invalidación de la versión
+        self.assertFalse(cache_compartida())
+        self.usar(self.login('propietario'))
+        # Transferencia hecha "en otro proceso": la versión en esta caché sigue vigente
+        Restaurante.objects.filter(pk=self.restaurante.pk).update(
+            propietario=User.objects.create_user('nuevo', password='x'))
+        url = reverse('categoria_list_create_restaurante', kwargs={'restaurante_slug': self.restaurante.slug})
+        respuesta, consultas = self.consultas_restaurante(url)
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertTrue(consultas)
+        self.assertEqual([m.id for m in comprobar_cache_propiedad(None)], ['api.W001'])
+        with self.settings(PROPIEDAD_CACHE_COMPARTIDA=True):
+            self.assertEqual(comprobar_cache_propiedad(None), [])
+
+    def test_transferencia_invalida_el_token(self):
+        User.objects.create_user('nuevo', password='x')
+        tokens_anterior = self.login('propietario')
+        tokens_nuevo = self.login('nuevo')
+        self.restaurante.propietario = User.objects.get(username='nuevo')
+        self.restaurante.save()
+        url = reverse('listar_ordenes_restaurante', kwargs={'restaurante_slug': self.restaurante.slug})
+        # Los claims de ambos tokens quedaron obsoletos: se decide con la base de datos
+        self.usar(tokens_anterior)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.usar(tokens_nuevo)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # Al refrescar, el access token lleva la propiedad vigente
+        refresco = self.client.post(reverse('token_refresh'), {'refresh': tokens_nuevo['refresh']})
+        self.assertEqual(AccessToken(refresco.json()['access'])['restaurantes'], {self.restaurante.slug: self.restaurante.id})
+
+    def test_orden_de_otro_restaurante(self):
+        orden = self.crear(self.datos_orden(self.productos[:1]))
+        self.usar(self.login('propietario'))
+        url = reverse('orden_detail_restaurante', kwargs={'restaurante_slug': self.otro_restaurante.slug, 'orden_id': orden.id})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url.replace(self.otro_restaurante.slug, 'no-existe')).status_code, 404)
+
+
+class AutenticacionCacheadaTests(TestCase):
+    """El usuario del JWT sale de la caché de instantáneas, sin consultar auth_user (ver autenticacion.py)."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cliente', password='x')
+
+    def setUp(self):
+        cache_usuarios().limpiar()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+        self.url = reverse('listar_mis_restaurantes')
+
+    def consultas_de_usuario(self):
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(self.url)
+        tabla = User._meta.db_table
+        return respuesta, [q['sql'] for q in ctx.captured_queries if f'FROM "{tabla}"' in q['sql']]
+
+    def test_segunda_peticion_sin_consultar_el_usuario(self):
+        respuesta, consultas = self.consultas_de_usuario()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(consultas), 1)
+        respuesta, consultas = self.consultas_de_usuario()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(consultas, [])
+
+    def test_desactivar_invalida_la_instantanea(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_lru_con_caducidad(self):
+        cache = CacheUsuarios(tamano=2, ttl=60)
+        cache.guardar('1', 'a')
+        cache.guardar('2', 'b')
+        cache.obtener('1')
+        cache.guardar('3', 'c')  # Descarta '2', el menos usado
+        self.assertEqual([cache.obtener(c) for c in '123'], ['a', None, 'c'])
+        cache.ttl = 0
+        cache.guardar('1', 'a')
+        self.assertIsNone(cache.obtener('1'))
+
+
+class MenuSnapshotTests(TestCase):
+    """El menú pre-serializado se reconstruye tras cada cambio de productos o categorías (ver menu_snapshot.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        propietario = User.objects.create_user('propietario', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=propietario, nombre='La Esquina', direccion='Calle 1', telefono='123', descripcion='')
+        cls.categoria = Categoria.objects.create(restaurante=cls.restaurante, nombre='Platos')
+        cls.producto = Producto.objects.create(
+            restaurante=cls.restaurante, categoria=cls.categoria, nombre='Guiso', precio=Decimal('9.90'))
+
+    def menu(self, tipo='cliente'):
+        contenido, snapshot = obtener_menu(self.restaurante, tipo)
+        return json.loads(contenido), snapshot
+
+    def test_contenido_igual_al_serializador(self):
+        productos = Producto.objects.filter(restaurante=self.restaurante)
+        for tipo, serializer_class in (('cliente', ProductoClienteSerializer), ('menu', ProductoSerializer)):
+            with self.subTest(tipo=tipo):
+                contenido, _ = obtener_menu(self.restaurante, tipo)
+                self.assertEqual(contenido, JSONRenderer().render(serializer_class(productos, many=True).data))
+
+    def test_endpoint_404_y_errores_no_enmascarados(self):
+        url = reverse('productos_por_restaurante', args=['no-existe'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        # Un fallo al construir el menú ya no se convierte en {"error": ...}: lo registra django.request
+        url = reverse('productos_por_restaurante', args=[self.restaurante.slug])
+        with mock.patch('api.views.obtener_menu', side_effect=RuntimeError('sin espacio')):
+            with self.assertLogs('django.request', 'ERROR'):
+                with self.assertRaises(RuntimeError):
+                    self.client.get(url)
+
+    def test_segunda_lectura_sale_del_snapshot(self):
+        self.menu()
+        with self.assertNumQueries(1):
+            self.menu()
+
+    def test_cambio_de_producto_invalida_y_reconstruye(self):
+        _, snapshot = self.menu()
+        self.producto.nombre = 'Guiso de lentejas'
+        self.producto.save()
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.version, 1)
+        self.assertIsNone(snapshot.contenido_cliente)
+        datos, _ = self.menu()
+        self.assertEqual([p['nombre'] for p in datos], ['Guiso de lentejas'])
+
+    def test_categoria_y_borrado_invalidan(self):
+        _, snapshot = self.menu('menu')
+        self.categoria.nombre = 'Principales'
+        self.categoria.save()
+        self.producto.delete()
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.version, 2)
+        self.assertEqual(self.menu('menu')[0], [])
+
+    def test_no_guarda_si_se_invalida_durante_la_construccion(self):
+        _, snapshot = self.menu()
+        invalidar_menu(self.restaurante.id)
+        original = construir_menu
+
+        def construir_e_invalidar(restaurante, tipo):
+            contenido = original(restaurante, tipo)
+            invalidar_menu(restaurante.id)
+            return contenido
+
+        with mock.patch('api.menu_snapshot.construir_menu', construir_e_invalidar):
+            datos, _ = self.menu()
+        self.assertEqual(len(datos), 1)
+        snapshot.refresh_from_db()
+        self.assertIsNone(snapshot.contenido_cliente)
+
+
+class KeysetPaginacionTests(OrdenesTestCase):
+    """Paginación por cursor y filtros de fecha del listado de órdenes (ver pagination.py)."""
+    client_class = APIClient
+
+    def setUp(self):
+        self.client.force_authenticate(self.propietario)
+        self.url = reverse('listar_ordenes_restaurante', kwargs={'restaurante_slug': self.restaurante.slug})
+        base = timezone.make_aware(datetime(2026, 3, 10, 12, 0))
+        self.ordenes = [self.crear(self.datos_orden(self.productos[:1])) for _ in range(7)]
+        # Tres órdenes comparten created_at: el id desempata
+        fechas = [base, base, base, base - timedelta(days=1), base - timedelta(days=2),
+                  base - timedelta(days=3), base - timedelta(days=10)]
+        for orden, fecha in zip(self.ordenes, fechas):
+            Orden.objects.filter(pk=orden.pk).update(created_at=fecha)
+
+    def ids(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_recorrido_completo_con_empates(self):
+        vistos, url = [], f'{self.url}?page_size=2'
+        while url:
+            pagina = self.ids(url)
+            self.assertLessEqual(len(pagina['results']), 2)
+            vistos.extend(o['id'] for o in pagina['results'])
+            url = pagina['next']
+        esperados = list(Orden.objects.filter(restaurante=self.restaurante)
+                         .order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(vistos, esperados)
+        self.assertEqual(len(set(vistos)), 7)
+
+    def test_cursor_invalido(self):
+        for cursor in ('no-es-base64!', 'eyJ4IjogMX0='):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(f'{self.url}?cursor={cursor}').status_code, 404)
+
+    def test_filtros_de_fecha(self):
+        datos = self.ids(f'{self.url}?desde=2026-03-08&hasta=2026-03-09')
+        self.assertEqual(len(datos), 2)  # 8 y 9 de marzo; 'hasta' con solo fecha incluye el día completo
+        datos = self.ids(f'{self.url}?desde=2026-03-10T00:00:00')
+        self.assertEqual(len(datos), 3)
+        respuesta = self.client.get(f'{self.url}?desde=ayer&estado=perdida')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(set(respuesta.json()), {'desde', 'estado'})
+
+
+class GetCondicionalTests(TestCase):
+    """ETag / Last-Modified de los endpoints de lectura (ver conditional.py)."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.propietario = User.objects.create_user('propietario', password='x')
+        cls.otro = User.objects.create_user('otro', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=cls.propietario, nombre='La Esquina', direccion='Calle 1', telefono='123', descripcion='')
+        cls.categoria = Categoria.objects.create(restaurante=cls.restaurante, nombre='Platos')
+        cls.producto = Producto.objects.create(
+            restaurante=cls.restaurante, categoria=cls.categoria, nombre='Guiso', precio=Decimal('9.90'))
+
+    def etag(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('ETag', respuesta)
+        return respuesta['ETag']
+
+    def test_304_con_if_none_match(self):
+        url = reverse('restaurante_detail', kwargs={'slug': self.restaurante.slug})
+        etag = self.etag(url)
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+    def test_menu_cambia_con_productos_y_categorias(self):
+        url = reverse('productos_por_restaurante', kwargs={'restaurante_slug': self.restaurante.slug})
+        self.client.get(url)  # Construye el snapshot (la primera respuesta aún no lleva ETag)
+        etags = [self.etag(url)]
+        self.producto.precio = Decimal('11.00')
+        self.producto.save()
+        self.client.get(url)
+        etags.append(self.etag(url))
+        self.categoria.nombre = 'Principales'
+        self.categoria.save()
+        self.client.get(url)
+        etags.append(self.etag(url))
+        self.assertEqual(len(set(etags)), 3)
+
+    def test_restaurante_cambia_con_tipos_de_cocina(self):
+        url = reverse('restaurante_detail', kwargs={'slug': self.restaurante.slug})
+        antes = self.etag(url)
+        self.restaurante.tipos_cocina.add(TipoCocina.objects.create(nombre='Casera'))
+        despues = self.etag(url)
+        self.assertNotEqual(antes, despues)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=antes).status_code, 200)
+
+    def test_listados_del_propietario(self):
+        url = reverse('categoria_list_create_restaurante', kwargs={'restaurante_slug': self.restaurante.slug})
+        self.client.force_authenticate(self.propietario)
+        etag = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Otro usuario con el mismo ETag no recibe un 304: no es su restaurante
+        self.client.force_authenticate(self.otro)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 403)
+        self.client.force_authenticate(self.propietario)
+        Categoria.objects.create(restaurante=self.restaurante, nombre='Postres')
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_listado_sin_filas_sin_etag(self):
+        # Sin filas no hay ETag: no se puede distinguir un restaurante vacío de uno ajeno
+        self.client.force_authenticate(self.propietario)
+        url = reverse('envio_list_create_restaurante', kwargs={'restaurante_slug': self.restaurante.slug})
+        self.assertNotIn('ETag', self.client.get(url))
+
+
+class StreamingOrdenesTests(TestCase):
+    """?stream= en el listado de órdenes: mismos datos que la respuesta normal, sin consultas por fila."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.propietario = User.objects.create_user('propietario', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=cls.propietario, nombre='La Esquina',
+            direccion='Calle 1', telefono='123', descripcion='Comida casera')
+        categoria = Categoria.objects.create(restaurante=cls.restaurante, nombre='Platos')
+        cls.productos = [
+            Producto.objects.create(
+                restaurante=cls.restaurante, categoria=categoria, nombre=f'Plato {i}', precio=Decimal('10.00'))
+            for i in range(3)
+        ]
+        cls.envio = Envio.objects.create(restaurante=cls.restaurante, nombre='Domicilio', precio=Decimal('3.50'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.propietario)
+        self.url = f'/api/restaurantes/{self.restaurante.slug}/ordenes/'
+
+    def crear_ordenes(self, cantidad):
+        for _ in range(cantidad):
+            serializer = OrdenSerializer(data={
+                'restaurante': self.restaurante.id, 'envio': self.envio.id, 'direccion_envio': 'Calle 2',
+                'items': [{'producto': p.id, 'cantidad': 1} for p in self.productos],
+            })
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            serializer.save(usuario=None)
+
+    def contenido(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+
+    def test_json_y_ndjson_iguales_a_la_respuesta_normal(self):
+        self.crear_ordenes(3)
+        normal = self.contenido(self.url)
+        self.assertEqual(self.contenido(f'{self.url}?stream=json'), normal)
+        lineas = self.contenido(f'{self.url}?stream=ndjson').splitlines()
+        self.assertEqual([json.loads(linea) for linea in lineas], json.loads(normal))
+
+    def test_vary_accept_en_todas_las_variantes(self):
+        self.crear_ordenes(1)
+        menu = f'/api/restaurantes/{self.restaurante.slug}/productos/'
+        peticiones = [
+            (self.url, {}), (f'{self.url}?stream=json', {}), (self.url, {'HTTP_ACCEPT': 'application/x-ndjson'}),
+            (f'{self.url}?estado=otro', {}), (menu, {}), (menu, {'HTTP_ACCEPT': 'application/x-ndjson'}),
+            ('/api/restaurantes/', {}), ('/api/restaurantes/?stream=ndjson', {}),
+        ]
+        for url, cabeceras in peticiones:
+            with self.subTest(url=url, **cabeceras):
+                respuesta = self.client.get(url, **cabeceras)
+                self.assertIn('Accept', respuesta['Vary'])
+        # También en el 304 del menú, para que la caché no reutilice la variante equivocada
+        etag = self.client.get(menu)['ETag']
+        respuesta = self.client.get(menu, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertIn('Accept', respuesta['Vary'])
+
+    def test_consultas_no_crecen_con_las_ordenes(self):
+        conteos = []
+        for cantidad in (1, 4):
+            self.crear_ordenes(cantidad)
+            with CaptureQueriesContext(connection) as ctx:
+                self.contenido(f'{self.url}?stream=ndjson')
+            conteos.append(len(ctx.captured_queries))
+        self.assertEqual(conteos[0], conteos[1])
+
+
+class VentasDiariasTests(OrdenesTestCase):
+    """Resumen diario de ventas (VentaDiaria) al crear órdenes y cambiar su estado."""
+
+    client_class = APIClient
+
+    def setUp(self):
+        self.client.force_authenticate(self.propietario)
+
+    def venta_del_dia(self, orden):
+        return VentaDiaria.objects.get(restaurante=self.restaurante, fecha=timezone.localdate(orden.created_at))
+
+    def cambiar_estado(self, orden, estado):
+        url = reverse('actualizar_estado_orden', kwargs={
+            'restaurante_slug': self.restaurante.slug, 'orden_id': orden.id})
+        return self.client.patch(url, {'estado': estado}, format='json')
+
+    def test_crear_orden_la_cuenta_sin_ventas(self):
+        orden = self.crear(self.datos_orden(self.productos[:2]))
+        venta = self.venta_del_dia(orden)
+        self.assertEqual((venta.num_ordenes, venta.num_entregadas, venta.ventas), (1, 0, Decimal('0')))
+
+    def test_entregar_suma_y_repetir_no_duplica(self):
+        orden = self.crear(self.datos_orden(self.productos[:2], envio=self.envio.id))
+        self.assertEqual(self.cambiar_estado(orden, 'entregada').status_code, 200)
+        self.assertEqual(self.cambiar_estado(orden, 'entregada').status_code, 200)
+        venta = self.venta_del_dia(orden)
+        self.assertEqual((venta.num_entregadas, venta.ventas), (1, orden.total))
+
+    def test_dejar_de_estar_entregada_resta(self):
+        orden = self.crear(self.datos_orden(self.productos[:2]))
+        self.cambiar_estado(orden, 'entregada')
+        self.cambiar_estado(orden, 'en_camino')
+        venta = self.venta_del_dia(orden)
+        self.assertEqual((venta.num_ordenes, venta.num_entregadas, venta.ventas), (1, 0, Decimal('0')))
+
+    def test_estado_invalido_no_cambia_el_resumen(self):
+        orden = self.crear(self.datos_orden(self.productos[:2]))
+        self.assertEqual(self.cambiar_estado(orden, 'perdida').status_code, 400)
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado, 'pendiente')
+        self.assertEqual(self.venta_del_dia(orden).num_entregadas, 0)
+
+    def test_dashboard_y_reconstruccion_coinciden_con_las_ordenes(self):
+        entregada = self.crear(self.datos_orden(self.productos[:3], envio=self.envio.id))
+        en_camino = self.crear(self.datos_orden(self.productos[3:5]))
+        self.crear(self.datos_orden(self.productos[5:6]))
+        self.cambiar_estado(entregada, 'entregada')
+        self.cambiar_estado(en_camino, 'en_camino')
+
+        url = reverse('restaurante_dashboard_summary', kwargs={'restaurante_slug': self.restaurante.slug})
+        datos = self.client.get(url).json()
+        self.assertEqual(datos['ordenes'], {'pendiente': 1, 'en_proceso': 0, 'en_camino': 1})
+        for periodo in ('hoy', 'semana', 'mes'):
+            self.assertEqual(Decimal(str(datos['ventas'][periodo])), entregada.total)
+
+        incremental = list(VentaDiaria.objects.values_list('restaurante', 'fecha', 'num_ordenes', 'num_entregadas', 'ventas'))
+        reconstruir_ventas_diarias()
+        self.assertEqual(
+            list(VentaDiaria.objects.values_list('restaurante', 'fecha', 'num_ordenes', 'num_entregadas', 'ventas')),
+            incremental)
+
+
+class BusquedaProductosTests(TestCase):
+    """Búsqueda de productos con el índice FTS5 y su sincronización desde las señales."""
+
+    @classmethod
+    def setUpTestData(cls):
+        propietario = User.objects.create_user('buscador', password='x')
+        cls.restaurante = Restaurante.objects.create(
+            propietario=propietario, nombre='Trattoria', direccion='Calle 1', telefono='1', descripcion='Italiana')
+        cls.otro = Restaurante.objects.create(
+            propietario=propietario, nombre='Pizzería Sur', direccion='Calle 2', telefono='2', descripcion='Pizzas')
+        cls.pizzas = Categoria.objects.create(restaurante=cls.restaurante, nombre='Pizzas')
+        cls.postres = Categoria.objects.create(restaurante=cls.restaurante, nombre='Postres')
+        cls.margarita = Producto.objects.create(
+            restaurante=cls.restaurante, categoria=cls.pizzas, nombre='Pizza margarita',
+            descripcion='Tomate y mozzarella', precio=Decimal('9.00'))
+        cls.tiramisu = Producto.objects.create(
+            restaurante=cls.restaurante, categoria=cls.postres, nombre='Tiramisú',
+            descripcion='Ideal después de una pizza', precio=Decimal('5.00'))
+        cls.pizza_ajena = Producto.objects.create(
+            restaurante=cls.otro, categoria=Categoria.objects.create(restaurante=cls.otro, nombre='Clásicas'),
+            nombre='Pizza cuatro quesos', precio=Decimal('11.00'))
+
+    def ids(self, texto, restaurante=None):
+        return [p.id for p in buscar_productos(texto, restaurante_id=restaurante.id if restaurante else None)]
+
+    def test_prefijo_acentos_y_ranking(self):
+        # 'piz' encuentra por prefijo; el nombre pesa más que la descripción
+        self.assertEqual(self.ids('piz', self.restaurante), [self.margarita.id, self.tiramisu.id])
+        self.assertEqual(self.ids('tiramisu'), [self.tiramisu.id])
+        self.assertEqual(self.ids('pizza mozzarella'), [self.margarita.id])
+
+    def test_limitada_al_restaurante(self):
+        self.assertCountEqual(self.ids('pizza'), [self.margarita.id, self.tiramisu.id, self.pizza_ajena.id])
+        self.assertEqual(self.ids('pizza', self.otro), [self.pizza_ajena.id])
+
+    def test_reindexa_al_renombrar_desactivar_y_borrar(self):
+        self.margarita.nombre = 'Calzone'
+        self.margarita.save()
+        self.assertEqual(self.ids('calzone'), [self.margarita.id])
+        self.assertNotIn(self.margarita.id, self.ids('margarita'))
+
+        self.postres.nombre = 'Dulces'
+        self.postres.save()
+        self.assertEqual(self.ids('dulces'), [self.tiramisu.id])
+
+        self.tiramisu.activo = False
+        self.tiramisu.save()
+        self.assertEqual(self.ids('dulces'), [])
+
+        self.pizza_ajena.delete()
+        self.assertEqual(self.ids('quesos'), [])
+
+    def test_reconstruir_recupera_el_indice(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_FTS}")
+        self.assertEqual(self.ids('margarita'), [])
+        obtener_backend().reconstruir()
+        self.assertEqual(self.ids('margarita'), [self.margarita.id])
+
+    def test_endpoints(self):
+        respuesta = self.client.get(reverse('buscar_productos_global'), {'q': 'pizza', 'limite': 1})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([p['id'] for p in respuesta.json()], self.ids('pizza')[:1])
+
+        url = reverse('buscar_productos_restaurante', kwargs={'restaurante_slug': self.otro.slug})
+        self.assertEqual([p['id'] for p in self.client.get(url, {'q': 'pizza'}).json()], [self.pizza_ajena.id])
+
+        self.assertEqual(self.client.get(reverse('buscar_productos_global'), {'q': ' ?! '}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('buscar_productos_global'), {'q': 'a', 'limite': 'x'}).status_code, 400)
+        url = reverse('buscar_productos_restaurante', kwargs={'restaurante_slug': 'no-existe'})
+        self.assertEqual(self.client.get(url, {'q': 'pizza'}).status_code, 404)
+
+
+class ExportacionTests(OrdenesTestCase):
+    """Exportación en streaming de productos, órdenes y detalles (CSV y NDJSON)."""
+
+    client_class = APIClient
+
+    def setUp(self):
+        self.client.force_authenticate(self.propietario)
+
+    def url(self, recurso, restaurante=None):
+        restaurante = restaurante or self.restaurante
+        return reverse('exportar_restaurante', kwargs={'restaurante_slug': restaurante.slug, 'recurso': recurso})
+
+    def exportar(self, recurso, **params):
+        respuesta = self.client.get(self.url(recurso), params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta
+
+    def leer_csv(self, respuesta):
+        contenido = b''.join(respuesta.streaming_content).decode()
+        return list(csv.DictReader(io.StringIO(contenido)))
+
+    def leer_ndjson(self, respuesta):
+        return [json.loads(linea) for linea in b''.join(respuesta.streaming_content).decode().splitlines()]
+
+    def test_csv_y_ndjson_de_cada_recurso(self):
+        orden = self.crear(self.datos_orden(self.productos[:2], envio=self.envio.id))
+        esperadas = {'productos': len(self.productos), 'ordenes': 1, 'detalles': 2}
+        for recurso, filas in esperadas.items():
+            with self.subTest(recurso=recurso):
+                respuesta = self.exportar(recurso)
+                self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+                self.assertEqual(
+                    respuesta['Content-Disposition'], f'attachment; filename="la-esquina-{recurso}.csv"')
+                en_csv = self.leer_csv(respuesta)
+
+                respuesta = self.exportar(recurso, formato='ndjson')
+                self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+                self.assertIn('Accept', respuesta['Vary'])
+                en_ndjson = self.leer_ndjson(respuesta)
+
+                self.assertEqual(len(en_csv), filas)
+                self.assertEqual([fila['id'] for fila in en_csv], [str(fila['id']) for fila in en_ndjson])
+                self.assertEqual(list(en_csv[0]), [nombre for nombre, _ in COLUMNAS[recurso]])
+        self.assertEqual(self.leer_ndjson(self.exportar('ordenes', formato='ndjson'))[0]['total'], str(orden.total))
+
+    def test_filtros_de_ordenes_y_detalles(self):
+        entregada = self.crear(self.datos_orden(self.productos[:1]))
+        self.crear(self.datos_orden(self.productos[1:4]))
+        Orden.objects.filter(pk=entregada.pk).update(estado='entregada')
+
+        filas = self.leer_csv(self.exportar('ordenes', estado='entregada'))
+        self.assertEqual([fila['id'] for fila in filas], [str(entregada.id)])
+        self.assertEqual(len(self.leer_csv(self.exportar('detalles', estado='pendiente'))), 3)
+        manana = (timezone.localdate() + timedelta(days=1)).isoformat()
+        self.assertEqual(self.leer_csv(self.exportar('ordenes', desde=manana)), [])
+
+        respuesta = self.client.get(self.url('ordenes'), {'estado': 'perdida'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('estado', respuesta.json())
+
+    def test_escapa_formulas_en_csv(self):
+        self.crear(self.datos_orden(
+            self.productos[:1], cliente_nombre='=HYPERLINK("http://x")',
+            instrucciones_especiales='@SUM(A1)', cliente_telefono='+34 600'))
+        fila = self.leer_csv(self.exportar('ordenes'))[0]
+        self.assertEqual(fila['cliente_nombre'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(fila['instrucciones_especiales'], "'@SUM(A1)")
+        self.assertEqual(fila['cliente_telefono'], "'+34 600")
+        # NDJSON no lo abre una hoja de cálculo: los valores van tal cual
+        fila = self.leer_ndjson(self.exportar('ordenes', formato='ndjson'))[0]
+        self.assertEqual(fila['cliente_nombre'], '=HYPERLINK("http://x")')
+
+    def test_errores_permisos_y_formato(self):
+        self.assertEqual(self.client.get(self.url('clientes')).status_code, 404)
+        self.assertEqual(self.client.get(self.url('productos', self.otro_restaurante)).status_code, 200)
+        intruso = User.objects.create_user('intruso', password='x')
+        self.client.force_authenticate(intruso)
+        self.assertEqual(self.client.get(self.url('productos')).status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url('productos')).status_code, 401)
+
+        # Con Accept: text/csv los errores también son CSV
+        self.client.force_authenticate(self.propietario)
+        respuesta = self.client.get(self.url('ordenes'), {'estado': 'perdida'}, HTTP_ACCEPT='text/csv')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(list(csv.reader(io.StringIO(respuesta.content.decode()))), [['estado'], ['Estado inválido: perdida.']])
+
+
+class VariantesImagenTests(OrdenesTestCase):
+    """Miniaturas y WebP de las imágenes (generadas en el mismo hilo con IMAGENES_VARIANTES_SINCRONO)."""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=directorio.name, IMAGENES_VARIANTES_SINCRONO=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.producto = self.productos[0]
+
+    def imagen(self, nombre='foto.jpg', modo='RGB', tamano=(1200, 800), formato='JPEG'):
+        salida = io.BytesIO()
+        Image.new(modo, tamano, (200, 50, 50, 128) if modo == 'RGBA' else (200, 50, 50)).save(salida, format=formato)
+        return SimpleUploadedFile(nombre, salida.getvalue())
+
+    def guardar_imagen(self, archivo):
+        self.producto.imagen = archivo
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.save()
+        self.producto.refresh_from_db()
+        return self.producto.imagen_variantes
+
+    def test_genera_variantes_al_guardar(self):
+        variantes = self.guardar_imagen(self.imagen())
+        self.assertEqual(variantes['origen'], self.producto.imagen.name)
+        self.assertEqual(set(variantes['archivos']), {'thumb', 'thumb_webp', 'medium', 'medium_webp'})
+        for nombre, caja in (('thumb', (200, 200)), ('medium', (600, 600))):
+            for variante, formato in ((nombre, 'JPEG'), (f'{nombre}_webp', 'WEBP')):
+                with default_storage.open(variantes['archivos'][variante]) as f, Image.open(f) as imagen:
+                    self.assertEqual(imagen.format, formato)
+                    # Proporción 3:2 dentro de la caja
+                    self.assertEqual(imagen.size, (caja[0], caja[0] * 2 // 3))
+
+    def test_png_con_transparencia_y_reemplazo(self):
+        anteriores = self.guardar_imagen(self.imagen())['archivos']
+        variantes = self.guardar_imagen(self.imagen('logo.png', modo='RGBA', formato='PNG'))
+        self.assertTrue(variantes['archivos']['thumb'].endswith('.png'))
+        # Las variantes de la imagen anterior se borran
+        self.assertFalse(any(default_storage.exists(ruta) for ruta in anteriores.values()))
+        # Guardar sin cambiar la imagen no vuelve a generarlas
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.producto.save()
+        self.assertEqual(callbacks, [])
+
+    def test_archivo_que_no_es_imagen(self):
+        with self.assertLogs('api.imagenes', 'ERROR'):
+            variantes = self.guardar_imagen(SimpleUploadedFile('roto.jpg', b'no es una imagen'))
+        self.assertEqual(variantes, {})
+
+    def test_campo_serializador(self):
+        variantes = self.guardar_imagen(self.imagen())
+        campo = VariantesImagenField()
+        campo.bind('imagen_variantes', serializers.Serializer())
+        relativas = campo.to_representation(variantes)
+        self.assertEqual(relativas['thumb'], default_storage.url(variantes['archivos']['thumb']))
+        self.assertEqual(campo.to_representation({}), {})
+
+        campo = VariantesImagenField()
+        campo.bind('imagen_variantes', serializers.Serializer(context={'request': RequestFactory().get('/')}))
+        self.assertEqual(campo.to_representation(variantes)['thumb'], 'http://testserver' + relativas['thumb'])
+
+    def test_comando_regenerar_variantes(self):
+        self.guardar_imagen(self.imagen())
+        Producto.objects.filter(pk=self.producto.pk).update(imagen_variantes={})
+        salida = io.StringIO()
+        call_command('regenerar_variantes', '--modelo', 'producto', stdout=salida)
+        self.assertIn('producto: 1 imágenes procesadas.', salida.getvalue())
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.imagen_variantes['origen'], self.producto.imagen.name)
+
+        # Al día: solo se regeneran con --todas
+        call_command('regenerar_variantes', '--modelo', 'producto', stdout=salida)
+        self.assertIn('producto: 0 imágenes procesadas.', salida.getvalue())
+        call_command('regenerar_variantes', '--modelo', 'producto', '--todas', stdout=salida)
+        self.assertEqual(salida.getvalue().count('producto: 1 imágenes procesadas.'), 2)
+
+
+class VistasAsyncTests(TransactionTestCase):
+    """
+    Vistas async (prefijo async/). TransactionTestCase: en_hilo() usa otra
+    conexión por hilo, que no vería los datos de la transacción de TestCase.
+    """
+
+    def setUp(self):
+        self.propietario = User.objects.create_user('async', password='x')
+        self.restaurante = Restaurante.objects.create(
+            propietario=self.propietario, nombre='Asíncrono', direccion='Calle 1', telefono='1', descripcion='x')
+        self.restaurante.tipos_cocina.add(TipoCocina.objects.create(nombre='Fusión'))
+        categoria = Categoria.objects.create(restaurante=self.restaurante, nombre='Platos')
+        self.productos = [
+            Producto.objects.create(restaurante=self.restaurante, categoria=categoria, nombre=f'Plato {i}', precio=i + 1)
+            for i in range(3)
+        ]
+        serializer = OrdenSerializer(data={
+            'restaurante': self.restaurante.id, 'direccion_envio': 'Calle 2',
+            'items': [{'producto': p.id, 'cantidad': 1} for p in self.productos],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.orden = serializer.save(usuario=None)
+        self.autorizacion = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.propietario)}'}
+
+    def comparar(self, sincrona, asincrona, **cabeceras):
+        esperado = self.client.get(sincrona, **cabeceras)
+        respuesta = self.client.get(asincrona, **cabeceras)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json(), esperado.json())
+        return respuesta
+
+    def test_mismo_json_que_las_vistas_sincronas(self):
+        slug = self.restaurante.slug
+        self.comparar(reverse('restaurante_detail', args=[slug]), reverse('async_restaurante_detail', args=[slug]))
+        self.comparar(
+            reverse('productos_por_restaurante', args=[slug]), reverse('async_productos_por_restaurante', args=[slug]))
+        self.comparar(
+            reverse('restaurant_menu_list', args=[slug]), reverse('async_restaurant_menu_list', args=[slug]),
+            **self.autorizacion)
+        Producto.objects.filter(pk=self.productos[0].pk).update(
+            imagen='productos/foto.jpg',
+            imagen_variantes={'origen': 'productos/foto.jpg', 'archivos': {'thumb': 'productos/variantes/foto_thumb.jpg'}})
+        for consulta in ('', '?expand=restaurante,items.producto'):
+            respuesta = self.comparar(
+                reverse('orden_detail', args=[self.orden.id]) + consulta,
+                reverse('async_orden_detail', args=[self.orden.id]) + consulta)
+        # URLs absolutas de la imagen y sus variantes, como en la vista síncrona
+        producto = next(i['producto_details'] for i in respuesta.json()['items'] if i['producto'] == self.productos[0].id)
+        self.assertTrue(producto['imagen'].startswith('http://testserver/'))
+        self.assertTrue(producto['imagen_variantes']['thumb'].startswith('http://testserver/'))
+
+    def test_304_con_etag(self):
+        url = reverse('async_productos_por_restaurante', args=[self.restaurante.slug])
+        self.client.get(url)  # construye el snapshot
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.productos[0].nombre = 'Renombrado'
+        self.productos[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        url = reverse('async_restaurante_detail', args=[self.restaurante.slug])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_404_401_y_400(self):
+        for nombre in ('async_restaurante_detail', 'async_productos_por_restaurante'):
+            self.assertEqual(self.client.get(reverse(nombre, args=['no-existe'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('async_orden_detail', args=[9999])).status_code, 404)
+        url = reverse('async_restaurant_menu_list', args=[self.restaurante.slug])
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer basura').status_code, 401)
+        url = reverse('async_orden_detail', args=[self.orden.id]) + '?expand=desconocido'
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_menu_guarda_el_snapshot_desde_el_hilo(self):
+        # La escritura del hilo de en_hilo() queda confirmada: la vista síncrona la reutiliza
+        url = reverse('async_productos_por_restaurante', args=[self.restaurante.slug])
+        contenido = self.client.get(url).content
+        snapshot = MenuSnapshot.objects.get(restaurante=self.restaurante)
+        self.assertEqual(snapshot.contenido_cliente.encode(), contenido)
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse('productos_por_restaurante', args=[self.restaurante.slug]))
+        self.assertEqual(respuesta.content, contenido)
+        self.assertFalse(any('UPDATE' in q['sql'] for q in ctx.captured_queries))
+
+    def test_snapshot_creado_por_otro_hilo_entretanto(self):
+        # Si otro hilo inserta el snapshot entre el get() y el create(), se usa el suyo
+        otro = MenuSnapshot.objects.create(restaurante=self.restaurante)
+        get_original = MenuSnapshot.objects.get
+        llamadas = []
+
+        def get(*args, **kwargs):
+            llamadas.append(kwargs)
+            if len(llamadas) == 1:
+                raise MenuSnapshot.DoesNotExist
+            return get_original(*args, **kwargs)
+
+        url = reverse('async_productos_por_restaurante', args=[self.restaurante.slug])
+        with mock.patch.object(MenuSnapshot.objects, 'get', side_effect=get):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(llamadas), 2)
+        self.assertEqual(list(MenuSnapshot.objects.values_list('pk', flat=True)), [otro.pk])
+        self.assertIsNotNone(MenuSnapshot.objects.get(pk=otro.pk).contenido_cliente)
+
+
+class BrokerTests(TestCase):
+    """Interfaz de los brokers de eventos (ver eventos.py)."""
+
+    def test_broker_incompleto_falla_al_instanciarlo(self):
+        class SoloPublica(Broker):
+            def publicar(self, canal, evento):
+                pass
+
+        with self.assertRaises(TypeError):
+            SoloPublica()
+        self.assertIsInstance(BrokerEnMemoria(), Broker)
+
+
+class EventosOrdenesTests(TransactionTestCase):
+    """Stream SSE de órdenes: autenticación, eventos y canal por restaurante."""
+
+    def setUp(self):
+        self.propietario = User.objects.create_user('sse', password='x')
+        self.otro_usuario = User.objects.create_user('sse-otro', password='x')
+        self.restaurante = Restaurante.objects.create(
+            propietario=self.propietario, nombre='Eventos', direccion='Calle 1', telefono='1', descripcion='x')
+        self.ajeno = Restaurante.objects.create(
+            propietario=self.otro_usuario, nombre='Ajeno', direccion='Calle 2', telefono='2', descripcion='x')
+        self.producto = Producto.objects.create(
+            restaurante=self.restaurante, nombre='Plato', precio=Decimal('8.00'),
+            categoria=Categoria.objects.create(restaurante=self.restaurante, nombre='Platos'))
+        self.producto_ajeno = Producto.objects.create(
+            restaurante=self.ajeno, nombre='Otro', precio=Decimal('3.00'),
+            categoria=Categoria.objects.create(restaurante=self.ajeno, nombre='Platos'))
+
+    def url(self, token=None, restaurante=None):
+        url = reverse('async_eventos_ordenes', args=[(restaurante or self.restaurante).slug])
+        return url if token is None else f'{url}?token={token}'
+
+    def crear_orden(self, producto):
+        respuesta = Client().post(reverse('crear_orden'), {
+            'restaurante': producto.restaurante_id, 'direccion_envio': 'Calle 3', 'cliente_nombre': 'Ana',
+            'items': [{'producto': producto.id, 'cantidad': 2}],
+        }, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        return respuesta.json()['id']
+
+    def cambiar_estado(self, orden_id, estado):
+        cliente = APIClient()
+        cliente.force_authenticate(self.propietario)
+        url = reverse('actualizar_estado_orden', kwargs={'restaurante_slug': self.restaurante.slug, 'orden_id': orden_id})
+        self.assertEqual(cliente.patch(url, {'estado': estado}, format='json').status_code, 200)
+
+    def test_autenticacion_y_propiedad(self):
+        self.assertEqual(self.client.get(self.url()).status_code, 401)
+        self.assertEqual(self.client.get(self.url('basura')).status_code, 401)
+        token = AccessToken.for_user(self.propietario)
+        self.assertEqual(self.client.get(self.url(token, self.ajeno)).status_code, 403)
+        url = reverse('async_eventos_ordenes', args=['no-existe']) + f'?token={token}'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        # También con la cabecera Authorization
+        respuesta = self.client.get(self.url(), HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.otro_usuario)}')
+        self.assertEqual(respuesta.status_code, 403)
+
+    def test_eventos_del_restaurante(self):
+        async def escuchar():
+            respuesta = await AsyncClient().get(self.url(AccessToken.for_user(self.propietario)))
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+            stream = aiter(respuesta.streaming_content)
+            self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+            siguiente = asyncio.ensure_future(anext(stream))
+            # El generador se suscribe al canal al pedir el siguiente fragmento
+            while not obtener_broker()._suscriptores.get(canal_restaurante(self.restaurante.id)):
+                await asyncio.sleep(0.01)
+
+            # Las órdenes de otro restaurante no llegan a este canal
+            await sync_to_async(self.crear_orden)(self.producto_ajeno)
+            orden_id = await sync_to_async(self.crear_orden)(self.producto)
+            eventos = [await asyncio.wait_for(siguiente, 5)]
+            await sync_to_async(self.cambiar_estado)(orden_id, 'en_proceso')
+            eventos.append(await asyncio.wait_for(anext(stream), 5))
+
+            # Al desconectarse el cliente se descarta la respuesta: el event loop cierra
+            # el generador del stream y este cancela la suscripción
+            await stream.aclose()
+            del respuesta, stream, siguiente
+            gc.collect()
+            for _ in range(100):
+                if canal_restaurante(self.restaurante.id) not in obtener_broker()._suscriptores:
+                    break
+                await asyncio.sleep(0.01)
+            return orden_id, eventos
+
+        orden_id, eventos = async_to_sync(escuchar)()
+        leidos = []
+        for evento in eventos:
+            campos = dict(linea.split(': ', 1) for linea in evento.decode().strip().split('\n'))
+            leidos.append((campos['event'], json.loads(campos['data'])))
+        self.assertEqual(leidos[0][0], 'orden_creada')
+        self.assertEqual(
+            (leidos[0][1]['id'], leidos[0][1]['total'], leidos[0][1]['cliente_nombre']), (orden_id, '16.00', 'Ana'))
+        self.assertEqual(leidos[1][0], 'orden_estado')
+        self.assertEqual(leidos[1][1]['id'], orden_id)
+        self.assertEqual(leidos[1][1]['estado'], 'en_proceso')
+        self.assertNotIn(canal_restaurante(self.restaurante.id), obtener_broker()._suscriptores)
+
+
+@override_settings(HORARIOS_ZONA='America/Bogota')  # UTC-5, sin horario de verano
+class HorariosTests(TestCase):
+    """Ventanas de apertura semanales y filtros de /api/descubrir/ (ver horarios.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        propietario = User.objects.create_user('horarios', password='x')
+        italiana = TipoCocina.objects.create(nombre='Italiana')
+        mexicana = TipoCocina.objects.create(nombre='Mexicana')
+
+        def crear(nombre, apertura, cierre, estado='abierto'):
+            return Restaurante.objects.create(
+                propietario=propietario, nombre=nombre, direccion='d', telefono='1', descripcion='x',
+                hora_apertura=apertura, hora_cierre=cierre, estado=estado)
+
+        cls.diurno = crear('Diurno', time(9), time(17))
+        cls.nocturno = crear('Nocturno', time(20), time(2))
+        cls.siempre = crear('Siempre', time(0), time(0), estado='cerrado')
+        cls.diurno.tipos_cocina.add(italiana, mexicana)
+        cls.nocturno.tipos_cocina.add(mexicana)
+
+    def local(self, dia, hora, minuto=0):
+        # 2026-10-19 es lunes
+        return datetime(2026, 10, 19 + dia, hora, minuto, tzinfo=ZoneInfo('America/Bogota'))
+
+    def abiertos(self, momento):
+        ids = set(Restaurante.objects.filter(id__in=restaurantes_abiertos(momento)).values_list('id', flat=True))
+        return {r.nombre for r in (self.diurno, self.nocturno, self.siempre) if r.id in ids}
+
+    def test_ventanas_semana(self):
+        dia = 24 * 60
+        self.assertEqual(ventanas_semana(time(9), time(17))[0], (9 * 60, 17 * 60))
+        # Domingo 20:00-24:00 y el resto de la noche pasa al lunes 00:00-02:00
+        ventanas = ventanas_semana(time(20), time(2))
+        self.assertEqual(len(ventanas), 14)
+        self.assertIn((6 * dia + 20 * 60, 7 * dia), ventanas)
+        self.assertIn((0, 2 * 60), ventanas)
+        # Cierre a medianoche: sin tramo vacío al día siguiente
+        self.assertEqual(ventanas_semana(time(20), time(0))[:2], [(20 * 60, dia), (dia + 20 * 60, 2 * dia)])
+        # Misma hora de apertura y cierre: todo el día
+        self.assertEqual(ventanas_semana(time(0), time(0)), [(d * dia, (d + 1) * dia) for d in range(7)])
+
+    def test_hora_local_del_negocio(self):
+        # 16:30 en Bogotá son las 21:30 UTC: abierto en hora local aunque en UTC ya pasen de las 17:00
+        momento = self.local(0, 16, 30).astimezone(dt_timezone.utc)
+        self.assertEqual(minuto_de_la_semana(momento), 16 * 60 + 30)
+        self.assertEqual(self.abiertos(momento), {'Diurno', 'Siempre'})
+        # 08:00 locales (13:00 UTC): todavía cerrado
+        self.assertEqual(self.abiertos(self.local(0, 8).astimezone(dt_timezone.utc)), {'Siempre'})
+        self.assertEqual(self.abiertos(self.local(0, 17)), {'Siempre'})
+
+    def test_cruce_de_medianoche_de_domingo_a_lunes(self):
+        self.assertEqual(self.abiertos(self.local(6, 23, 30)), {'Nocturno', 'Siempre'})
+        self.assertEqual(self.abiertos(self.local(0, 1, 59)), {'Nocturno', 'Siempre'})
+        self.assertEqual(self.abiertos(self.local(0, 2)), {'Siempre'})
+
+    def test_cambiar_horario_regenera_las_ventanas(self):
+        self.diurno.hora_cierre = time(11)
+        self.diurno.save(update_fields=['hora_cierre'])
+        self.assertNotIn('Diurno', self.abiertos(self.local(2, 12)))
+
+    def descubrir(self, **params):
+        respuesta = self.client.get(reverse('descubrir_restaurantes'), params)
+        self.assertEqual(respuesta.status_code, 200)
+        return sorted(r['nombre'] for r in respuesta.json()['results'])
+
+    def test_descubrir_filtros(self):
+        with mock.patch('django.utils.timezone.now', return_value=self.local(1, 21)):
+            self.assertEqual(self.descubrir(abierto_ahora='1'), ['Nocturno', 'Siempre'])
+        self.assertEqual(self.descubrir(), ['Diurno', 'Nocturno', 'Siempre'])
+        # Con dos tipos de cocina el restaurante aparece una sola vez
+        self.assertEqual(self.descubrir(cocina='italiana,mexicana'), ['Diurno', 'Nocturno'])
+        self.assertEqual(self.descubrir(cocina='italiana'), ['Diurno'])
+        self.assertEqual(self.descubrir(estado='cerrado'), ['Siempre'])
+        respuesta = self.client.get(reverse('descubrir_restaurantes'), {'estado': 'quizas'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('estado', respuesta.json())
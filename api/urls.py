@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
 
@@ -18,6 +18,7 @@ urlpatterns = [
     #restaurantes
     path('mis-restaurantes/', views.listar_mis_restaurantes, name='listar_mis_restaurantes'),
     path('restaurantes/', views.restaurante_list_create, name='restaurante_list_create'),
+    path('descubrir/', views.descubrir_restaurantes, name='descubrir_restaurantes'),
     path('restaurantes/<slug:slug>/', views.restaurante_detail, name='restaurante_detail'),
     path('restaurantes/<int:pk>', views.restaurante_detail_id , name='restaurante_detail_by_pk'),
     path('restaurantes/<slug:restaurante_slug>/productos/', views.producto_list_by_restaurante_slug, name='productos_por_restaurante'),
@@ -28,6 +29,9 @@ urlpatterns = [
     path('restaurantes/<slug:restaurante_slug>/ordenes/<int:orden_id>/', views.orden_detail_restaurante, name='orden_detail_restaurante'),
     path('restaurantes/<slug:restaurante_slug>/ordenes/<int:orden_id>/estado/', views.actualizar_estado_orden, name='actualizar_estado_orden'),
 
+    #exportaciones (productos, ordenes, detalles)
+    path('restaurantes/<slug:restaurante_slug>/exportar/<str:recurso>/', views.exportar_restaurante, name='exportar_restaurante'),
+
     ## categorias
     path('restaurantes/<slug:restaurante_slug>/categorias/', views.categoria_list_create_restaurante, name='categoria_list_create_restaurante'),
     path('restaurantes/<slug:restaurante_slug>/categorias/<int:categoria_id>/', views.categoria_detail_update_delete_restaurante, name='categoria_detail_update_delete_restaurante'),
@@ -39,6 +43,7 @@ urlpatterns = [
     #menu dashboard
     path('restaurantes/<slug:restaurante_slug>/menu/', views.restaurant_menu_list_view, name='restaurant_menu_list'),
     path('restaurantes/<slug:restaurante_slug>/menu/<int:product_id>/', views.product_detail_view, name='product_detail'),
+    path('restaurantes/<slug:restaurante_slug>/menu/importar/', views.importar_menu_view, name='importar_menu'),
 
     #ordenes
     path('ordenes/', views.crear_orden, name='crear_orden'),
@@ -50,6 +55,17 @@ urlpatterns = [
     #dashboard
     path('restaurantes/<slug:restaurante_slug>/dashboard/summary/', views.restaurante_dashboard_summary, name='restaurante_dashboard_summary'),
 
+    #lectura asincrona (ASGI) de los endpoints publicos del catalogo
+    path('async/restaurantes/<slug:slug>/', async_views.restaurante_detail, name='async_restaurante_detail'),
+    path('async/restaurantes/<slug:restaurante_slug>/productos/', async_views.producto_list_by_restaurante_slug, name='async_productos_por_restaurante'),
+    path('async/restaurantes/<slug:restaurante_slug>/menu/', async_views.restaurant_menu_list_view, name='async_restaurant_menu_list'),
+    path('async/ordenes/<int:pk>/', async_views.orden_detail, name='async_orden_detail'),
+    path('async/restaurantes/<slug:restaurante_slug>/ordenes/eventos/', async_views.eventos_ordenes, name='async_eventos_ordenes'),
+
+    #busqueda de productos
+    path('buscar/', views.buscar_productos_global, name='buscar_productos_global'),
+    path('restaurantes/<slug:restaurante_slug>/buscar/', views.buscar_productos_restaurante, name='buscar_productos_restaurante'),
+
     
 ]
 
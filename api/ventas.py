@@ -0,0 +1,115 @@
+"""
+Resumen diario de ventas (VentaDiaria) mantenido de forma incremental.
+
+OrdenSerializer.create llama a registrar_orden_creada() y la vista
+actualizar_estado_orden llama a registrar_cambio_estado(). Cada llamada es un
+UPDATE con F() sobre la fila del día: dos incrementos concurrentes no se pisan.
+Lo que F() no resuelve es decidir SI hay que sumar: registrar_cambio_estado()
+depende del estado anterior de la orden, así que quien la llame debe haber
+leído ese estado con la fila de la orden bloqueada (select_for_update() dentro
+de la misma transacción, como hace actualizar_estado_orden); si no, dos cambios
+concurrentes a 'entregada' sumarían la orden dos veces.
+
+Las ventas de un día son las órdenes CREADAS ese día que están entregadas,
+igual que calculaba antes el dashboard sobre la tabla de órdenes.
+
+Si el resumen se desincroniza (p. ej. cambios hechos desde el admin), se puede
+regenerar con reconstruir_ventas_diarias() o el comando reconstruir_ventas.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Orden, VentaDiaria
+
+ESTADO_VENTA = 'entregada'
+
+
+def _acumular(restaurante_id, fecha, **incrementos):
+    """Suma los incrementos a la fila (restaurante, fecha), creándola si no existe."""
+    actualizadas = VentaDiaria.objects.filter(restaurante_id=restaurante_id, fecha=fecha).update(
+        **{campo: F(campo) + valor for campo, valor in incrementos.items()}
+    )
+    if actualizadas:
+        return
+    try:
+        with transaction.atomic():
+            VentaDiaria.objects.create(restaurante_id=restaurante_id, fecha=fecha, **incrementos)
+    except IntegrityError:
+        # Otra petición creó la fila del día en paralelo: basta con actualizarla
+        VentaDiaria.objects.filter(restaurante_id=restaurante_id, fecha=fecha).update(
+            **{campo: F(campo) + valor for campo, valor in incrementos.items()}
+        )
+
+
+def registrar_orden_creada(orden):
+    incrementos = {'num_ordenes': 1}
+    if orden.estado == ESTADO_VENTA:
+        incrementos.update(num_entregadas=1, ventas=orden.total or 0)
+    _acumular(orden.restaurante_id, timezone.localdate(orden.created_at), **incrementos)
+
+
+def registrar_cambio_estado(orden, estado_anterior):
+    """Ajusta las ventas del día de la orden si entra o sale del estado 'entregada'."""
+    if (estado_anterior == ESTADO_VENTA) == (orden.estado == ESTADO_VENTA):
+        return
+    signo = 1 if orden.estado == ESTADO_VENTA else -1
+    _acumular(
+        orden.restaurante_id,
+        timezone.localdate(orden.created_at),
+        num_entregadas=signo,
+        ventas=signo * (orden.total or 0),
+    )
+
+
+def resumen_ventas(restaurante, hoy=None):
+    """Ventas de hoy, de la semana (desde el lunes) y del mes en una sola consulta."""
+    hoy = hoy or timezone.localdate()
+    inicio_semana = hoy - timedelta(days=hoy.weekday())
+    inicio_mes = hoy.replace(day=1)
+    totales = VentaDiaria.objects.filter(
+        restaurante=restaurante,
+        fecha__gte=min(inicio_semana, inicio_mes),
+        fecha__lte=hoy,
+    ).aggregate(
+        hoy=Sum('ventas', filter=Q(fecha=hoy)),
+        semana=Sum('ventas', filter=Q(fecha__gte=inicio_semana)),
+        mes=Sum('ventas', filter=Q(fecha__gte=inicio_mes)),
+    )
+    return {periodo: valor or 0 for periodo, valor in totales.items()}
+
+
+@transaction.atomic
+def reconstruir_ventas_diarias(restaurante_ids=None):
+    """Recalcula VentaDiaria desde la tabla de órdenes (todas o las de ciertos restaurantes)."""
+    ordenes = Orden.objects.all()
+    resumenes = VentaDiaria.objects.all()
+    if restaurante_ids is not None:
+        ordenes = ordenes.filter(restaurante_id__in=restaurante_ids)
+        resumenes = resumenes.filter(restaurante_id__in=restaurante_ids)
+    resumenes.delete()
+
+    filas = (
+        ordenes.annotate(fecha=TruncDate('created_at'))
+        .values('restaurante_id', 'fecha')
+        .order_by()
+        .annotate(
+            num_ordenes=Count('id'),
+            num_entregadas=Count('id', filter=Q(estado=ESTADO_VENTA)),
+            ventas=Sum('total', filter=Q(estado=ESTADO_VENTA)),
+        )
+    )
+    VentaDiaria.objects.bulk_create([
+        VentaDiaria(
+            restaurante_id=fila['restaurante_id'],
+            fecha=fila['fecha'],
+            num_ordenes=fila['num_ordenes'],
+            num_entregadas=fila['num_entregadas'],
+            ventas=fila['ventas'] or Decimal('0'),
+        )
+        for fila in filas
+    ], batch_size=1000)
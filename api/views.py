@@ -1,41 +1,111 @@
+import logging
+
 from django.shortcuts import render, get_object_or_404
-from rest_framework.decorators import api_view, permission_classes
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Sum, Count
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, Q
 from rest_framework import status
 from .models import Restaurante, Envio, RedSocial, MetodoPago, Producto, Orden, Categoria
 from .serializers import (
     RestauranteSerializer, EnvioSerializer, RedSocialSerializer,
     MetodoPagoSerializer, ProductoSerializer, OrdenSerializer,OrdenEstadoUpdateSerializer, CategoriaSerializer, ProductoClienteSerializer
 )
+from .menu_snapshot import obtener_menu
+from .proyecciones import proyeccion, proyectar
+from .representacion import Representacion
+from .cargas import optimizar
+from .propiedad import EsPropietarioRestaurante, restaurante_de
+from .pagination import KeysetPagination, DescubrimientoPagination
+from .horarios import restaurantes_abiertos
+from .ventas import registrar_cambio_estado, resumen_ventas
+from .eventos import publicar_orden_creada, publicar_cambio_estado
+from .busqueda import buscar_productos, terminos, LIMITE_POR_DEFECTO
+from .streaming import formato_streaming, respuesta_streaming, RENDERERS_STREAMING
+from .importacion import FORMATOS, detectar_formato, importar_menu
+from .exportacion import (
+    COLUMNAS, RENDERERS_EXPORTACION, formato_exportacion, queryset_exportacion, respuesta_exportacion
+)
+from .conditional import (
+    etag_restaurante, last_modified_restaurante, etag_menu, last_modified_menu, etag_lista_restaurante
+)
+from .registro import anotar
+
+logger = logging.getLogger(__name__)
+
+
+def _parsear_fecha_filtro(valor, fin_del_dia=False):
+    """
+    Convierte un parámetro ?desde= / ?hasta= en un datetime con zona horaria.
+    Acepta fecha-hora ISO 8601 o solo fecha; con solo fecha y fin_del_dia=True
+    devuelve el inicio del día siguiente (límite exclusivo).
+    """
+    # Primero solo fecha: parse_datetime() también acepta "AAAA-MM-DD" (como medianoche)
+    fecha = parse_date(valor)
+    if fecha is not None:
+        if fin_del_dia:
+            fecha += timedelta(days=1)
+        fecha_hora = datetime.combine(fecha, time.min)
+    else:
+        fecha_hora = parse_datetime(valor)
+        if fecha_hora is None:
+            raise ValueError(valor)
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
+
+
+def filtrar_ordenes(ordenes, params):
+    """
+    Aplica los filtros opcionales de órdenes (estado, desde, hasta).
+    Devuelve (queryset, errores); errores es un dict vacío si todo es válido.
+    """
+    errores = {}
+    estado = params.get('estado')
+    if estado:
+        if estado not in dict(Orden.ESTADOS_ORDEN):
+            errores['estado'] = [f"Estado inválido: {estado}."]
+        else:
+            ordenes = ordenes.filter(estado=estado)
+    for param, lookup, fin_del_dia in (('desde', 'created_at__gte', False), ('hasta', 'created_at__lt', True)):
+        valor = params.get(param)
+        if not valor:
+            continue
+        try:
+            ordenes = ordenes.filter(**{lookup: _parsear_fecha_filtro(valor, fin_del_dia)})
+        except ValueError:
+            errores[param] = ["Formato de fecha inválido. Usa AAAA-MM-DD o fecha-hora ISO 8601."]
+    return ordenes, errores
+
+
+def respuesta_menu(contenido, snapshot):
+    """Devuelve el JSON pre-serializado del menú sin pasar por el renderer de DRF."""
+    response = HttpResponse(contenido, content_type='application/json')
+    response['X-Menu-Version'] = str(snapshot.version)
+    return response
 
 # Create your views here.
 
 @api_view(['GET', 'POST']) # Permite GET para listar, POST para crear
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante como parámetro de la URL
+@condition(etag_func=etag_lista_restaurante(RedSocial)) # 304 si las redes no cambiaron
 def redsocial_list_create_restaurante(request, restaurante_slug):
     """
     Lista redes sociales para un restaurante específico por slug (GET)
     o crea una nueva red social para ese restaurante (POST).
     Verifica que el usuario autenticado sea el propietario.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar que el usuario sea el propietario.
-    # get_object_or_404 devolverá 404 si el restaurante no existe.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        # Denegar el acceso con 403 Forbidden
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # Si la verificación de permiso pasa...
     if request.method == 'GET':
@@ -68,24 +138,16 @@ def redsocial_list_create_restaurante(request, restaurante_slug):
 
 
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE']) # Permite GET, PUT, PATCH, DELETE
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante y el ID de la red social como parámetros
 def redsocial_detail_update_delete_restaurante(request, restaurante_slug, red_social_id):
     """
     Recupera (GET), actualiza (PUT/PATCH) o elimina (DELETE) una red social específica por ID,
     verificando que pertenezca al restaurante del usuario autenticado.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar la propiedad.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # 2. Encontrar la red social por su ID **Y** asegurarse de que pertenezca a ESTE restaurante.
     # get_object_or_404 buscará por ID y añadirá el filtro por restaurante.
@@ -122,27 +184,18 @@ def redsocial_detail_update_delete_restaurante(request, restaurante_slug, red_so
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 @api_view(['GET', 'POST']) # Permite GET para listar, POST para crear
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante como parámetro de la URL
+@condition(etag_func=etag_lista_restaurante(Envio)) # 304 si los envíos no cambiaron
 def envio_list_create_restaurante(request, restaurante_slug):
     """
     Lista opciones de envío para un restaurante específico por slug (GET)
     o crea una nueva opción de envío para ese restaurante (POST).
     Verifica que el usuario autenticado sea el propietario.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar que el usuario sea el propietario.
-    # get_object_or_404 devolverá 404 si el restaurante no existe.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        # Denegar el acceso con 403 Forbidden
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # Si la verificación de permiso pasa...
     if request.method == 'GET':
@@ -175,24 +228,16 @@ def envio_list_create_restaurante(request, restaurante_slug):
 
 
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE']) # Permite GET, PUT, PATCH, DELETE
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante y el ID de la opción de envío como parámetros
 def envio_detail_update_delete_restaurante(request, restaurante_slug, envio_id):
     """
     Recupera (GET), actualiza (PUT/PATCH) o elimina (DELETE) una opción de envío específica por ID,
     verificando que pertenezca al restaurante del usuario autenticado.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar la propiedad.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # 2. Encontrar la opción de envío por su ID **Y** asegurarse de que pertenezca a ESTE restaurante.
     # get_object_or_404 buscará por ID y añadirá el filtro por restaurante.
@@ -229,27 +274,18 @@ def envio_detail_update_delete_restaurante(request, restaurante_slug, envio_id):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 @api_view(['GET', 'POST']) # Permite GET para listar, POST para crear
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante como parámetro de la URL
+@condition(etag_func=etag_lista_restaurante(MetodoPago)) # 304 si los métodos de pago no cambiaron
 def metodopago_list_create_restaurante(request, restaurante_slug):
     """
     Lista métodos de pago para un restaurante específico por slug (GET)
     o crea un nuevo método de pago para ese restaurante (POST).
     Verifica que el usuario autenticado sea el propietario.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar que el usuario sea el propietario.
-    # get_object_or_404 devolverá 404 si el restaurante no existe.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        # Denegar el acceso con 403 Forbidden
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # Si la verificación de permiso pasa...
     if request.method == 'GET':
@@ -281,24 +317,16 @@ def metodopago_list_create_restaurante(request, restaurante_slug):
 
 
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE']) # Permite GET, PUT, PATCH, DELETE
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante y el ID del método de pago como parámetros
 def metodopago_detail_update_delete_restaurante(request, restaurante_slug, metodo_pago_id):
     """
     Recupera (GET), actualiza (PUT/PATCH) o elimina (DELETE) un método de pago específico por ID,
     verificando que pertenezca al restaurante del usuario autenticado.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar la propiedad.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # 2. Encontrar el método de pago por su ID **Y** asegurarse de que pertenezca a ESTE restaurante.
     # get_object_or_404 buscará por ID y añadirá el filtro por restaurante.
@@ -336,24 +364,36 @@ def metodopago_detail_update_delete_restaurante(request, restaurante_slug, metod
 
 
 @api_view(['GET'])
+@vary_on_headers('Accept') # La respuesta cambia con el Accept (JSON o NDJSON), también en los 304
+@condition(etag_func=etag_menu, last_modified_func=last_modified_menu)
+@renderer_classes(RENDERERS_STREAMING) # Acepta application/x-ndjson para el modo streaming
 def producto_list_by_restaurante_slug(request, restaurante_slug):
     """
     Devuelve todos los productos del restaurante especificado por el slug en la URL.
     """
-    try:
-        restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
+    # 404 si el slug no existe; otros errores llegan al manejador de Django, que los registra
+    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
+    formato = formato_streaming(request)
+    if formato:
+        # Streaming fila por fila (?stream=json|ndjson), sin pasar por el snapshot
         productos = Producto.objects.filter(restaurante=restaurante)
-        serializer = ProductoClienteSerializer(productos, many=True)
-        return Response(serializer.data)
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return respuesta_streaming(productos, ProductoClienteSerializer, formato)
+    # El menú se sirve desde el snapshot pre-serializado (ver menu_snapshot.py)
+    contenido, snapshot = obtener_menu(restaurante, 'cliente')
+    return respuesta_menu(contenido, snapshot)
 
 @api_view(['GET', 'POST'])
+@vary_on_headers('Accept')
+@renderer_classes(RENDERERS_STREAMING) # Acepta application/x-ndjson para el modo streaming
 def restaurante_list_create(request):
     if request.method == 'GET':
         restaurantes = Restaurante.objects.all().order_by('estado','slug')
-        serializer = RestauranteSerializer(restaurantes, many=True)
-        return Response(serializer.data)
+        formato = formato_streaming(request)
+        if formato:
+            # Streaming fila por fila (?stream=json|ndjson) para no cargar toda la lista en memoria
+            return respuesta_streaming(restaurantes, RestauranteSerializer, formato)
+        # Proyección sobre values(): misma salida que RestauranteSerializer sin instanciar modelos
+        return Response(proyectar(RestauranteSerializer, restaurantes))
     elif request.method == 'POST':
         serializer = RestauranteSerializer(data=request.data)
         if serializer.is_valid():
@@ -362,6 +402,40 @@ def restaurante_list_create(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+def descubrir_restaurantes(request):
+    """
+    Listado paginado de restaurantes para clientes, con filtros opcionales:
+    - ?abierto_ahora=1: solo los que están dentro de su horario en este momento
+      (consulta por rango sobre VentanaApertura, incluye horarios que cruzan la medianoche).
+    - ?cocina=slug1,slug2: restaurantes con alguno de esos tipos de cocina.
+    - ?estado=abierto|cerrado
+    Paginación con ?page= y ?page_size= (máx. 100).
+    """
+    restaurantes = Restaurante.objects.all()
+    estado = request.query_params.get('estado')
+    if estado:
+        if estado not in dict(Restaurante.ESTADOS):
+            return Response({"estado": [f"Estado inválido: {estado}."]}, status=status.HTTP_400_BAD_REQUEST)
+        restaurantes = restaurantes.filter(estado=estado)
+    if request.query_params.get('abierto_ahora', '').lower() in ('1', 'true'):
+        restaurantes = restaurantes.filter(id__in=restaurantes_abiertos())
+    cocinas = [slug for slug in request.query_params.get('cocina', '').split(',') if slug]
+    if cocinas:
+        # Subconsulta sobre la tabla intermedia para no duplicar filas con varios tipos de cocina
+        restaurantes = restaurantes.filter(
+            id__in=Restaurante.tipos_cocina.through.objects.filter(
+                tipococina__slug__in=cocinas
+            ).values('restaurante_id')
+        )
+    restaurantes = restaurantes.order_by('estado', 'slug')
+    # Se pagina directamente el values() de la proyección; las relaciones se cargan solo para la página
+    proyeccion_restaurantes = proyeccion(RestauranteSerializer)
+    paginador = DescubrimientoPagination()
+    pagina = paginador.paginate_queryset(proyeccion_restaurantes.valores(restaurantes), request)
+    return paginador.get_paginated_response(proyeccion_restaurantes.convertir(pagina))
+
+
 @api_view(['GET']) # Solo permitirá peticiones GET
 @permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
 def listar_mis_restaurantes(request):
@@ -371,18 +445,15 @@ def listar_mis_restaurantes(request):
     user = request.user # Obtener el usuario autenticado
 
     # Filtrar restaurantes donde el usuario actual es el propietario
-    # .prefetch_related('tipos_cocina', 'redes_sociales', etc.) si necesitas esos detalles aquí
     mis_restaurantes = Restaurante.objects.filter(propietario=user)
 
-    # Serializar la lista de restaurantes.
-    # Usamos RestauranteSerializer. many=True para una lista.
-    serializer = RestauranteSerializer(mis_restaurantes, many=True)
-
-    # Devolver la respuesta con la lista serializada
-    return Response(serializer.data)
+    # Misma salida que RestauranteSerializer(many=True), proyectada desde values()
+    # (las relaciones se cargan con una consulta cada una para toda la lista)
+    return Response(proyectar(RestauranteSerializer, mis_restaurantes))
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
+@condition(etag_func=etag_restaurante, last_modified_func=last_modified_restaurante)
 def restaurante_detail(request, slug):
     
     try:
@@ -406,6 +477,7 @@ def restaurante_detail(request, slug):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 @api_view(['GET'])
+@condition(etag_func=etag_restaurante, last_modified_func=last_modified_restaurante)
 def restaurante_detail_id(request, pk):
     
     try:
@@ -461,9 +533,7 @@ def crear_orden(request):
     """
     Crea una nueva orden.
     """
-    print("ingresa a crear orden")
-    print(request.data)
-    print("usuario autenticado:", request.user) # Verifica el usuario autenticado
+    logger.debug("crear_orden: usuario %s", request.user.pk)
     # Inicializa el serializador con los datos de la petición
     # Pasar 'request' en context es útil si tu serializador necesita acceder al usuario actual
     # para validar algo o si asignas el usuario dentro del serializador (menos común)
@@ -477,7 +547,13 @@ def crear_orden(request):
         # y quieres que la orden se asocie al usuario autenticado,
         # DEBES pasarlo al método save del serializador:
         orden_creada = serializer.save(usuario=request.user) # Asigna el usuario autenticadoç
-        print("Orden creada:", orden_creada)
+        anotar(restaurante=orden_creada.restaurante.slug)
+        logger.info(
+            "Orden %s creada", orden_creada.id,
+            extra={'orden_id': orden_creada.id, 'total': orden_creada.total},
+        )
+        # Aviso en tiempo real al dashboard del restaurante (SSE)
+        publicar_orden_creada(orden_creada)
 
         # Devuelve una respuesta con los datos de la orden creada y estado 201 Created
         # El serializador (después de save) contendrá los datos completos de la orden creada, incluyendo el total calculado, etc.
@@ -492,18 +568,15 @@ def orden_detail(request, pk):
     """
     Devuelve los detalles de una orden específica.
     """
+    # Representación compacta salvo ?fields= / ?expand= (ver representacion.py)
+    contexto = {'request': request, 'representacion': Representacion.desde_parametros(request.query_params, OrdenSerializer)}
     try:
-        orden = Orden.objects.get(pk=pk)
+        orden = optimizar(Orden.objects.all(), OrdenSerializer, contexto).get(pk=pk)
     except Orden.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        serializer = OrdenSerializer(orden)
-        return Response(serializer.data)
-        return Response(status=status.HTTP_404_NOT_FOUND)
-
-    if request.method == 'GET':
-        serializer = OrdenSerializer(orden)
+        serializer = OrdenSerializer(orden, context=contexto)
         return Response(serializer.data)
     return Response(status=status.HTTP_400_BAD_REQUEST)
 
@@ -511,128 +584,151 @@ def orden_detail(request, pk):
 
 
 @api_view(['GET']) # Solo permitirá peticiones GET
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
+@vary_on_headers('Accept')
+@renderer_classes(RENDERERS_STREAMING) # Acepta application/x-ndjson para el modo streaming
 def listar_ordenes_restaurante(request, restaurante_slug):
     """
     Lista las órdenes para un restaurante específico por slug,
     verificando que el usuario autenticado sea el propietario.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    if restaurante.propietario != user:
-        return Response({"error": "No tienes permiso para ver las órdenes de este restaurante."}, status=status.HTTP_403_FORBIDDEN)
+    # La propiedad la verifica EsPropietarioRestaurante, que deja el id del restaurante en la petición.
+    # Filtros opcionales: ?estado=, ?desde=, ?hasta= (fecha o fecha-hora ISO 8601)
+    ordenes, errores = filtrar_ordenes(
+        Orden.objects.filter(restaurante_id=request.restaurante_id), request.query_params
+    )
+    if errores:
+        return Response(errores, status=status.HTTP_400_BAD_REQUEST)
+    ordenes = ordenes.order_by('-created_at', '-id')
+
+    # Por defecto cada orden lleva solo los IDs de sus relaciones; ?expand= añade los
+    # *_details pedidos y ?fields= limita los campos. Solo se cargan las relaciones expandidas.
+    contexto = {'request': request, 'representacion': Representacion.desde_parametros(request.query_params, OrdenSerializer)}
+    ordenes = optimizar(ordenes, OrdenSerializer, contexto)
+
+    # Streaming fila por fila (?stream=json|ndjson): lista completa filtrada, sin paginar
+    formato = formato_streaming(request)
+    if formato:
+        return respuesta_streaming(ordenes, OrdenSerializer, formato, context=contexto)
+
+    # 4. Paginación por cursor sobre (created_at, id), activada con ?page_size= o ?cursor=.
+    # Sin esos parámetros se mantiene la respuesta original con la lista completa.
+    paginator = KeysetPagination()
+    if any(p in request.query_params for p in (paginator.cursor_query_param, paginator.page_size_query_param)):
+        pagina = paginator.paginate_queryset(ordenes, request)
+        serializer = OrdenSerializer(pagina, many=True, context=contexto)
+        return paginator.get_paginated_response(serializer.data)
+
+    # 5. Serializar las órdenes y devolver la respuesta
+    serializer = OrdenSerializer(ordenes, many=True, context=contexto)
+    return Response(serializer.data)   
 
-    # 3. Si la verificación de permiso pasa, filtrar las órdenes para este restaurante.
-    ordenes = Orden.objects.filter(restaurante=restaurante).order_by('-created_at')
 
-    # 4. Serializar las órdenes
-    serializer = OrdenSerializer(ordenes, many=True, context={'request': request})
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante])
+@vary_on_headers('Accept')
+@renderer_classes(RENDERERS_EXPORTACION) # Acepta text/csv y application/x-ndjson
+def exportar_restaurante(request, restaurante_slug, recurso):
+    """
+    Exporta en streaming los productos, las órdenes o los detalles de órdenes
+    del restaurante como CSV (por defecto) o NDJSON (?formato=ndjson).
+    Las órdenes y sus detalles aceptan los mismos filtros que el listado de
+    órdenes: ?estado=, ?desde=, ?hasta=.
+    """
+    if recurso not in COLUMNAS:
+        return Response({"detail": "Exportación no encontrada."}, status=status.HTTP_404_NOT_FOUND)
+    restaurante = restaurante_de(request)
 
-    # 5. Devolver la respuesta
-    return Response(serializer.data)   
+    ordenes = None
+    if recurso != 'productos':
+        ordenes, errores = filtrar_ordenes(Orden.objects.filter(restaurante=restaurante), request.query_params)
+        if errores:
+            return Response(errores, status=status.HTTP_400_BAD_REQUEST)
+    queryset = queryset_exportacion(recurso, restaurante, ordenes)
+    return respuesta_exportacion(
+        recurso, queryset, formato_exportacion(request), f'{restaurante.slug}-{recurso}'
+    )
 
 
 @api_view(['GET']) # Solo permitirá peticiones GET
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 def orden_detail_restaurante(request, restaurante_slug, orden_id):
     """
     Devuelve los detalles de una orden específica por ID,
     verificando que el usuario autenticado sea el propietario del restaurante asociado.
     """
-    user = request.user
-    orden = get_object_or_404(Orden, id=orden_id)
-    restaurante_orden = orden.restaurante
-    if restaurante_orden.propietario != user:
-        return Response({"error": "No tienes permiso para ver esta orden."}, status=status.HTTP_403_FORBIDDEN)
-    # 3. Si la verificación de permiso pasa, proceder a serializar la orden.
-    # Usamos el OrdenSerializer completo para incluir todos los detalles anidados
-    # en la respuesta, como en la vista de detalle GET.
-    serializer = OrdenSerializer(orden, context={'request': request}) # Pasa el contexto si es necesario en el serializador
+    contexto = {'request': request, 'representacion': Representacion.desde_parametros(request.query_params, OrdenSerializer)}
+    # EsPropietarioRestaurante ya verificó el restaurante de la URL: la orden debe ser de ese restaurante
+    # (404 si es de otro, como si no existiera).
+    ordenes = Orden.objects.filter(restaurante_id=request.restaurante_id)
+    orden = get_object_or_404(optimizar(ordenes, OrdenSerializer, contexto), id=orden_id)
+    # Como en la vista de detalle GET: IDs de las relaciones salvo ?expand= / ?fields=.
+    serializer = OrdenSerializer(orden, context=contexto)
     # 4. Devolver la respuesta
     return Response(serializer.data) # Devuelve la orden serializada
 
 
 @api_view(['PATCH']) # Usamos PATCH para actualizaciones parciales (solo un campo)
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # La función acepta el ID de la orden como parámetro
 def actualizar_estado_orden(request, restaurante_slug, orden_id):
     """
     Actualiza el estado de una orden específica por ID,
     verificando que el usuario autenticado sea el propietario del restaurante asociado.
     """
-    print('ingresa a actualizar estado orden')
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Intentar encontrar la orden por el ID
-    # get_object_or_404 devolverá 404 si la orden no existe.
-    orden = get_object_or_404(Orden, id=orden_id)
-
-    # 2. **Verificación de Permiso Crucial:** Asegurarse de que el usuario autenticado
-    # es el propietario del restaurante asociado a esta orden.
-    # Accedemos a la instancia del restaurante a través de la orden
-    restaurante_orden = orden.restaurante
-
-    # Comparamos el propietario del restaurante con el usuario autenticado
-    if restaurante_orden.propietario != user:
-        # Si el usuario NO es el propietario del restaurante de esta orden, denegar el acceso.
-        return Response(
-            {"detail": "No tienes permiso para actualizar el estado de esta orden."},
-            status=status.HTTP_403_FORBIDDEN # 403 Forbidden
-        )
-
-    # 3. Si la verificación de permiso pasa, proceder a actualizar el estado.
-    # Usamos el OrdenEstadoUpdateSerializer.
-    # partial=True permite enviar solo el campo 'estado' en el cuerpo de la petición.
-    serializer = OrdenEstadoUpdateSerializer(orden, data=request.data, partial=True)
-
-    # 4. Validar los datos (solo el estado)
-    if serializer.is_valid():
+    # 1. EsPropietarioRestaurante ya verificó que el usuario es el propietario del restaurante
+    # de la URL. Buscamos la orden por ID **dentro de ese restaurante**:
+    # get_object_or_404 devolverá 404 si no existe o si es de otro restaurante.
+    # Con el plan de carga de OrdenSerializer, que se usa para la respuesta (ver cargas.py)
+    ordenes = optimizar(Orden.objects.filter(restaurante_id=request.restaurante_id), OrdenSerializer)
+
+    with transaction.atomic():
+        # 2. Bloqueamos la fila de la orden hasta el final de la transacción: con dos PATCH
+        # concurrentes el segundo espera y lee el estado que dejó el primero. Sin el bloqueo
+        # ambos verían el estado anterior y ambos sumarían la orden a VentaDiaria.
+        # of=('self',): solo la orden, no las filas de las relaciones (algunas son nullable).
+        orden = get_object_or_404(ordenes.select_for_update(of=('self',)), id=orden_id)
+
+        # 3. Usamos el OrdenEstadoUpdateSerializer.
+        # partial=True permite enviar solo el campo 'estado' en el cuerpo de la petición.
+        serializer = OrdenEstadoUpdateSerializer(orden, data=request.data, partial=True)
+
+        # 4. Validar los datos (solo el estado)
+        if not serializer.is_valid():
+            # Si los datos no son válidos (ej: el valor de estado no es una opción válida en el modelo)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        estado_anterior = orden.estado
         # Guardar la instancia con el estado actualizado
         serializer.save()
+        # Ajustar el resumen diario de ventas si la orden entra o sale de 'entregada'
+        registrar_cambio_estado(orden, estado_anterior)
+        # Aviso en tiempo real al dashboard (se envía al confirmar la transacción)
+        publicar_cambio_estado(orden, estado_anterior)
 
-        # 5. Opcional: Serializar la orden COMPLETA para devolver la respuesta
-        # Usamos el OrdenSerializer completo para incluir todos los detalles anidados
-        # en la respuesta, como en la vista de detalle GET.
-        full_serializer = OrdenSerializer(orden, context={'request': request}) # Pasa el contexto si es necesario en el serializador
-        return Response(full_serializer.data)
-
-        # Si solo quisieras confirmar el estado actualizado:
-        # return Response({'status': 'success', 'orden_id': orden.id, 'new_estado': orden.estado})
-
-
-    # 6. Si los datos no son válidos (ej: el valor de estado no es una opción válida en el modelo)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    # 5. Serializar la orden COMPLETA para devolver la respuesta
+    # Usamos el OrdenSerializer completo para incluir todos los detalles anidados
+    # en la respuesta, como en la vista de detalle GET.
+    full_serializer = OrdenSerializer(orden, context={'request': request}) # Pasa el contexto si es necesario en el serializador
+    return Response(full_serializer.data)
 
 
 @api_view(['GET', 'POST']) # Permite GET para listar, POST para crear
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante como parámetro de la URL
+@condition(etag_func=etag_lista_restaurante(Categoria)) # 304 si las categorías no cambiaron
 def categoria_list_create_restaurante(request, restaurante_slug):
     """
     Lista categorías para un restaurante específico por slug (GET)
     o crea una nueva categoría para ese restaurante (POST).
     Verifica que el usuario autenticado sea el propietario.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar que el usuario sea el propietario.
-    # get_object_or_404 devolverá 404 si el restaurante no existe.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad: Si el propietario del restaurante no es el usuario autenticado...
-    if restaurante.propietario != user:
-        # Denegar el acceso con 403 Forbidden
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # Si la verificación de permiso pasa...
     if request.method == 'GET':
-        print("usuario autenticado:", user) # Verifica el usuario autenticado
-        print("restaurante encontrado:", restaurante) # Verifica el restaurante encontrado
         # 2. Si es GET: Listar todas las categorías de ESTE restaurante
         # Filtramos las categorías por el restaurante encontrado
         categorias = Categoria.objects.filter(restaurante=restaurante).order_by('orden', 'nombre')
@@ -663,24 +759,16 @@ def categoria_list_create_restaurante(request, restaurante_slug):
 
 
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE']) # Permite GET, PUT, PATCH, DELETE
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante y el ID de la categoría como parámetros
 def categoria_detail_update_delete_restaurante(request, restaurante_slug, categoria_id):
     """
     Recupera (GET), actualiza (PUT/PATCH) o elimina (DELETE) una categoría específica por ID,
     verificando que pertenezca al restaurante del usuario autenticado.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar la propiedad.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # 2. Encontrar la categoría por su ID **Y** asegurarse de que pertenezca a ESTE restaurante.
     # get_object_or_404 buscará la categoría por ID y añadirá el filtro por restaurante.
@@ -724,7 +812,7 @@ def categoria_detail_update_delete_restaurante(request, restaurante_slug, catego
 
 
 @api_view(['GET', 'POST']) # Permite GET para listar, POST para crear
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante y el ID de la categoría como parámetros de la URL
 def producto_list_create_restaurante_categoria(request, restaurante_slug, categoria_id):
     """
@@ -733,19 +821,9 @@ def producto_list_create_restaurante_categoria(request, restaurante_slug, catego
     Verifica que el usuario autenticado sea el propietario y que la categoría
     pertenezca a ese restaurante.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar que el usuario sea el propietario.
-    # get_object_or_404 devolverá 404 si el restaurante no existe.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        # Denegar el acceso con 403 Forbidden
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # 2. Encontrar la categoría por ID **Y** asegurarse de que pertenezca a ESTE restaurante.
     # get_object_or_404 buscará la categoría por ID y añadirá el filtro por restaurante.
@@ -788,24 +866,16 @@ def producto_list_create_restaurante_categoria(request, restaurante_slug, catego
 
 
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE']) # Permite GET, PUT, PATCH, DELETE
-@permission_classes([IsAuthenticated]) # Requiere que el usuario esté autenticado
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante]) # Autenticado y propietario del restaurante de la URL
 # Acepta el slug del restaurante, el ID de la categoría y el ID del producto como parámetros
 def producto_detail_update_delete_restaurante_categoria(request, restaurante_slug, categoria_id, producto_id):
     """
     Recupera (GET), actualiza (PUT/PATCH) o elimina (DELETE) un producto específico por ID,
     verificando que pertenezca a la categoría y restaurante del usuario autenticado.
     """
-    user = request.user # Obtener el usuario autenticado
-
-    # 1. Encontrar el restaurante por slug y verificar la propiedad.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        return Response(
-            {"detail": "No tienes permiso para gestionar este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # 2. Encontrar la categoría por ID **Y** asegurarse de que pertenezca a ESTE restaurante.
     categoria = get_object_or_404(Categoria, id=categoria_id, restaurante=restaurante)
@@ -852,36 +922,29 @@ def producto_detail_update_delete_restaurante_categoria(request, restaurante_slu
 
 @api_view(['GET','POST']) # Permite GET para listar, POST para crear
 @permission_classes([IsAuthenticated])
+@condition(etag_func=etag_menu, last_modified_func=last_modified_menu)
 def restaurant_menu_list_view(request, restaurante_slug):
-    print("ingresa a restaurant_menu_list_view")
-    
-    print(f"[restaurant_menu_list_view] Called for slug: {restaurante_slug} with method: {request.method}") # Log de inicio
+    logger.debug("restaurant_menu_list_view: %s %s", request.method, restaurante_slug)
 
     # --- Lógica para GET (Listar) ---
     if request.method == 'GET':
         try:
-            # Filtra los productos del restaurante
-            queryset = Producto.objects.filter(restaurante__slug=restaurante_slug)
-            # Opcional: Verifica permisos sobre el restaurante si no lo hiciste antes
-            # from .models import Restaurante
-            # try:
-            #     restaurante = Restaurante.objects.get(slug=restaurante_slug)
-            #     # if not request.user.has_perm('view_menu', restaurante): ...
-            # except Restaurante.DoesNotExist:
-            #     return Response({"detail": "Restaurante no encontrado."}, status=status.HTTP_404_NOT_FOUND)
-
-            print(f"[restaurant_menu_list_view] GET: Found {queryset.count()} products.")
-            # Serializa la lista y retorna la respuesta
-            serializer = ProductoSerializer(queryset, many=True)
-            return Response(serializer.data)
-
-        except Exception as e:
-             print(f"[restaurant_menu_list_view] GET error: {e}")
+            restaurante = Restaurante.objects.filter(slug=restaurante_slug).first()
+            if restaurante is None:
+                # Sin restaurante no hay productos: se mantiene la respuesta de lista vacía
+                return Response([])
+
+            # Devuelve el menú desde el snapshot pre-serializado (ver menu_snapshot.py)
+            contenido, snapshot = obtener_menu(restaurante, 'menu')
+            logger.debug("restaurant_menu_list_view: snapshot del menú v%s", snapshot.version)
+            return respuesta_menu(contenido, snapshot)
+
+        except Exception:
+             logger.exception("restaurant_menu_list_view: error al listar el menú de %s", restaurante_slug)
              return Response({"detail": "Error interno del servidor al listar."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     
     elif request.method == 'POST':
-        print(f"[restaurant_menu_list_view] POST: Data received: {request.data}")
         try:
              # ** Obtener el objeto Restaurante **
              restaurante = Restaurante.objects.get(slug=restaurante_slug)
@@ -889,66 +952,96 @@ def restaurant_menu_list_view(request, restaurante_slug):
              # ** <<-- ¡REEMPLAZA LA LÍNEA DE PERMISO CON ESTO! -->> **
              # Verifica si el usuario autenticado NO es el propietario del restaurante
              # Y (Opcional) si no es superusuario o staff si quieres darles acceso total
-             if restaurante.propietario != request.user and not request.user.is_superuser and not request.user.is_staff:
-                 print(f"[restaurant_menu_list_view] POST: User {request.user.id} is not the owner or staff for restaurant {restaurante_slug}")
+             if restaurante.propietario_id != request.user.pk and not request.user.is_superuser and not request.user.is_staff:
+                 logger.info("restaurant_menu_list_view: el usuario %s no gestiona %s", request.user.id, restaurante_slug)
                  return Response({"detail": "No tienes permiso para gestionar este restaurante."}, status=status.HTTP_403_FORBIDDEN)
              # <<-- Fin de la línea de permiso corregida -->>
 
 
         except Restaurante.DoesNotExist:
-             print(f"[restaurant_menu_list_view] POST: Restaurante with slug {restaurante_slug} not found.")
              return Response({"detail": "Restaurante no encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
         # ... (resto de la lógica POST: instanciar serializador, serializer.is_valid(), serializer.save(), retornar respuesta) ...
         serializer = ProductoSerializer(data=request.data, context={'restaurante': restaurante}) # <--- Mantén esta línea
         if serializer.is_valid():
-            print(restaurante)
-            print("[restaurant_menu_list_view] POST: Serializer is valid. Saving...")
             nuevo_producto = serializer.save() # <--- Mantén esta línea (asumiendo que el create() del serializador usa el context)
-            print(f"[restaurant_menu_list_view] POST: Product created with ID: {nuevo_producto.id}")
+            logger.info("Producto %s creado", nuevo_producto.id, extra={'producto_id': nuevo_producto.id})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        print("[restaurant_menu_list_view] POST: Serializer is NOT valid. Errors:", serializer.errors)
+        logger.debug("restaurant_menu_list_view: datos no válidos en %s", sorted(serializer.errors))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def importar_menu_view(request, restaurante_slug):
+    """
+    Importa productos y categorías en bloque desde un archivo CSV o JSON (array o NDJSON).
+    El archivo se envía como multipart en el campo 'archivo', o directamente como cuerpo
+    de la petición con Content-Type text/csv, application/json o application/x-ndjson.
+    El formato se puede forzar con ?formato=csv|json.
+    Devuelve un informe con los productos creados/actualizados y los errores por fila.
+    """
+    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
+    if restaurante.propietario_id != request.user.pk and not request.user.is_superuser and not request.user.is_staff:
+        return Response({"detail": "No tienes permiso para gestionar este restaurante."}, status=status.HTTP_403_FORBIDDEN)
+
+    content_type = request.content_type or ''
+    if content_type.startswith('multipart/form-data'):
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response({"archivo": ["Envía el archivo en el campo 'archivo'."]}, status=status.HTTP_400_BAD_REQUEST)
+        nombre_archivo, tipo_archivo = archivo.name, archivo.content_type
+    else:
+        # Cuerpo crudo: se lee en streaming sin pasar por los parsers de DRF
+        archivo, nombre_archivo, tipo_archivo = request.stream, '', content_type
+
+    formato = request.query_params.get('formato') or detectar_formato(nombre_archivo, tipo_archivo)
+    if formato not in FORMATOS:
+        return Response(
+            {"formato": ["No se reconoce el formato del archivo. Usa ?formato=csv o ?formato=json."]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if archivo is None:
+        return Response({"archivo": ["El archivo está vacío."]}, status=status.HTTP_400_BAD_REQUEST)
+
+    resultado = importar_menu(restaurante, archivo, formato)
+    codigo = status.HTTP_400_BAD_REQUEST if resultado['error_archivo'] else status.HTTP_200_OK
+    return Response(resultado, status=codigo)
+
+
 @api_view(['GET', 'PATCH', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated]) 
 def product_detail_view(request, restaurante_slug, product_id):
-    print(f"[product_detail_view] Called for slug: {restaurante_slug}, product_id: {product_id} with method: {request.method}") # Log de inicio
+    logger.debug("product_detail_view: %s %s/%s", request.method, restaurante_slug, product_id)
 
     try:
         # 1. Obtener el Restaurante por slug (para verificar que existe y permisos)
         restaurante = Restaurante.objects.get(slug=restaurante_slug)
         # Opcional: Verifica permisos del usuario sobre este restaurante para cualquier acción
-        if restaurante.propietario != request.user and not request.user.is_superuser and not request.user.is_staff:
-             print(f"[product_detail_view] User {request.user.id} does not have permission for restaurant {restaurante_slug}")
+        if restaurante.propietario_id != request.user.pk and not request.user.is_superuser and not request.user.is_staff:
+             logger.info("product_detail_view: el usuario %s no gestiona %s", request.user.id, restaurante_slug)
              return Response({"detail": "No tienes permiso para gestionar este restaurante."}, status=status.HTTP_403_FORBIDDEN)
 
         # 2. Obtener el Producto por ID Y asegurarnos de que pertenezca a este restaurante
         producto = Producto.objects.get(restaurante=restaurante, id=product_id)
 
     except Restaurante.DoesNotExist:
-        print(f"[product_detail_view] Restaurante with slug {restaurante_slug} not found.")
         return Response({"detail": "Restaurante no encontrado."}, status=status.HTTP_404_NOT_FOUND)
     except Producto.DoesNotExist:
-        print(f"[product_detail_view] Product with ID {product_id} not found for restaurant {restaurante_slug}.")
         # Retorna 404 si el producto no se encuentra O no pertenece a este restaurante
         return Response({"detail": "Producto no encontrado para este restaurante."}, status=status.HTTP_404_NOT_FOUND)
 
     # Si llegamos aquí, el producto fue encontrado y el usuario tiene permisos básicos sobre el restaurante.
-    print(f"[product_detail_view] Product found: {producto.nombre} (ID: {producto.id})")
 
 
     # --- Lógica para GET (Detalle) ---
     if request.method == 'GET':
-        print("[product_detail_view] Handling GET request.")
         # Serializa el único objeto producto
         serializer = ProductoSerializer(producto) # No many=True aquí
         return Response(serializer.data)
 
     # --- Lógica para PATCH/PUT (Actualizar) ---
     elif request.method in ['PATCH', 'PUT']:
-        print(f"[product_detail_view] Handling {request.method} request. Data received: {request.data}")
 
         # Usar el mismo Serializer, pasándole la instancia existente y los datos recibidos
         # partial=True es para PATCH (permite actualizar solo un subconjunto de campos)
@@ -958,33 +1051,31 @@ def product_detail_view(request, restaurante_slug, product_id):
 
         # Validar los datos de actualización
         if serializer.is_valid():
-            print(f"[product_detail_view] {request.method}: Serializer is valid. Saving...")
             # Guardar la instancia actualizada.
             # Si tu Serializer tiene un método update(), este se llamará automáticamente.
             # Si necesitas hacer algo especial al guardar (ej: regenerar slug si cambia el nombre),
             # sobrescribe update() en el Serializer.
             updated_producto = serializer.save() # <--- Llama a save(). Si usas context en update(), no necesitas pasar el objeto aquí.
 
-            print(f"[product_detail_view] Product updated: {updated_producto.nombre}")
+            logger.info("Producto %s actualizado", updated_producto.id, extra={'producto_id': updated_producto.id})
             # Retorna la respuesta con los datos del objeto actualizado
             return Response(serializer.data)
 
         # Si los datos no son válidos, retorna los errores
-        print(f"[product_detail_view] {request.method}: Serializer is NOT valid. Errors:", serializer.errors)
+        logger.debug("product_detail_view: datos no válidos en %s", sorted(serializer.errors))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     # --- Lógica para DELETE (Eliminar) ---
     elif request.method == 'DELETE':
-        print("[product_detail_view] Handling DELETE request.")
         try:
             # Eliminar la instancia del producto
             producto.delete()
-            print(f"[product_detail_view] Product deleted: {producto.nombre} (ID: {producto.id})")
+            logger.info("Producto %s eliminado", product_id, extra={'producto_id': product_id})
             # Retornar una respuesta vacía con status 204 No Content
             return Response(status=status.HTTP_204_NO_CONTENT)
 
-        except Exception as e:
-            print(f"[product_detail_view] DELETE error: {e}")
+        except Exception:
+            logger.exception("product_detail_view: error al eliminar el producto %s", product_id)
             # Puedes retornar un error si algo salió mal durante la eliminación
             return Response({"detail": "Error al eliminar el producto."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -993,66 +1084,35 @@ def product_detail_view(request, restaurante_slug, product_id):
 
 
 @api_view(['GET']) 
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, EsPropietarioRestaurante])
 def restaurante_dashboard_summary(request, restaurante_slug):
     """
     Proporciona un resumen de datos para el panel de control de un restaurante específico.
-    Incluye conteos de órdenes por estado, ventas del día y órdenes recientes.
+    Incluye conteos de órdenes por estado, ventas de hoy, la semana y el mes, y órdenes recientes.
     Verifica que el usuario autenticado sea el propietario del restaurante.
     """
-    user = request.user 
-
-    # 1. Encontrar el restaurante por slug y verificar que el usuario sea el propietario.
-    # get_object_or_404 devolverá 404 si el restaurante no existe.
-    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
-
-    # Verificar la propiedad
-    if restaurante.propietario != user:
-        # Denegar el acceso con 403 Forbidden
-        return Response(
-            {"detail": "No tienes permiso para ver el resumen de este restaurante."},
-            status=status.HTTP_403_FORBIDDEN
-        )
+    # 1. EsPropietarioRestaurante ya verificó la propiedad (404 si el restaurante no existe,
+    # 403 si no es del usuario), con los claims del token y sin consultar el restaurante.
+    restaurante = restaurante_de(request)
 
     # Si la verificación de permiso pasa...
 
-    # Obtener el inicio y fin del día actual (considerando zona horaria si es relevante)
-    # Para simplicidad, usaremos la hora del servidor. Puedes ajustar esto si necesitas manejar zonas horarias específicas.
-    now = timezone.now()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
-
-
     # 2. Calcular los datos de resumen para ESTE restaurante
 
-    # Conteo de Órdenes por Estado
-    ordenes_pendientes_count = Orden.objects.filter(
-        restaurante=restaurante, # Filtrar por el restaurante del propietario
-        estado='pendiente'      # Filtrar por estado 'pendiente'
-    ).count() # Contar los resultados
-
-    ordenes_en_proceso_count = Orden.objects.filter(
-        restaurante=restaurante,
-        estado='en_proceso' # O el valor que uses para 'en proceso'
-    ).count()
-
-     # Puedes añadir más estados relevantes para el panel, como 'en_camino', 'lista_para_recoger', etc.
-    ordenes_en_camino_count = Orden.objects.filter(
+    # Conteo de Órdenes por Estado en UNA sola consulta (agregado condicional).
+    # Filtrar primero por los estados que interesan permite usar el índice (restaurante, estado, created_at).
+    estados_panel = ['pendiente', 'en_proceso', 'en_camino']
+    conteos = Orden.objects.filter(
         restaurante=restaurante,
-        estado='en_camino'
-    ).count()
+        estado__in=estados_panel,
+    ).aggregate(**{
+        estado: Count('id', filter=Q(estado=estado)) for estado in estados_panel
+    })
 
 
-    # Ventas Totales del Día (solo órdenes completadas/entregadas)
-    # Filtramos por restaurante, estado 'entregada' y fecha de creación 'hoy'.
-    # Usamos .aggregate(Sum('total')) para sumar el campo 'total'.
-    # Usamos or 0 para que si no hay ventas hoy, el resultado sea 0 en lugar de None.
-    ventas_hoy_total = Orden.objects.filter(
-        restaurante=restaurante,         # Filtrar por restaurante
-        estado='entregada',              # Solo contar órdenes entregadas como ventas
-        created_at__gte=today_start,     # Creadas desde el inicio de hoy
-        created_at__lt=today_end         # Creadas hasta el final de hoy
-    ).aggregate(Sum('total'))['total__sum'] or 0
+    # Ventas (solo órdenes entregadas) de hoy, la semana y el mes.
+    # Se leen del resumen diario VentaDiaria, que se mantiene al crear órdenes y al cambiar su estado.
+    ventas = resumen_ventas(restaurante)
 
 
     # Órdenes Recientes (ej: las últimas 5 órdenes, excluyendo las entregadas o canceladas si prefieres)
@@ -1071,20 +1131,44 @@ def restaurante_dashboard_summary(request, restaurante_slug):
 
     # 3. Estructurar los datos de resumen en un diccionario
     summary_data = {
-        "ordenes": {
-            "pendiente": ordenes_pendientes_count,
-            "en_proceso": ordenes_en_proceso_count,
-            "en_camino": ordenes_en_camino_count,
-            # Puedes añadir más estados aquí si los calculaste
-        },
-        "ventas": {
-            "hoy": ventas_hoy_total,
-            # Podrías añadir ventas de la semana, mes, etc. haciendo ajustes en el filtro de fecha
-        },
+        "ordenes": conteos, # pendiente, en_proceso, en_camino
+        "ventas": ventas, # hoy, semana, mes
         "ordenes_recientes": ordenes_recientes_serializer.data, # Incluye la lista serializada de órdenes recientes
         # Puedes añadir más datos aquí, ej: "productos_mas_vendidos" (requiere agregaciones más complejas)
     }
 
 
     # 4. Devolver los datos de resumen como una respuesta JSON
-    return Response(summary_data)
\ No newline at end of file
+    return Response(summary_data)
+
+
+def _respuesta_busqueda(request, restaurante_id=None):
+    texto = request.query_params.get('q', '')
+    if not terminos(texto):
+        return Response({"q": ["Indica un texto de búsqueda."]}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limite = min(int(request.query_params.get('limite', LIMITE_POR_DEFECTO)), 200)
+    except ValueError:
+        return Response({"limite": ["Debe ser un número entero."]}, status=status.HTTP_400_BAD_REQUEST)
+    productos = buscar_productos(texto, restaurante_id=restaurante_id, limite=max(limite, 1))
+    serializer = ProductoClienteSerializer(productos, many=True)
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+def buscar_productos_global(request):
+    """
+    Busca productos activos de todos los restaurantes por nombre, descripción o categoría.
+    Parámetros: ?q= (texto, admite prefijos: "piz" encuentra "pizza") y ?limite= (máx. 200).
+    Resultados ordenados por relevancia.
+    """
+    return _respuesta_busqueda(request)
+
+
+@api_view(['GET'])
+def buscar_productos_restaurante(request, restaurante_slug):
+    """
+    Igual que buscar_productos_global, pero solo dentro del restaurante indicado por slug.
+    """
+    restaurante = get_object_or_404(Restaurante, slug=restaurante_slug)
+    return _respuesta_busqueda(request, restaurante_id=restaurante.id)
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import logging
 import os
+import warnings
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.registro.ContextoPeticionMiddleware',  # Request id y restaurante para los logs
+    'api.instrumentacion.InstrumentacionMiddleware',  # Consultas SQL y tiempos por petición (Server-Timing)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -118,6 +122,9 @@ LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
 
+# Zona de las horas de apertura y cierre de los restaurantes (ver api/horarios.py)
+HORARIOS_ZONA = os.environ.get('HORARIOS_ZONA', TIME_ZONE)
+
 USE_I18N = True
 
 USE_TZ = True
@@ -153,7 +160,8 @@ CORS_ALLOWED_ORIGINS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication', # Usar autenticación JWT
+        # JWT; el usuario se construye desde una caché de instantáneas en lugar de consultarlo (ver api/autenticacion.py)
+        'api.autenticacion.JWTAutenticacionCacheada',
         # Opcional: Mantener la autenticación por sesión para la vista navegable de la API en el navegador
         # 'rest_framework.authentication.SessionAuthentication',
     ],
@@ -169,4 +177,71 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),    # Duración del token de refresco
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
-}
\ No newline at end of file
+    # Los tokens llevan los restaurantes del usuario (claims 'restaurantes' y 'rv', ver api/propiedad.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'api.propiedad.TokenPropiedadSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.propiedad.TokenRefreshPropiedadSerializer',
+}
+
+# Segundos que se guarda en caché la versión de la propiedad de cada usuario (ver api/propiedad.py).
+# Los claims del token solo se usan con una caché compartida en CACHES; con la caché local por proceso
+# (la de por defecto) la propiedad se comprueba en la base de datos. PROPIEDAD_CACHE_COMPARTIDA lo fuerza.
+PROPIEDAD_CACHE_TTL = 60
+
+# Caché en memoria (LRU por proceso) de los usuarios autenticados con JWT (ver api/autenticacion.py).
+# El TTL acota cuánto tarda otro proceso en ver una desactivación.
+AUTENTICACION_CACHE_TAMANO = 10000
+AUTENTICACION_CACHE_TTL = 30
+
+# Instrumentación por petición (ver api/instrumentacion.py)
+# Sin DEBUG se mide una muestra pequeña y Server-Timing (consultas y tiempos internos) solo se envía al staff
+INSTRUMENTACION_MUESTREO = float(os.environ.get('INSTRUMENTACION_MUESTREO', '1' if DEBUG else '0.05'))  # Fracción de peticiones medidas
+INSTRUMENTACION_CABECERA = True if DEBUG else 'staff'  # Server-Timing: True (todos), 'staff' o False
+INSTRUMENTACION_UMBRAL_N1 = 5  # Repeticiones de una misma consulta para registrar un aviso
+
+# Logging estructurado (JSON, una línea por registro) escrito desde un hilo de fondo (ver api/registro.py)
+# LOG_NIVELES permite cambiar niveles por módulo: LOG_NIVELES="api.views=DEBUG,api.instrumentacion=WARNING"
+LOG_NIVELES = {
+    'api': 'INFO',
+    'api.views': 'INFO',
+    'api.serializers': 'INFO',
+    'api.instrumentacion': 'INFO',
+    'django': 'INFO',
+    'django.request': 'WARNING',
+}
+for _par in filter(None, os.environ.get('LOG_NIVELES', '').split(',')):
+    _modulo, _igual, _nivel = (parte.strip() for parte in _par.partition('='))
+    # Un par mal escrito se ignora con un aviso en lugar de impedir que arranque el proceso
+    if not _modulo or not _igual or not isinstance(logging.getLevelName(_nivel.upper()), int):
+        warnings.warn(f"LOG_NIVELES: se ignora {_par!r} (se espera modulo=NIVEL)")
+        continue
+    LOG_NIVELES[_modulo] = _nivel.upper()
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'contexto': {'()': 'api.registro.ContextoPeticionFilter'},
+        # Los mensajes DEBUG por petición son de alto volumen: solo se escribe una fracción
+        'muestreo': {
+            '()': 'api.registro.MuestreoFilter',
+            'tasa': float(os.environ.get('LOG_MUESTREO_DEBUG', '0.1')),
+            'nivel': 'DEBUG',
+        },
+    },
+    'handlers': {
+        'json': {
+            'class': 'api.registro.ColaHandler',
+            'filters': ['contexto'],
+            'archivo': os.environ.get('LOG_ARCHIVO'),  # Por defecto, stdout
+        },
+    },
+    'loggers': {
+        modulo: {
+            'handlers': ['json'] if modulo in ('api', 'django') else [],
+            'level': nivel,
+            'propagate': modulo not in ('api', 'django'),
+            **({'filters': ['muestreo']} if modulo in ('api.views', 'api.serializers') else {}),
+        }
+        for modulo, nivel in LOG_NIVELES.items()
+    },
+}